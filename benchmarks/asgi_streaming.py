@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :asgi_streaming.py
+# @Author   :Lowell
+# @Time     :2022/4/16 11:05
+"""
+测量ASGIHandler同时服务大量慢客户端时的耗时和线程数
+
+    python benchmarks/asgi_streaming.py [-c 并发客户端数] [-k 每个响应的块数] [--delay 秒]
+
+每个客户端请求一个流式响应, 每收到一块都要等待delay秒(模拟慢客户端).
+async模式下中间件, 视图和响应迭代器都是异步的; sync模式下都是同步的, 由asgiref放到线程中执行.
+不经过网络, 直接调用ASGI application
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SETTINGS = """
+SECRET_KEY = "benchmark"
+DEBUG = False
+INSTALLED_APPS = []
+ROOT_URLCONF = "bench_urls"
+MIDDLEWARE = []
+LOGGING_CONFIG = None
+"""
+
+URLS = """
+from django.http import StreamingHttpResponse
+from django.urls import path
+
+CHUNKS = %d
+
+
+def sync_stream(request):
+    return StreamingHttpResponse(b"x" * 1024 for _ in range(CHUNKS))
+
+
+async def async_stream(request):
+    async def content():
+        for _ in range(CHUNKS):
+            yield b"x" * 1024
+
+    return StreamingHttpResponse(content())
+
+
+urlpatterns = [
+    path("sync/", sync_stream),
+    path("async/", async_stream),
+]
+"""
+
+MIDDLEWARE = """
+class AsyncMiddleware:
+    sync_capable = False
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    async def __call__(self, request):
+        return await self.get_response(request)
+
+
+class SyncMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+"""
+
+
+def write_project(directory, chunks):
+    files = {
+        "bench_settings.py": SETTINGS,
+        "bench_urls.py": URLS % chunks,
+        "bench_middleware.py": MIDDLEWARE,
+    }
+    for name, source in files.items():
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(source)
+
+
+async def client(application, path, delay, stats):
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 慢客户端在响应结束之前不会断开
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            stats["bytes"] += len(message["body"])
+            stats["threads"] = max(stats["threads"], threading.active_count())
+            await asyncio.sleep(delay)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+    }
+    await application(scope, receive, send)
+
+
+async def run(application, path, concurrency, delay):
+    stats = {"bytes": 0, "threads": 0}
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(application, path, delay, stats) for _ in range(concurrency))
+    )
+    return time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-c", type=int, default=2000, help="并发客户端数")
+    parser.add_argument("-k", type=int, default=10, help="每个响应的块数")
+    parser.add_argument("--delay", type=float, default=0.01, help="客户端接收每块的耗时")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="asgi_bench_")
+    write_project(directory, args.k)
+    sys.path.insert(0, directory)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "bench_settings"
+
+    import django
+    from django.conf import settings
+    from django.core.handlers.asgi import ASGIHandler
+
+    django.setup(set_prefix=False)
+
+    print(
+        "%d clients, %d chunks each, %.0f ms per chunk"
+        % (args.c, args.k, args.delay * 1e3)
+    )
+    modes = (
+        ("async", "/async/", "bench_middleware.AsyncMiddleware"),
+        ("sync", "/sync/", "bench_middleware.SyncMiddleware"),
+    )
+    for label, path, middleware in modes:
+        # 中间件在创建handler时加载
+        with settings.override(MIDDLEWARE=[middleware]):
+            application = ASGIHandler()
+        elapsed, stats = asyncio.run(run(application, path, args.c, args.delay))
+        print(
+            "%-6s %8.1f ms  %8.0f requests/s  %6.1f MB sent  max threads %d"
+            % (
+                label,
+                elapsed * 1e3,
+                args.c / elapsed,
+                stats["bytes"] / 2 ** 20,
+                stats["threads"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
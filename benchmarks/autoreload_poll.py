@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :autoreload_poll.py
+# @Author   :Lowell
+# @Time     :2022/4/12 10:36
+"""
+对比轮询方式的autoreload在大量文件下的CPU占用和发现变化的延迟
+
+    python benchmarks/autoreload_poll.py [--files 文件数量] [--dirs 目录数量] [--interval 检查间隔]
+
+会在临时目录中生成文件, 分别统计:
+    - 每次检查都stat所有文件(原来的StatReloader)占用的CPU比例
+    - 增量索引占用的CPU比例
+    - 增量索引发现重命名保存(编辑器常用)和原地修改的延迟
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from django.utils import autoreload  # noqa: E402
+
+
+def write_files(directory, file_count, dir_count):
+    paths = []
+    for i in range(dir_count):
+        os.makedirs(os.path.join(directory, "pkg%d" % i))
+    for i in range(file_count):
+        path = os.path.join(directory, "pkg%d" % (i % dir_count), "mod%d.py" % i)
+        with open(path, "w") as fp:
+            fp.write("X = 1\n")
+        paths.append(Path(path))
+    return paths
+
+
+def naive(paths, interval, seconds):
+    """每次检查stat所有文件, 返回占用的CPU比例"""
+    checks = 0
+    start = time.process_time()
+    wall = time.perf_counter()
+    while time.perf_counter() - wall < seconds:
+        for path in paths:
+            path.stat()
+        checks += 1
+        time.sleep(interval)
+    return (time.process_time() - start) / (time.perf_counter() - wall), checks
+
+
+class BenchReloader(autoreload.StatReloader):
+    def __init__(self, paths, interval):
+        super().__init__()
+        self.extra_files.update(paths)
+        self.SLEEP_TIME = interval
+        self.changes = []
+
+    def notify_file_changed(self, path):
+        self.changes.append((time.perf_counter(), path))
+
+
+def incremental(paths, interval, seconds, budget):
+    reloader = BenchReloader(paths, interval)
+    reloader.CPU_BUDGET = budget
+    ticker = reloader.tick()
+    # 第一次检查所有文件, 建立索引
+    next(ticker)
+
+    # 在这个线程中轮询, process_time统计整个进程, 所以主线程只sleep
+    start = time.process_time()
+    wall = time.perf_counter()
+
+    def poll():
+        while not reloader.should_stop:
+            next(ticker)
+
+    thread = threading.Thread(target=poll, daemon=True)
+    thread.start()
+    time.sleep(seconds)
+    cpu = (time.process_time() - start) / (time.perf_counter() - wall)
+
+    # 重命名保存: 写入临时文件后替换原文件, 目录的mtime会变化
+    target = paths[len(paths) // 2]
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text("X = 2\n")
+    changed_at = time.perf_counter()
+    os.replace(tmp, target)
+    rename = wait_for(reloader, target, changed_at)
+
+    # 原地修改: 目录的mtime不变, 要等游标轮到这个文件
+    target = paths[len(paths) // 3]
+    time.sleep(0.01)
+    changed_at = time.perf_counter()
+    with open(target, "a") as fp:
+        fp.write("Y = 2\n")
+    in_place = wait_for(reloader, target, changed_at)
+
+    reloader.stop()
+    return cpu, rename, in_place
+
+
+def wait_for(reloader, target, since, timeout=60):
+    target = str(target)
+    while time.perf_counter() - since < timeout:
+        for seen, path in reloader.changes:
+            if path == target and seen >= since:
+                return seen - since
+        time.sleep(0.005)
+    return float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--dirs", type=int, default=2500)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--budget", type=float, default=autoreload.StatReloader.CPU_BUDGET)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_files(tmp, args.files, args.dirs)
+        print("%d files in %d directories, checked every %ss" % (
+            args.files, args.dirs, args.interval))
+
+        cpu, checks = naive(paths, args.interval, args.seconds)
+        print("full stat    CPU %5.1f%%  (%d checks)" % (cpu * 100, checks))
+
+        cpu, rename, in_place = incremental(
+            paths, args.interval, args.seconds, args.budget
+        )
+        print("incremental  CPU %5.1f%%  (budget %.1f%%)" % (cpu * 100, args.budget * 100))
+        print("  rename save detected after %7.3f s" % rename)
+        print("  in-place edit detected after %7.3f s" % in_place)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :command_index.py
+# @Author   :Lowell
+# @Time     :2022/4/8 16:20
+"""
+对比manage.py help --commands的耗时, 开启/关闭命令索引
+
+    python benchmarks/command_index.py [-n 运行次数] [--apps 应用数量]
+
+会生成一个临时项目, 其中每个应用都有若干个管理命令.
+分别统计整个manage.py help --commands进程的耗时, 以及进程内get_commands()的耗时,
+前者主要是导入django和应用的时间
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMAND = """from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    pass
+"""
+
+
+# 在新的解释器中只统计get_commands()的耗时
+PROBE = """
+import time
+import django
+django.setup()
+from django.core.management import get_commands
+start = time.perf_counter()
+get_commands()
+print(time.perf_counter() - start)
+"""
+
+
+def write_project(directory, app_count, command_count):
+    apps = []
+    for i in range(app_count):
+        app = "benchapp%d" % i
+        commands_dir = os.path.join(directory, app, "management", "commands")
+        os.makedirs(commands_dir)
+        for package in (app, "%s/management" % app, "%s/management/commands" % app):
+            open(os.path.join(directory, package, "__init__.py"), "w").close()
+        for j in range(command_count):
+            with open(os.path.join(commands_dir, "%s_cmd%d.py" % (app, j)), "w") as fp:
+                fp.write(COMMAND)
+        apps.append(app)
+    with open(os.path.join(directory, "benchsettings.py"), "w") as fp:
+        fp.write("SECRET_KEY = 'benchmark'\nLOGGING_CONFIG = ''\n")
+        fp.write("INSTALLED_APPS = %r\n" % apps)
+    return "benchsettings"
+
+
+def run(count, env):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, "manage.py"), "help", "--commands"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def probe(count, env):
+    timings = []
+    for _ in range(count):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output))
+    return timings
+
+
+def report(label, timings):
+    print(
+        "%-22s median %7.2f ms   min %7.2f ms"
+        % (label, statistics.median(timings) * 1e3, min(timings) * 1e3)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20)
+    parser.add_argument("--apps", type=int, default=80)
+    parser.add_argument("--commands", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=write_project(tmp, args.apps, args.commands),
+            PYTHONPATH=os.pathsep.join([ROOT, tmp]),
+        )
+        env.pop("DJANGO_COMMAND_INDEX", None)
+        report("scan  help --commands", run(args.n, env))
+        report("scan  get_commands()", probe(args.n, env))
+
+        env["DJANGO_COMMAND_INDEX"] = os.path.join(tmp, "commands.index")
+        # 第一次运行生成索引
+        run(1, env)
+        report("index help --commands", run(args.n, env))
+        report("index get_commands()", probe(args.n, env))
+
+
+if __name__ == "__main__":
+    main()
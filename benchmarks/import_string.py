@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :import_string.py
+# @Author   :Lowell
+# @Time     :2022/4/12 15:08
+"""
+对比重复调用import_string()的耗时, 不缓存(原来的实现)和缓存
+
+    python benchmarks/import_string.py [-n 每轮调用次数]
+
+分别统计导入成功、模块不存在、模块中没有这个属性三种情况
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from django.utils.module_loading import _import_string, import_string  # noqa: E402
+
+CASES = [
+    ("found", "logging.handlers.RotatingFileHandler"),
+    ("missing module", "benchmark_missing.module.Handler"),
+    ("missing attribute", "logging.handlers.MissingHandler"),
+]
+
+
+def call(func, dotted_path):
+    def run():
+        try:
+            func(dotted_path)
+        except ImportError:
+            pass
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("-r", type=int, default=5)
+    args = parser.parse_args()
+
+    for label, dotted_path in CASES:
+        for name, func in (("uncached", _import_string), ("cached", import_string)):
+            best = min(
+                timeit.repeat(call(func, dotted_path), number=args.n, repeat=args.r)
+            )
+            print("%-18s %-9s %8.1f ns/call" % (label, name, best / args.n * 1e9))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :json_logging.py
+# @Author   :Lowell
+# @Time     :2022/4/14 15:40
+"""
+对比格式化日志记录的耗时: logging.Formatter, 复制record.__dict__再json.dumps, JsonFormatter
+
+    python benchmarks/json_logging.py [-n 记录数]
+
+只统计format()的耗时, 记录预先创建好
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+
+from django.utils.log import JsonFormatter, log_context  # noqa: E402
+
+
+class DictJsonFormatter(logging.Formatter):
+    """常见的写法: 复制整个record.__dict__后序列化"""
+
+    def format(self, record):
+        data = dict(record.__dict__)
+        data["message"] = record.getMessage()
+        data.pop("args", None)
+        data.pop("msg", None)
+        return json.dumps(data, default=str)
+
+
+def make_records(count):
+    logger = logging.getLogger("django.server")
+    return [
+        logger.makeRecord(
+            logger.name,
+            logging.INFO,
+            __file__,
+            1,
+            '"GET /items/%s HTTP/1.1" %s 1234',
+            (i, 200),
+            None,
+            extra={"status_code": 200},
+        )
+        for i in range(count)
+    ]
+
+
+def run(formatter, count):
+    records = make_records(count)
+    start = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("-r", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        (
+            "logging.Formatter",
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"),
+        ),
+        ("dict + json.dumps", DictJsonFormatter()),
+        ("JsonFormatter", JsonFormatter()),
+    ]
+    with log_context(command="benchmark"):
+        for label, formatter in cases:
+            best = min(run(formatter, args.n) for _ in range(args.r))
+            print(
+                "%-18s %7.1f ms  %8.0f records/s"
+                % (label, best * 1e3, args.n / best)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :lazy_object.py
+# @Author   :Lowell
+# @Time     :2022/4/4 10:12
+"""
+对比直接访问、SimpleLazyObject和CompiledSimpleLazyObject初始化之后的访问耗时
+
+    python benchmarks/lazy_object.py [-n 循环次数]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.utils.functional import (  # noqa: E402
+    CompiledSimpleLazyObject,
+    SimpleLazyObject,
+)
+
+
+class Row(tuple):
+    """可以设置属性的元组, 同时支持getattr和各种特殊方法"""
+
+
+def make_row():
+    row = Row(range(10))
+    row.name = "row"
+    return row
+
+
+OPERATIONS = {
+    "getattr": "obj.name",
+    "__getitem__": "obj[3]",
+    "__iter__": "for _ in obj: pass",
+    "__len__": "len(obj)",
+    "__hash__": "hash(obj)",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=200000)
+    args = parser.parse_args()
+
+    subjects = {
+        "eager": make_row(),
+        "lazy": SimpleLazyObject(make_row),
+        "compiled": CompiledSimpleLazyObject(make_row),
+    }
+    # 先触发初始化, 只比较初始化之后的开销
+    for obj in subjects.values():
+        len(obj)
+
+    print("%-12s" % "" + "".join("%12s" % label for label in subjects))
+    for operation, stmt in OPERATIONS.items():
+        row = "%-12s" % operation
+        for obj in subjects.values():
+            best = min(timeit.repeat(stmt, globals={"obj": obj}, number=args.n))
+            row += "%9.1f ns" % (best / args.n * 1e9)
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :logging_throughput.py
+# @Author   :Lowell
+# @Time     :2022/4/14 09:52
+"""
+对比django.utils.log中过滤器和ServerFormatter的吞吐量(每秒日志记录数)
+
+    python benchmarks/logging_throughput.py [-n 记录数]
+
+naive是每条记录都通过LazySettings读取DEBUG、每条记录都调用strftime和判断状态码的实现,
+cached是django.utils.log中的实现. 处理器写入os.devnull
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+
+from django.conf import settings  # noqa: E402
+
+from django.core.management.color import color_style  # noqa: E402
+from django.utils.log import RequireDebugTrue, ServerFormatter  # noqa: E402
+
+
+class NaiveRequireDebugTrue(logging.Filter):
+    def filter(self, record):
+        return settings.DEBUG
+
+
+class NaiveServerFormatter(logging.Formatter):
+    default_time_format = "%d/%b/%Y %H:%M:%S"
+
+    def __init__(self, *args, **kwargs):
+        self.style = color_style()
+        super().__init__(*args, **kwargs)
+
+    def format(self, record):
+        msg = record.msg
+        status_code = getattr(record, "status_code", None)
+        if status_code:
+            if 200 <= status_code < 300:
+                msg = self.style.HTTP_SUCCESS(msg)
+            elif status_code == 404:
+                msg = self.style.HTTP_NOT_FOUND(msg)
+            else:
+                msg = self.style.HTTP_SERVER_ERROR(msg)
+        if self._fmt.find("{server_time}") >= 0 and not hasattr(record, "server_time"):
+            record.server_time = self.formatTime(record, self.datefmt)
+        record.msg = msg
+        return super().format(record)
+
+
+def make_logger(name, filter_class, formatter_class, stream):
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.handlers.clear()
+    handler = logging.StreamHandler(stream)
+    handler.addFilter(filter_class())
+    handler.setFormatter(formatter_class("[{server_time}] {message}", style="{"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def run(logger, count):
+    codes = (200, 200, 200, 304, 404, 500)
+    start = time.perf_counter()
+    for i in range(count):
+        code = codes[i % len(codes)]
+        logger.info('"GET /%s HTTP/1.1" %s 1234', i, code, extra={"status_code": code})
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("-r", type=int, default=3)
+    args = parser.parse_args()
+
+    # 两种实现都需要DEBUG为True才会写入记录
+    settings.DEBUG = True
+    with open(os.devnull, "w") as stream:
+        cases = [
+            (
+                "naive",
+                make_logger(
+                    "bench.naive", NaiveRequireDebugTrue, NaiveServerFormatter, stream
+                ),
+            ),
+            (
+                "cached",
+                make_logger("bench.cached", RequireDebugTrue, ServerFormatter, stream),
+            ),
+        ]
+        for label, logger in cases:
+            best = max(run(logger, args.n) for _ in range(args.r))
+            print("%-8s %10.0f records/s" % (label, best))
+
+
+if __name__ == "__main__":
+    main()
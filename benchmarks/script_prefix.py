@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :script_prefix.py
+# @Author   :Lowell
+# @Time     :2022/4/16 17:00
+"""
+对比asgiref Local和ContextVar保存脚本前缀的耗时, 并检查并发请求之间的前缀是否互相干扰
+
+    python benchmarks/script_prefix.py [-n 读取次数] [-c 并发任务数]
+
+并发检查: c个asyncio任务各自用override_script_prefix设置不同的前缀, 交替让出事件循环后
+检查get_script_prefix()和相对路径的STATIC_URL是否还是自己的前缀
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SETTINGS = """
+SECRET_KEY = "benchmark"
+DEBUG = False
+INSTALLED_APPS = []
+ROOT_URLCONF = None
+MIDDLEWARE = []
+LOGGING_CONFIG = None
+STATIC_URL = "static/"
+"""
+
+
+def bench(func, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        func()
+    return time.perf_counter() - start
+
+
+async def check_task(index, rounds):
+    from django.conf import settings
+    from django.urls import get_script_prefix, override_script_prefix
+
+    prefix = "/app%d/" % index
+    errors = 0
+    with override_script_prefix(prefix):
+        for _ in range(rounds):
+            await asyncio.sleep(0)
+            if get_script_prefix() != prefix:
+                errors += 1
+            if settings.STATIC_URL != prefix + "static/":
+                errors += 1
+    return errors
+
+
+async def check(concurrency, rounds):
+    results = await asyncio.gather(
+        *(check_task(i, rounds) for i in range(concurrency))
+    )
+    return sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000000, help="读取次数")
+    parser.add_argument("-c", type=int, default=1000, help="并发任务数")
+    parser.add_argument("-r", type=int, default=20, help="每个任务检查的次数")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="prefix_bench_")
+    with open(os.path.join(directory, "bench_settings.py"), "w") as f:
+        f.write(SETTINGS)
+    sys.path.insert(0, directory)
+    os.environ["DJANGO_SETTINGS_MODULE"] = "bench_settings"
+
+    from asgiref.local import Local
+
+    from django.conf import settings
+    from django.urls import get_script_prefix, set_script_prefix
+
+    local = Local()
+    local.value = "/app/"
+    var = ContextVar("bench_prefix", default="/")
+    var.set("/app/")
+
+    def local_get():
+        return getattr(local, "value", "/")
+
+    def local_set():
+        local.value = "/app/"
+
+    cases = (
+        ("Local get", local_get),
+        ("ContextVar get", var.get),
+        ("Local set", local_set),
+        ("ContextVar set", lambda: var.set("/app/")),
+        ("get_script_prefix", get_script_prefix),
+    )
+    print("%d operations" % args.n)
+    for label, func in cases:
+        elapsed = bench(func, args.n)
+        print("%-18s %8.3f us/op" % (label, elapsed / args.n * 1e6))
+
+    set_script_prefix("/app/")
+    elapsed = bench(lambda: settings.STATIC_URL, args.n)
+    print("%-18s %8.3f us/op  (%s)" % ("STATIC_URL", elapsed / args.n * 1e6, settings.STATIC_URL))
+
+    errors = asyncio.run(check(args.c, args.r))
+    print(
+        "%d tasks x %d checks, %d mismatches" % (args.c, args.r, errors)
+    )
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
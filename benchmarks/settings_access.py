@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :settings_access.py
+# @Author   :Lowell
+# @Time     :2022/4/3 15:40
+"""
+每次读取settings配置的耗时, 对比冻结前后
+
+    python benchmarks/settings_access.py [-n 循环次数]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mysite.settings")
+
+
+def measure(label, number):
+    from django.conf import settings
+
+    per_access = min(
+        timeit.repeat("settings.DEBUG", globals={"settings": settings}, number=number)
+    ) / number
+    print("%-8s %6.1f ns/access" % (label, per_access * 1e9))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000000)
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    django.setup()
+    # 先访问一次, 让配置缓存到__dict__中
+    settings.DEBUG
+    measure("lazy", args.n)
+    settings.freeze()
+    measure("frozen", args.n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :settings_snapshot.py
+# @Author   :Lowell
+# @Time     :2022/4/2 11:05
+"""
+对比冷启动时首次访问settings.INSTALLED_APPS的耗时, 开启/关闭settings快照
+
+    python benchmarks/settings_snapshot.py [-n 运行次数] [--settings 模块]
+
+默认同时测试mysite.settings和一个生成的settings模块, 后者和实际项目一样
+会导入一些标准库模块并定义较多的配置项.
+
+参考结果(中位数, 每个进程首次访问settings.INSTALLED_APPS):
+
+    模块                 reflect     snapshot
+    mysite.settings      约14.2 ms   约18.1 ms  (变慢)
+    benchsettings        约56 ms     约16 ms
+
+命中快照的固定开销主要来自反序列化: settings里的Path对象(BASE_DIR)会导入pathlib.
+只有settings模块本身的导入开销很大时(导入较多模块, 配置项很多), 开启快照才划算.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 每次都在新的解释器里运行, 只统计首次访问settings的耗时
+PROBE = """
+import time
+from django.conf import settings
+start = time.perf_counter()
+settings.INSTALLED_APPS
+print(time.perf_counter() - start)
+"""
+
+
+# 模拟实际项目的settings模块
+SYNTHETIC_SETTINGS = """
+import decimal
+import email.utils
+import http.cookies
+import json
+import logging.handlers
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+SECRET_KEY = "benchmark"
+INSTALLED_APPS = []
+%s
+"""
+
+
+def write_synthetic_settings(directory):
+    extra = "\n".join(
+        "SETTING_%d = {'value': %d, 'items': [1, 2, 3]}" % (i, i) for i in range(150)
+    )
+    with open(os.path.join(directory, "benchsettings.py"), "w") as fp:
+        fp.write(SYNTHETIC_SETTINGS % extra)
+    return "benchsettings"
+
+
+def run(count, env):
+    timings = []
+    for _ in range(count):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        timings.append(float(output))
+    return timings
+
+
+def report(label, timings):
+    print(
+        "%-10s median %8.1f us   min %8.1f us"
+        % (label, statistics.median(timings) * 1e6, min(timings) * 1e6)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=30)
+    parser.add_argument("--settings", action="append")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modules = args.settings or ["mysite.settings", write_synthetic_settings(tmp)]
+        for module in modules:
+            print(module)
+            env = dict(
+                os.environ,
+                DJANGO_SETTINGS_MODULE=module,
+                PYTHONPATH=os.pathsep.join([ROOT, tmp]),
+            )
+            env.pop("DJANGO_SETTINGS_SNAPSHOT", None)
+            report("reflect", run(args.n, env))
+
+            env["DJANGO_SETTINGS_SNAPSHOT"] = os.path.join(tmp, "%s.snapshot" % module)
+            # 第一次运行生成快照
+            run(1, env)
+            report("snapshot", run(args.n, env))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :url_resolve.py
+# @Author   :Lowell
+# @Time     :2022/4/16 14:30
+"""
+对比前缀树解析和按顺序逐条正则匹配的耗时
+
+    python benchmarks/url_resolve.py [-r 路由数] [-n 解析次数]
+
+生成形如api/v1/resource<i>/, api/v1/resource<i>/<int:pk>/,
+api/v1/resource<i>/<int:pk>/items/<slug:item>/的路由, 从全部路由中随机抽取路径解析
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from django.urls import path, register_converter  # noqa: E402
+from django.urls.resolvers import URLResolver, _route_to_regex  # noqa: E402
+
+
+def view(request, **kwargs):
+    pass
+
+
+def make_urlconf(count):
+    templates = (
+        ("api/v1/resource%d/", "resource%d/"),
+        ("api/v1/resource%d/<int:pk>/", "resource%d/%d/"),
+        ("api/v1/resource%d/<int:pk>/items/<slug:item>/", "resource%d/%d/items/x-%d/"),
+    )
+    patterns = []
+    paths = []
+    for i in range(count):
+        route, example = templates[i % len(templates)]
+        resource = i // len(templates)
+        patterns.append(path(route % resource, view, name="route-%d" % i))
+        values = (resource,) + (i,) * (example.count("%d") - 1)
+        paths.append("/api/v1/" + example % values)
+    return types.SimpleNamespace(urlpatterns=patterns), paths
+
+
+class YearMonthConverter:
+    regex = "[0-9]{4}/[0-9]{2}"
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+class DigitsConverter(YearMonthConverter):
+    regex = "[0-9/]+"
+
+
+register_converter(YearMonthConverter, "ym")
+register_converter(DigitsConverter, "ds")
+
+# 正则能匹配"/"的自定义转换器, 检查前缀树把它们放在剩余路径上整体匹配
+EXTRA_ROUTES = (
+    ("archive/<ym:month>/", "/archive/2020/01/"),
+    ("n/<ds:nums>", "/n/1/2"),
+)
+
+
+class LinearResolver:
+    """按照urlconf的顺序逐条用正则匹配, 第一条匹配的路由生效"""
+
+    def __init__(self, urlconf):
+        self.patterns = []
+        for pattern in urlconf.urlpatterns:
+            regex, converters = _route_to_regex(pattern.route)
+            self.patterns.append((re.compile(regex).fullmatch, converters, pattern))
+
+    def resolve(self, path):
+        path = path[1:]
+        for fullmatch, converters, pattern in self.patterns:
+            match = fullmatch(path)
+            if match is not None:
+                return pattern, {
+                    key: converters[key].to_python(value)
+                    for key, value in match.groupdict().items()
+                }
+        raise LookupError(path)
+
+
+def bench(resolve, paths, count):
+    start = time.perf_counter()
+    for i in range(count):
+        resolve(paths[i % len(paths)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", type=int, default=10000, help="路由数")
+    parser.add_argument("-n", type=int, default=20000, help="解析次数")
+    args = parser.parse_args()
+
+    urlconf, paths = make_urlconf(args.r)
+    for i, (route, sample) in enumerate(EXTRA_ROUTES):
+        urlconf.urlpatterns.append(path(route, view, name="extra-%d" % i))
+    random.seed(0)
+    random.shuffle(paths)
+
+    start = time.perf_counter()
+    resolver = URLResolver("", urlconf)
+    resolver.populate()
+    elapsed = time.perf_counter() - start
+    print("%d routes, trie compiled in %.1f ms" % (args.r, elapsed * 1e3))
+
+    linear = LinearResolver(urlconf)
+    # 两种方式的解析结果必须一致
+    for sample in paths[:200] + [sample for route, sample in EXTRA_ROUTES]:
+        match = resolver.resolve(sample)
+        pattern, kwargs = linear.resolve(sample)
+        assert (match.url_name, match.kwargs) == (pattern.name, kwargs), sample
+
+    # 按顺序匹配太慢, 只解析一小部分
+    linear_count = max(1, args.n // 100)
+    elapsed = bench(linear.resolve, paths, linear_count)
+    print("linear   %9.2f us/resolve" % (elapsed / linear_count * 1e6))
+    elapsed = bench(resolver.resolve, paths, args.n)
+    print("trie     %9.2f us/resolve" % (elapsed / args.n * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :url_reverse.py
+# @Author   :Lowell
+# @Time     :2022/4/16 16:20
+"""
+对比reverse()和每次都重新拼接, 校验整条路由正则的写法的耗时
+
+    python benchmarks/url_reverse.py [-r 路由数] [-l 每个响应的链接数] [-p 响应数]
+
+模拟序列化响应时为每个对象生成链接, 每个响应包含l个链接
+"""
+import argparse
+import os
+import re
+import sys
+import time
+import types
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from django.urls import path  # noqa: E402
+from django.urls.resolvers import URLResolver, _route_to_regex  # noqa: E402
+
+
+def view(request, **kwargs):
+    pass
+
+
+def make_urlconf(count):
+    patterns = []
+    for i in range(count // 2):
+        patterns.append(path("api/v1/resource%d/" % i, view, name="resource%d-list" % i))
+        patterns.append(
+            path(
+                "api/v1/resource%d/<int:pk>/items/<slug:item>/" % i,
+                view,
+                name="resource%d-item" % i,
+            )
+        )
+    return types.SimpleNamespace(urlpatterns=patterns)
+
+
+class NaiveReverser:
+    """每次反查都把参数转换后填进路由, 再用整条路由的正则校验结果"""
+
+    def __init__(self, urlconf):
+        self.possibilities = {}
+        for pattern in urlconf.urlpatterns:
+            regex, converters = _route_to_regex(pattern.route)
+            self.possibilities.setdefault(pattern.name, []).append(
+                (pattern.route, regex, converters)
+            )
+
+    def reverse(self, name, kwargs):
+        for route, regex, converters in self.possibilities[name]:
+            if set(kwargs) != set(converters):
+                continue
+            text = {k: converters[k].to_url(v) for k, v in kwargs.items()}
+            candidate = re.sub(
+                r"<(?:[^>:]+:)?([^>]+)>", lambda m: "%%(%s)s" % m[1], route
+            ) % text
+            if re.search("^%s" % regex, candidate):
+                return "/" + quote(candidate, safe="!$&'()*+,;=/~:@")
+        raise LookupError(name)
+
+
+def bench(reverse, calls, payloads):
+    start = time.perf_counter()
+    for _ in range(payloads):
+        for name, kwargs in calls:
+            reverse(name, kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-r", type=int, default=2000, help="路由数")
+    parser.add_argument("-l", type=int, default=300, help="每个响应的链接数")
+    parser.add_argument("-p", type=int, default=100, help="响应数")
+    args = parser.parse_args()
+
+    urlconf = make_urlconf(args.r)
+    resolver = URLResolver("", urlconf)
+    resolver.populate()
+    naive = NaiveReverser(urlconf)
+
+    calls = []
+    for i in range(args.l):
+        resource = i % 20
+        if i % 3:
+            calls.append(("resource%d-item" % resource, {"pk": i, "item": "item-%d" % i}))
+        else:
+            calls.append(("resource%d-list" % resource, {}))
+
+    def cached_reverse(name, kwargs):
+        return "/" + resolver.reverse(name, (), kwargs)
+
+    for name, kwargs in calls:
+        assert cached_reverse(name, kwargs) == naive.reverse(name, kwargs)
+
+    links = args.l * args.p
+    print("%d routes, %d payloads x %d links" % (args.r, args.p, args.l))
+    for label, reverse in (("naive", naive.reverse), ("reverse", cached_reverse)):
+        elapsed = bench(reverse, calls, args.p)
+        print(
+            "%-8s %7.2f us/link  %7.2f ms/payload"
+            % (label, elapsed / links * 1e6, elapsed / args.p * 1e3)
+        )
+    print(resolver._reverse_candidates.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,65 @@
 # @FileName :__init__.py.py
 # @Author   :Lowell
 # @Time     :2022/3/29 12:27
-from django.utils.version import get_version
-
 VERSION = (4, 1, 0, "alpha", 0)
 
-__version__ = get_version(VERSION)
+
+def __getattr__(name):
+    # 开发版本的版本号可能需要执行git log, 在第一次使用时才计算
+    if name in ("__version__", "get_version"):
+        global __version__, get_version
+        from django.utils.version import get_version
+
+        __version__ = get_version(VERSION)
+        return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 def setup(set_prefix=True):
     """
+    配置settings, 日志, 脚本前缀, 并加载应用注册表
 
+    设置环境变量DJANGO_STARTUP_PROFILE时会记录每个阶段的耗时,
+    见django.utils.startup
     """
-    from django.apps import apps
-    from django.conf import settings
-    from django.urls import set_script_prefix
-    from django.utils.log import configure_logging
-
-    configure_logging(settings.LOGGING_CONFIG, settings.LOGGING)
-    if set_prefix:
-        set_script_prefix(
-            "/" if settings.FORCE_SCRIPT_NAME is None else settings.FORCE_SCRIPT_NAME
-        )
-    apps.populate(settings.INSTALLED_APPS)
+    from django.utils.startup import finish_profiling, start_profiling
+
+    profiler = start_profiling()
+    try:
+        with profiler.phase("settings"):
+            from django.conf import settings
+
+            settings.INSTALLED_APPS
+
+        with profiler.phase("configure_logging"):
+            from django.utils.log import configure_logging
+
+            configure_logging(
+                settings.LOGGING_CONFIG,
+                settings.LOGGING,
+                queue_size=settings.LOGGING_QUEUE_SIZE,
+                queue_overflow=settings.LOGGING_QUEUE_OVERFLOW,
+            )
+
+        if set_prefix:
+            with profiler.phase("set_script_prefix"):
+                from django.urls import set_script_prefix
+
+                set_script_prefix(
+                    "/"
+                    if settings.FORCE_SCRIPT_NAME is None
+                    else settings.FORCE_SCRIPT_NAME
+                )
+
+        with profiler.phase("populate"):
+            from django.apps import apps
+
+            apps.populate(
+                settings.INSTALLED_APPS, import_workers=settings.APPS_IMPORT_WORKERS
+            )
+
+        if settings.FREEZE_SETTINGS:
+            with profiler.phase("freeze_settings"):
+                settings.freeze()
+    finally:
+        finish_profiling()
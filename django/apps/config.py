@@ -3,7 +3,6 @@
 # @FileName :config.py
 # @Author   :Lowell
 # @Time     :2022/3/30 16:42
-import inspect
 import os
 from importlib import import_module
 
@@ -14,6 +13,19 @@ APPS_MODULE_NAME = "apps"
 MODELS_MODULE_NAME = "models"
 
 
+def _get_classes(module):
+    """
+    返回模块中所有的类, 按名字排序, 和inspect.getmembers(module, inspect.isclass)相同
+
+    导入inspect很慢, 启动时不需要它
+    """
+    return sorted(
+        (name, value)
+        for name, value in vars(module).items()
+        if isinstance(value, type)
+    )
+
+
 class AppConfig:
     """Django应用程序及其配置"""
 
@@ -105,7 +117,7 @@ class AppConfig:
                 # 排除那些定义`default=False`的app配置
                 app_configs = [
                     (name, candidate)
-                    for name, candidate in inspect.getmembers(mod, inspect.isclass)
+                    for name, candidate in _get_classes(mod)
                     if (
                         issubclass(candidate, cls)
                         and candidate is not classmethod
@@ -151,7 +163,7 @@ class AppConfig:
                 mod = import_module(mod_path)
                 candidates = [
                     repr(name)
-                    for name, candidate in inspect.getmembers(mod, inspect.isclass)
+                    for name, candidate in _get_classes(mod)
                     if issubclass(candidate, cls) and candidate is not cls
                 ]
                 msg = "Module '%s' does not contain a '%s' class." % (
@@ -193,6 +205,35 @@ class AppConfig:
         # 返回一个AppConfig类
         return app_config_class(app_name, app_module)
 
+    def get_model(self, model_name, require_ready=True):
+        """
+        根据不区分大小写的model_name返回模型类, 没有对应的模型时抛出LookupError
+        """
+        if require_ready:
+            self.apps.check_models_ready()
+        else:
+            self.apps.check_apps_ready()
+        try:
+            return self.models[model_name.lower()]
+        except KeyError:
+            raise LookupError(
+                "App '%s' doesn't have a '%s' model." % (self.label, model_name)
+            )
+
+    def get_models(self, include_auto_created=False, include_swapped=False):
+        """
+        返回这个应用中所有模型的迭代器
+
+        默认不包括自动创建的多对多中间表模型和被替换的模型
+        """
+        self.apps.check_models_ready()
+        for model in self.models.values():
+            if model._meta.auto_created and not include_auto_created:
+                continue
+            if model._meta.swapped and not include_swapped:
+                continue
+            yield model
+
     def import_models(self):
         self.models = self.apps.all_models[self.label]
 
@@ -200,3 +241,7 @@ class AppConfig:
             models_module_name = "%s.%s" % (self.name, MODELS_MODULE_NAME)
             self.models_module = import_module(models_module_name)
 
+    def ready(self):
+        """
+        子类中重写此方法, 在django启动时执行代码
+        """
@@ -6,10 +6,15 @@
 import functools
 import sys
 import threading
+import time
+import warnings
 from collections import defaultdict, Counter
+from importlib import import_module
 
-from django.apps.config import AppConfig
+from django.apps.config import APPS_MODULE_NAME, AppConfig
 from django.core.exceptions import ImproperlyConfigured, AppRegistryNotReady
+from django.utils.module_loading import module_has_submodule
+from django.utils.startup import get_profiler
 
 
 class Apps:
@@ -47,20 +52,26 @@ class Apps:
         self._lock = threading.RLock()
         self.loading = False
 
-        # Maps ("app_label", "modelname") tuples to lists of functions to be
-        # called when the corresponding model is ready. Used by this class's
+        # Maps ("app_label", "modelname") tuples to lists of (operation, index)
+        # pairs waiting for the corresponding model. Used by this class's
         # `lazy_model_operation()` and `do_pending_operations()` methods.
         self._pending_operations = defaultdict(list)
 
+        # 将INSTALLED_APPS中的每一项映射到导入该应用花费的时间(秒)
+        self.import_timings = {}
+
         if installed_apps is not None:
             self.populate(installed_apps)
 
-    def populate(self, installed_apps=None):
+    def populate(self, installed_apps=None, import_workers=None):
         """
         加载配置和模型
 
         导入每个应用模块以及相应的模型
         这是线程安全且幂等的, 但不可重入
+
+        如果import_workers大于1, 阶段1会先用线程池并行导入应用模块,
+        之后仍然按照INSTALLED_APPS的顺序逐个注册
         """
         if self.ready:
             return
@@ -77,20 +88,39 @@ class Apps:
                 raise RuntimeError("populate() isn`t reentrant")
             self.loading = True
 
+            profiler = get_profiler()
+
             # 阶段1: 初始化应用程序配置并导入应用程序模块
-            for entry in installed_apps:
-                if isinstance(entry, AppConfig):
-                    app_config = entry
-                else:
-                    app_config = AppConfig.create(entry)
-                if app_config.label in self.app_configs:
-                    raise ImproperlyConfigured(
-                        "Application labels aren't unique, "
-                        "duplicates: %s" % app_config.label
+            if import_workers and import_workers > 1:
+                with profiler.phase("apps.import"):
+                    self.import_timings = self._import_app_modules(
+                        installed_apps, import_workers
                     )
-
-                self.app_configs[app_config.label] = app_config
-                app_config.apps = self
+                for entry, seconds in self.import_timings.items():
+                    profiler.add_app("apps.import", entry, seconds)
+            else:
+                self.import_timings = {}
+
+            with profiler.phase("apps.configs"):
+                for entry in installed_apps:
+                    if isinstance(entry, AppConfig):
+                        app_config = entry
+                    else:
+                        with profiler.app("apps.configs", entry):
+                            start = time.perf_counter()
+                            app_config = AppConfig.create(entry)
+                        # 串行导入时, 导入应用的时间就是创建AppConfig的时间
+                        self.import_timings.setdefault(
+                            entry, time.perf_counter() - start
+                        )
+                    if app_config.label in self.app_configs:
+                        raise ImproperlyConfigured(
+                            "Application labels aren't unique, "
+                            "duplicates: %s" % app_config.label
+                        )
+
+                    self.app_configs[app_config.label] = app_config
+                    app_config.apps = self
 
             # 检查重复的app names
             counts = Counter(
@@ -106,39 +136,201 @@ class Apps:
             self.apps_ready = True
 
             # 阶段2: 导入模型模块
-            for app_config in self.app_configs.values():
-                app_config.import_models()
+            with profiler.phase("apps.models"):
+                for app_config in self.app_configs.values():
+                    with profiler.app("apps.models", app_config.label):
+                        app_config.import_models()
 
             self.clear_cache()
 
             self.models_ready = True
 
             # 阶段3: 运行ready()
-            for app_config in self.get_app_configs():
-                app_config.ready()
+            with profiler.phase("apps.ready"):
+                for app_config in self.get_app_configs():
+                    with profiler.app("apps.ready", app_config.label):
+                        app_config.ready()
 
             self.ready = True
             self.ready_event.set()
 
+    @staticmethod
+    def _import_app_modules(installed_apps, workers):
+        """
+        在线程池中预先导入应用模块, 返回每个应用导入花费的时间
+
+        导入过程中的异常都会被忽略, 之后AppConfig.create()按顺序再导入一次,
+        会在那里抛出同样的异常, 保证报错和串行导入时一致
+        """
+        entries = [
+            entry for entry in installed_apps if not isinstance(entry, AppConfig)
+        ]
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="django-apps"
+        ) as executor:
+            return dict(zip(entries, executor.map(_import_app_module, entries)))
+
     # 对于django的测试套件来说, 这个方法是性能的关键
     @functools.lru_cache(maxsize=None)
-    def get_models(self, include_auto_created=False, include_sapped=False):
+    def get_models(self, include_auto_created=False, include_swapped=False):
         """
         返回所有在INSTALLED_APPS里面的模型列表
 
+        默认不包括以下模型:
         - 自动为多对多关系创建模型, 不需要显式的创建中间表
         - 被替换的模型
 
+        设置对应的关键字参数为True来包括这些模型.
+        每种参数组合的结果只计算一次, 直到调用clear_cache()
         """
         self.check_models_ready()
 
+        result = []
+        for app_config in self.app_configs.values():
+            result.extend(app_config.get_models(include_auto_created, include_swapped))
+        return result
+
+    @functools.lru_cache(maxsize=None)
+    def _get_model_index(self):
+        """
+        返回(app_label, 小写模型名称) => 模型类的映射, 只包括INSTALLED_APPS中的应用
+
+        和get_models()一样缓存, 在clear_cache()时失效
+        """
+        return {
+            (app_label, model_name): model
+            for app_label in self.app_configs
+            for model_name, model in self.all_models[app_label].items()
+        }
+
+    def get_model(self, app_label, model_name=None, require_ready=True):
+        """
+        根据app_label和model_name返回模型类
+
+        model_name不区分大小写. 也可以只传入一个"app_label.ModelName"形式的参数.
+        没有对应的应用或者模型时抛出LookupError
+        """
+        if require_ready:
+            self.check_models_ready()
+        else:
+            self.check_apps_ready()
+
+        if model_name is None:
+            app_label, model_name = app_label.split(".")
+
+        try:
+            return self._get_model_index()[app_label, model_name.lower()]
+        except KeyError:
+            pass
+
+        # 索引中没有, 交给AppConfig给出准确的错误信息
+        app_config = self.get_app_config(app_label)
+
+        if not require_ready and app_config.models is None:
+            app_config.import_models()
+
+        return app_config.get_model(model_name, require_ready=require_ready)
+
+    def register_model(self, app_label, model):
+        """
+        注册模型, 每次导入模型时由ModelBase.__new__调用
+        """
+        model_name = model._meta.model_name
+        app_models = self.all_models[app_label]
+        if model_name in app_models:
+            if (
+                model.__name__ == app_models[model_name].__name__
+                and model.__module__ == app_models[model_name].__module__
+            ):
+                warnings.warn(
+                    "Model '%s.%s' was already registered. Reloading models is not "
+                    "advised as it can lead to inconsistencies, most notably with "
+                    "related models." % (app_label, model_name),
+                    RuntimeWarning,
+                    stacklevel=2,
+                )
+            else:
+                raise RuntimeError(
+                    "Conflicting '%s' models in application '%s': %s and %s."
+                    % (model_name, app_label, app_models[model_name], model)
+                )
+        app_models[model_name] = model
+        self.do_pending_operations(model)
+        self.clear_cache()
+
+    def get_registered_model(self, app_label, model_name):
+        """
+        和get_model()类似, 但是不要求应用已经加载, 只查找已经注册的模型
+
+        没有对应的模型时抛出LookupError
+        """
+        model = self.all_models[app_label].get(model_name.lower())
+        if model is None:
+            raise LookupError("Model '%s.%s' not registered." % (app_label, model_name))
+        return model
+
+    def lazy_model_operation(self, function, *model_keys):
+        """
+        在model_keys中的所有模型都注册之后, 以这些模型类为参数调用function
+
+        model_keys中的每一项都是(app_label, 小写模型名称)元组.
+        已经注册的模型立即填入参数, 其余模型各自登记到_pending_operations中,
+        每注册一个模型只处理等待这个模型的操作, 等待的模型全部注册后在同一批调用
+        """
+        models = [None] * len(model_keys)
+        missing = []
+        for index, model_key in enumerate(model_keys):
+            try:
+                models[index] = self.get_registered_model(*model_key)
+            except LookupError:
+                missing.append((index, model_key))
+
+        if not missing:
+            function(*models)
+            return
+
+        operation = _PendingOperation(function, models, len(missing))
+        for index, model_key in missing:
+            self._pending_operations[model_key].append((operation, index))
+
+    def do_pending_operations(self, model):
+        """
+        填入刚注册的模型, 调用所有模型都已经就绪的等待操作
+        """
+        key = model._meta.app_label, model._meta.model_name
+        ready = []
+        for operation, index in self._pending_operations.pop(key, ()):
+            operation.models[index] = model
+            operation.remaining -= 1
+            if not operation.remaining:
+                ready.append(operation)
+        for operation in ready:
+            operation.function(*operation.models)
+
     def get_app_configs(self):
         """导入应用并返回app配置迭代器"""
         self.check_apps_ready()
         return self.app_configs.values()
 
+    def get_app_config(self, app_label):
+        """
+        根据app_label返回应用配置, 没有对应的应用时抛出LookupError
+        """
+        self.check_apps_ready()
+        try:
+            return self.app_configs[app_label]
+        except KeyError:
+            message = "No installed app with label '%s'." % app_label
+            for app_config in self.get_app_configs():
+                if app_config.name == app_label:
+                    message += " Did you mean '%s'?" % app_config.label
+                    break
+            raise LookupError(message)
+
     def check_apps_ready(self):
-        """如果所有的模型还没有被导入就报错"""
+        """如果所有的应用还没有被导入就报错"""
         if not self.apps_ready:
             from django.conf import settings
 
@@ -146,11 +338,9 @@ class Apps:
             raise AppRegistryNotReady("Apps aren't loaded yet.")
 
     def check_models_ready(self):
-        if not self.apps_ready:
-            from django.conf import settings
-
-            settings.INSTALLED_APPS
-            raise AppRegistryNotReady("Apps aren't loaded yet.")
+        """如果所有的模型还没有被导入就报错"""
+        if not self.models_ready:
+            raise AppRegistryNotReady("Models aren't loaded yet.")
 
     def clear_cache(self):
         """
@@ -159,6 +349,46 @@ class Apps:
         """
         # 调用每个模型的过期缓存. 会清除所有的关系树和字段缓存
         self.get_models.cache_clear()
+        self._get_model_index.cache_clear()
+
+
+class _PendingOperation:
+    """
+    等待一组模型注册的操作
+
+    models按照model_keys的顺序保存已经就绪的模型, remaining是还在等待的模型数量
+    """
+
+    __slots__ = ("function", "models", "remaining")
+
+    def __init__(self, function, models, remaining):
+        self.function = function
+        self.models = models
+        self.remaining = remaining
+
+
+def _import_app_module(entry):
+    """
+    导入INSTALLED_APPS中的一项和它的apps子模块, 返回花费的时间
+    """
+    start = time.perf_counter()
+    try:
+        module = import_module(entry)
+    except Exception:
+        # entry可能是AppConfig类的路径, 就导入类所在的模块
+        mod_path = entry.rpartition(".")[0]
+        if mod_path:
+            try:
+                import_module(mod_path)
+            except Exception:
+                pass
+    else:
+        try:
+            if module_has_submodule(module, APPS_MODULE_NAME):
+                import_module("%s.%s" % (entry, APPS_MODULE_NAME))
+        except Exception:
+            pass
+    return time.perf_counter() - start
 
 
 apps = Apps(installed_apps=None)
\ No newline at end of file
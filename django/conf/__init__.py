@@ -7,14 +7,16 @@ import importlib
 import os
 import time
 import warnings
-from pathlib import Path
+from contextlib import contextmanager
 
 from django.conf import global_settings
 from django.core.exceptions import ImproperlyConfigured
 from django.utils.deprecation import RemovedInDjango50Warning
-from django.utils.functional import LazyObject, empty
+from django.utils.functional import LazyObject, _set_class, empty
 
 ENVIRONMENT_VARIABLE = "DJANGO_SETTINGS_MODULE"
+# 指定settings快照文件路径的环境变量, 没有设置就不启用快照
+SNAPSHOT_ENVIRONMENT_VARIABLE = "DJANGO_SETTINGS_SNAPSHOT"
 
 USE_DEPRECATED_PYTZ_DEPRECATED_MSG = (
     "The USE_DEPRECATED_PYTZ setting, and support for pytz timezones is "
@@ -70,9 +72,11 @@ class LazySettings(LazyObject):
             _wrapped = self._wrapped
         val = getattr(_wrapped, name)
 
-        # 出于性能原因, 在此处执行此操作, 以便缓存修改后的值
         if name in {"MEDIA_URL", "STATIC_URL"} and val is not None:
-            val = self._add_script_prefix(val)
+            prefixed = self._add_script_prefix(val)
+            if prefixed is not val:
+                # 相对路径加上的是当前请求的脚本前缀, 不同请求的前缀可能不同, 所以不能缓存
+                return prefixed
         elif name == "SECRET_KEY" and not val:
             raise ImproperlyConfigured("The SECRET_KEY setting must not be empty.")
 
@@ -99,6 +103,63 @@ class LazySettings(LazyObject):
         """判断如果settings已经配置过了"""
         return self._wrapped is not empty
 
+    def freeze(self):
+        """
+        冻结settings
+
+        把所有配置预先缓存到self.__dict__(相对路径的MEDIA_URL/STATIC_URL除外, 见__getattr__),
+        再把实例的类切换为FrozenSettings, 之后读取配置就是普通的属性访问,
+        不再经过LazyObject.__getattribute__.
+        冻结后的settings只能在override()中修改
+        """
+        if self._wrapped is empty:
+            self._setup()
+        for name in dir(self._wrapped):
+            if name.isupper():
+                try:
+                    getattr(self, name)
+                except ImproperlyConfigured:
+                    # 保留到真正访问的时候再报错
+                    pass
+        _set_class(self, FrozenSettings)
+
+    @property
+    def frozen(self):
+        """判断settings是否已经冻结"""
+        return isinstance(self, FrozenSettings)
+
+    @contextmanager
+    def override(self, **kwargs):
+        """
+        临时修改配置, 主要用于测试
+
+        在with代码块内settings是解冻的, 可以任意修改,
+        退出时恢复kwargs中的配置, 如果之前是冻结的就重新冻结
+        """
+        frozen = self.frozen
+        if frozen:
+            _set_class(self, LazySettings)
+        if self._wrapped is empty:
+            self._setup()
+        missing = object()
+        original = {name: getattr(self._wrapped, name, missing) for name in kwargs}
+        try:
+            for name, value in kwargs.items():
+                setattr(self, name, value)
+            yield self
+        finally:
+            # with代码块内可能重新冻结了settings
+            if self.frozen:
+                frozen = True
+                _set_class(self, LazySettings)
+            for name, value in original.items():
+                if value is missing:
+                    delattr(self, name)
+                else:
+                    setattr(self, name, value)
+            if frozen:
+                self.freeze()
+
     @staticmethod
     def _add_script_prefix(value):
         """
@@ -112,16 +173,87 @@ class LazySettings(LazyObject):
         return "%s%s" % (get_script_prefix(), value)
 
 
+class FrozenSettings(LazySettings):
+    """
+    冻结后的settings
+
+    使用object默认的属性查找, 缓存在__dict__中的配置可以直接读取,
+    只有没有缓存的属性才会走到LazySettings.__getattr__
+    """
+
+    __getattribute__ = object.__getattribute__
+
+    def __setattr__(self, name, value):
+        raise AttributeError(
+            "Settings are frozen, use settings.override() to change %s." % name
+        )
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            "Settings are frozen, use settings.override() to delete %s." % name
+        )
+
+
 class Settings:
     def __init__(self, settings_module):
+        self.SETTINGS_MODULE = settings_module
+
+        # 如果设置了快照路径, 优先从快照加载, 跳过对settings模块的反射遍历
+        snapshot_path = os.environ.get(SNAPSHOT_ENVIRONMENT_VARIABLE)
+        if snapshot_path:
+            from django.conf import snapshot
+
+            key = snapshot.snapshot_key(settings_module)
+            loaded = snapshot.load_snapshot(snapshot_path, key) if key else None
+            if loaded is None:
+                with snapshot.track_environ() as environ_names:
+                    self._load_settings()
+                if key:
+                    snapshot.save_snapshot(snapshot_path, key, self, environ_names)
+            else:
+                values, explicit_settings = loaded
+                self.__dict__.update(values)
+                self._explicit_settings = set(explicit_settings)
+        else:
+            self._load_settings()
+
+        if self.USE_TZ is False and not self.is_overridden("USE_TZ"):
+            warnings.warn(
+                "The default value of USE_TZ will change from False to True "
+                "in Django 5.0. Set USE_TZ to False in your project settings "
+                "if you want to keep the current default behavior.",
+                category=RemovedInDjango50Warning,
+            )
+
+        if self.is_overridden("USE_DEPRECATED_PYTZ"):
+            warnings.warn(USE_DEPRECATED_PYTZ_DEPRECATED_MSG, RemovedInDjango50Warning)
+
+        if self.is_overridden("CSRF_COOKIE_MASKED"):
+            warnings.warn(CSRF_COOKIE_MASKED_DEPRECATED_MSG, RemovedInDjango50Warning)
+
+        if hasattr(time, "tzset") and self.TIME_ZONE:
+            # 如果可以就验证系统时区, 如果没有就不做任何处理
+            zoneinfo_root = "usr/share/zoneinfo"
+            zone_info_file = os.path.join(zoneinfo_root, *self.TIME_ZONE.split("/"))
+            if os.path.exists(zoneinfo_root) and not os.path.exists(zone_info_file):
+                raise ValueError("Incorrect timezone setting: %s" % self.TIME_ZONE)
+            # 将时区设置为环境变量 (#2315)
+            os.environ["TZ"] = self.TIME_ZONE
+            time.tzset()
+
+        if self.is_overridden("USE_L10N"):
+            warnings.warn(USE_L10N_DEPRECATED_MSG, RemovedInDjango50Warning)
+
+    def _load_settings(self):
+        """
+        导入settings模块, 合并全局settings规则和用户自定义的配置
+        """
         # 加载全局settings规则
         for setting in dir(global_settings):
             if setting.isupper():
                 # 加载所有全大写的变量
                 setattr(self, setting, getattr(global_settings, setting))
 
-        self.SETTINGS_MODULE = settings_module
-
         mod = importlib.import_module(self.SETTINGS_MODULE)
 
         tuple_settings = (
@@ -146,33 +278,6 @@ class Settings:
                 setattr(self, setting, setting_value)
                 self._explicit_settings.add(setting)
 
-        if self.USE_TZ is False and not self.is_overridden("USE_TZ"):
-            warnings.warn(
-                "The default value of USE_TZ will change from False to True "
-                "in Django 5.0. Set USE_TZ to False in your project settings "
-                "if you want to keep the current default behavior.",
-                category=RemovedInDjango50Warning,
-            )
-
-        if self.is_overridden("USE_DEPRECATED_PYTZ"):
-            warnings.warn(USE_DEPRECATED_PYTZ_DEPRECATED_MSG, RemovedInDjango50Warning)
-
-        if self.is_overridden("CSRF_COOKIE_MASKED"):
-            warnings.warn(CSRF_COOKIE_MASKED_DEPRECATED_MSG, RemovedInDjango50Warning)
-
-        if hasattr(time, "tzset") and self.TIME_ZONE:
-            # 如果可以就验证系统时区, 如果没有就不做任何处理
-            zoneinfo_root = Path("usr/share/zoneinfo")
-            zone_info_file = zoneinfo_root.joinpath(*self.TIME_ZONE.split("/"))
-            if zoneinfo_root.exists() and not zone_info_file.exists():
-                raise ValueError("Incorrect timezone setting: %s" % self.TIME_ZONE)
-            # 将时区设置为环境变量 (#2315)
-            os.environ["TZ"] = self.TIME_ZONE
-            time.tzset()
-
-        if self.is_overridden("USE_L10N"):
-            warnings.warn(USE_L10N_DEPRECATED_MSG, RemovedInDjango50Warning)
-
     def is_overridden(self, setting):
         return setting in self._explicit_settings
 
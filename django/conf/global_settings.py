@@ -27,6 +27,11 @@ DEBUG = False
 # on a live site.
 DEBUG_PROPAGATE_EXCEPTIONS = False
 
+# Whether django.setup() should freeze the settings once it finishes. Frozen
+# settings are read without going through the lazy proxy and can only be
+# changed inside settings.override().
+FREEZE_SETTINGS = False
+
 # People who get code error notifications. In the format
 # [('Full Name', 'email@example.com'), ('Full Name', 'anotheremail@example.com')]
 ADMINS = []
@@ -225,6 +230,10 @@ EMAIL_TIMEOUT = None
 # List of strings representing installed apps.
 INSTALLED_APPS = []
 
+# Number of threads used to pre-import the INSTALLED_APPS packages while the
+# app registry is populated. None imports them one after another.
+APPS_IMPORT_WORKERS = None
+
 TEMPLATES = []
 
 # Default form rendering class.
@@ -598,6 +607,14 @@ LOGGING_CONFIG = "logging.config.dictConfig"
 # Custom logging configuration.
 LOGGING = {}
 
+# Size of the queue used to hand log records to a background thread that
+# formats and writes them. 0 writes records on the calling thread.
+LOGGING_QUEUE_SIZE = 0
+
+# What to do when the logging queue is full: "drop" the record (and count
+# it) or "block" until there is room.
+LOGGING_QUEUE_OVERFLOW = "drop"
+
 # Default exception reporter class used in case none has been
 # specifically assigned to the HttpRequest instance.
 DEFAULT_EXCEPTION_REPORTER = "django.views.debug.ExceptionReporter"
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :snapshot.py
+# @Author   :Lowell
+# @Time     :2022/4/2 10:21
+"""
+settings快照
+
+把合并、校验后的settings写入缓存文件, 之后的进程直接加载快照,
+跳过Settings.__init__中对global_settings和用户settings模块的反射遍历.
+
+快照的键由以下内容组成, 任意一项变化都会使快照失效:
+    - settings模块的文件路径和mtime
+    - global_settings的mtime
+    - Python版本
+    - 以DJANGO_开头的环境变量
+    - 生成快照时settings模块读取过的环境变量
+
+其他环境变量(比如OLDPWD, SHLVL)的变化不会使快照失效. 读取环境变量的记录只在
+生成快照时导入settings模块的过程中进行, 导入之后才读取的环境变量不会被记录.
+
+快照只适合settings模块本身导入开销很大的项目. 命中快照时的固定开销主要来自
+反序列化: settings里的Path对象(比如BASE_DIR)会导入pathlib. mysite.settings这样
+简单的模块用了快照反而更慢(约14.2 ms变成约18.1 ms), 只有导入较多模块,
+定义150个配置项的模块才明显变快(约56 ms降到约16 ms). 开启前请先用
+benchmarks/settings_snapshot.py测量自己的settings模块.
+
+快照文件必须属于当前用户, 并且组和其他用户没有任何权限, 否则不会加载.
+
+注意: settings模块导入的其他模块(例如local_settings)的修改不会使快照失效,
+这种情况需要手动删除快照文件.
+"""
+import contextlib
+import os
+import pickle
+import sys
+from collections.abc import MutableMapping
+from importlib.util import find_spec
+
+from django.conf import global_settings
+
+SNAPSHOT_PROTOCOL = 2
+
+
+class _TrackingEnviron(MutableMapping):
+    """
+    代替os.environ, 记录被读取的环境变量名
+
+    遍历环境变量时无法知道用到了哪些, 就记录全部的名字
+    """
+
+    def __init__(self, environ):
+        self._environ = environ
+        self.names = set()
+
+    def __getitem__(self, name):
+        self.names.add(name)
+        return self._environ[name]
+
+    def __contains__(self, name):
+        self.names.add(name)
+        return name in self._environ
+
+    def __setitem__(self, name, value):
+        self._environ[name] = value
+
+    def __delitem__(self, name):
+        del self._environ[name]
+
+    def __iter__(self):
+        self.names.update(self._environ)
+        return iter(self._environ)
+
+    def __len__(self):
+        return len(self._environ)
+
+    def copy(self):
+        return dict(self)
+
+
+@contextlib.contextmanager
+def track_environ():
+    """
+    在代码块中记录读取过的环境变量, 返回变量名的集合
+
+        with track_environ() as names:
+            importlib.import_module(settings_module)
+    """
+    environ = os.environ
+    tracking = _TrackingEnviron(environ)
+    # os.getenv()读取的是os模块的全局变量environ, 替换模块属性对它同样生效
+    os.environ = tracking
+    try:
+        yield tracking.names
+    finally:
+        os.environ = environ
+
+
+def snapshot_key(settings_module):
+    """
+    计算settings模块的快照键, 如果找不到模块文件就返回None
+    """
+    try:
+        spec = find_spec(settings_module)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.has_location or not spec.origin:
+        return None
+    try:
+        module_mtime = os.stat(spec.origin).st_mtime_ns
+        global_mtime = os.stat(global_settings.__file__).st_mtime_ns
+    except OSError:
+        return None
+
+    return (
+        SNAPSHOT_PROTOCOL,
+        settings_module,
+        spec.origin,
+        module_mtime,
+        global_mtime,
+        sys.version,
+        # 环境变量原样保存在键里, 快照文件只有当前用户可读(见save_snapshot)
+        tuple(
+            sorted(item for item in os.environ.items() if item[0].startswith("DJANGO_"))
+        ),
+    )
+
+
+def load_snapshot(path, key):
+    """
+    读取快照, 返回(settings字典, 显式配置集合), 快照不存在或者已失效就返回None
+    """
+    try:
+        with open(path, "rb") as fp:
+            # 反序列化会执行文件里的代码, 只加载当前用户自己的, 其他人不可写的快照,
+            # 避免共享目录(比如/tmp)里被别人放入的文件
+            st = os.fstat(fp.fileno())
+            if st.st_uid != os.geteuid() or st.st_mode & 0o077:
+                return None
+            data = pickle.load(fp)
+    except Exception:
+        # 快照损坏或者无法反序列化, 都当作没有快照
+        return None
+    if not isinstance(data, dict) or data.get("key") != key:
+        return None
+    # settings模块读取过的环境变量必须和生成快照时相同, 不存在的变量记录为None
+    for name, value in data["environ"].items():
+        if os.environ.get(name) != value:
+            return None
+    return data["settings"], data["explicit_settings"]
+
+
+def save_snapshot(path, key, settings, environ_names=()):
+    """
+    把settings对象的所有配置写入快照文件, 写入失败不影响正常启动
+
+    environ_names是加载settings时读取过的环境变量名, 见track_environ()
+    """
+    data = {
+        "key": key,
+        "environ": {name: os.environ.get(name) for name in environ_names},
+        "settings": {
+            name: value for name, value in vars(settings).items() if name.isupper()
+        },
+        "explicit_settings": frozenset(settings._explicit_settings),
+    }
+    try:
+        payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # settings里有不能序列化的值(比如lambda), 就放弃写快照
+        return False
+
+    import tempfile
+
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        # mkstemp创建的文件权限是0600, 快照里包含SECRET_KEY等敏感配置
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".settings-snapshot-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(payload)
+            # 原子替换, 避免并发启动的进程读到写了一半的快照
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :asgi.py
+# @Author   :Lowell
+# @Time     :2022/4/16 10:15
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+
+def get_asgi_application():
+    """
+    ASGI的公共接口, 项目的asgi.py通过它创建application
+
+        application = get_asgi_application()
+
+    脚本前缀由每个请求的root_path决定, 所以setup时不设置
+    """
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -14,3 +14,32 @@ class AppRegistryNotReady(Exception):
     """django.apps注册失败"""
     pass
 
+
+class MiddlewareNotUsed(Exception):
+    """中间件在初始化时抛出这个异常, 表示不使用这个中间件"""
+    pass
+
+
+class SuspiciousOperation(Exception):
+    """用户进行了可疑的操作, 返回400"""
+    pass
+
+
+class BadRequest(Exception):
+    """请求格式错误, 返回400"""
+    pass
+
+
+class PermissionDenied(Exception):
+    """用户没有权限执行这个操作, 返回403"""
+    pass
+
+
+class RequestAborted(Exception):
+    """客户端在请求处理完之前断开了连接"""
+    pass
+
+
+class SynchronousOnlyOperation(Exception):
+    """只能在同步代码中执行的操作在事件循环所在的线程中被调用了"""
+    pass
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :forkserver.py
+# @Author   :Lowell
+# @Time     :2022/4/10 09:47
+"""
+常驻的管理命令服务
+
+`manage.py commandserver`启动一个已经执行过django.setup()的进程, 监听本地Unix socket.
+设置环境变量DJANGO_COMMAND_SERVER为socket路径后, manage.py会把命令行参数、工作目录、
+环境变量和标准输入输出的文件描述符发送给服务, 服务为每个命令fork一个子进程执行,
+并把退出码返回给manage.py, 命令的耗时就从完整的启动过程变成了一次fork.
+
+以下情况manage.py会按照原来的方式执行命令:
+    - 没有设置DJANGO_COMMAND_SERVER, 或者服务没有运行
+    - settings模块的指纹(模块名, 文件路径, mtime, Python解释器)和服务启动时不同
+    - 命令行中包含--settings或者--pythonpath, 或者命令是runserver/commandserver
+
+注意服务只在启动时加载一次settings和应用, 修改了应用代码或者settings依赖的
+环境变量之后需要重启服务.
+
+这个模块会在导入django.core.management之前被manage.py导入, 所以只能依赖标准库.
+"""
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+from importlib.util import find_spec
+
+SERVER_ENVIRONMENT_VARIABLE = "DJANGO_COMMAND_SERVER"
+
+# 这些命令不能在fork出来的子进程中执行
+LOCAL_COMMANDS = {"runserver", "commandserver"}
+
+# 服务返回给客户端的消息: 一个字节的类型和一个有符号整数
+_FRAME = struct.Struct("!ci")
+# 指纹不一致, 客户端需要自己执行命令
+MISMATCH = b"M"
+# 执行命令的子进程id, 客户端把收到的信号转发给它
+PID = b"P"
+# 命令的退出码
+EXIT = b"X"
+
+_LENGTH = struct.Struct("!I")
+_MAX_HEADER = 65536
+_FORWARDED_SIGNALS = ("SIGINT", "SIGTERM", "SIGHUP", "SIGQUIT")
+
+
+def settings_fingerprint():
+    """
+    返回当前settings模块的指纹, 找不到settings模块时返回None
+    """
+    settings_module = os.environ.get("DJANGO_SETTINGS_MODULE")
+    if not settings_module:
+        return None
+    try:
+        spec = find_spec(settings_module)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.has_location or not spec.origin:
+        return None
+    try:
+        mtime = os.stat(spec.origin).st_mtime_ns
+    except OSError:
+        return None
+    return [settings_module, spec.origin, mtime, sys.executable]
+
+
+def _recv_exactly(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def run_in_server(argv):
+    """
+    把命令交给常驻服务执行, 返回命令的退出码
+
+    服务不可用或者需要在本进程中执行命令时返回None
+    """
+    path = os.environ.get(SERVER_ENVIRONMENT_VARIABLE)
+    if not path or not hasattr(socket, "send_fds"):
+        return None
+    if len(argv) > 1 and argv[1] in LOCAL_COMMANDS:
+        return None
+    if any(arg.startswith(("--settings", "--pythonpath")) for arg in argv[1:]):
+        return None
+    fingerprint = settings_fingerprint()
+    if fingerprint is None:
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        header = json.dumps(
+            {
+                "argv": list(argv),
+                "cwd": os.getcwd(),
+                "environ": dict(os.environ),
+                "fingerprint": fingerprint,
+            }
+        ).encode()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        try:
+            socket.send_fds(sock, [_LENGTH.pack(len(header)) + header], [0, 1, 2])
+            kind, value = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+        except (OSError, EOFError):
+            # 服务还没有开始执行命令, 可以放心地退回到本进程执行
+            return None
+        if kind != PID:
+            return None
+
+        # 终端的信号只会发给manage.py所在的进程组, 需要转发给执行命令的子进程
+        def forward(signum, frame):
+            try:
+                os.kill(value, signum)
+            except OSError:
+                pass
+
+        for name in _FORWARDED_SIGNALS:
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), forward)
+
+        try:
+            kind, value = _FRAME.unpack(_recv_exactly(sock, _FRAME.size))
+        except (OSError, EOFError):
+            # 子进程没有返回退出码就退出了
+            return 1
+        return value if kind == EXIT else 1
+    finally:
+        sock.close()
+
+
+def _exit_on_signal(signum, frame):
+    sys.exit(0)
+
+
+class CommandServer:
+    """
+    监听Unix socket, 为每个请求fork一个子进程执行管理命令
+    """
+
+    def __init__(self, path, stderr=None):
+        self.path = path
+        self.stderr = stderr or sys.stderr
+        self.fingerprint = settings_fingerprint()
+        self.socket = None
+
+    def bind(self):
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+            except OSError:
+                # 上次没有正常退出留下的socket文件
+                os.unlink(self.path)
+            else:
+                raise OSError(
+                    "A command server is already listening on %s." % self.path
+                )
+            finally:
+                probe.close()
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # 只有当前用户可以连接
+        umask = os.umask(0o177)
+        try:
+            self.socket.bind(self.path)
+        finally:
+            os.umask(umask)
+        self.socket.listen(64)
+
+    def serve_forever(self):
+        # 自动回收子进程, 服务进程不需要等待命令执行结束
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        # 收到SIGTERM时正常退出, 删除socket文件
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+        try:
+            while True:
+                conn, _ = self.socket.accept()
+                try:
+                    self.handle(conn)
+                except Exception as exc:
+                    self.stderr.write("Command server error: %r\n" % exc)
+                finally:
+                    conn.close()
+        finally:
+            self.close()
+
+    def close(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def handle(self, conn):
+        data, fds, _, _ = socket.recv_fds(conn, _MAX_HEADER, 3)
+        try:
+            (length,) = _LENGTH.unpack(data[: _LENGTH.size])
+            data = data[_LENGTH.size:]
+            if length > len(data):
+                data += _recv_exactly(conn, length - len(data))
+            request = json.loads(data)
+
+            if len(fds) != 3 or request["fingerprint"] != self.fingerprint:
+                conn.sendall(_FRAME.pack(MISMATCH, 0))
+                return
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                self.run_child(conn, fds, request)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def run_child(self, conn, fds, request):
+        """
+        在子进程中执行命令, 不会返回
+        """
+        code = 1
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self.socket.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            for fd in fds:
+                if fd > 2:
+                    os.close(fd)
+            conn.sendall(_FRAME.pack(PID, os.getpid()))
+
+            os.chdir(request["cwd"])
+            # settings已经设置过的时区需要保留
+            tz = os.environ.get("TZ")
+            os.environ.clear()
+            os.environ.update(request["environ"])
+            if tz is not None:
+                os.environ["TZ"] = tz
+            sys.argv = request["argv"]
+
+            code = self.execute(request["argv"])
+        except BaseException:
+            import traceback
+
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                conn.sendall(_FRAME.pack(EXIT, code))
+            finally:
+                os._exit(code)
+
+    @staticmethod
+    def execute(argv):
+        """执行命令并返回退出码"""
+        from django.core.management import execute_from_command_line
+
+        try:
+            execute_from_command_line(argv)
+        except SystemExit as exc:
+            if exc.code is None:
+                return 0
+            if isinstance(exc.code, int):
+                return exc.code
+            sys.stderr.write("%s\n" % exc.code)
+            return 1
+        return 0
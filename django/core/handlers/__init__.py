@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :__init__.py
+# @Author   :Lowell
+# @Time     :2022/4/15 13:10
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :asgi.py
+# @Author   :Lowell
+# @Time     :2022/4/16 09:20
+import asyncio
+import tempfile
+from contextlib import suppress
+from functools import cached_property
+from http.cookies import SimpleCookie
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import RequestAborted, SynchronousOnlyOperation
+from django.core.handlers import base
+from django.core.handlers.wsgi import parse_content_type
+from django.http import HttpRequest, HttpResponseBadRequest, QueryDict
+from django.urls import get_resolver, override_script_prefix
+
+
+class ASGIRequest(HttpRequest):
+    """
+    根据ASGI的scope创建的请求
+
+    请求体不会提前读取. 异步代码可以用`async for chunk in request.stream()`边接收边处理,
+    或者用`await request.abody()`/`apost()`/`aread()`读取全部内容. 同步代码(同步视图和
+    中间件运行在线程中)访问body/POST/read()时会回到事件循环把请求体读到临时文件中;
+    在事件循环中访问还没有读取的body/POST/read()会抛出SynchronousOnlyOperation.
+    """
+
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+        # 已经开始接收请求体 / 请求体已经全部收到 / 请求体已经读到临时文件中
+        self._body_started = False
+        self._body_finished = False
+        self._body_loaded = False
+
+        self.script_name = scope.get("root_path", "")
+        if self.script_name and scope["path"].startswith(self.script_name):
+            self.path_info = scope["path"][len(self.script_name):]
+        else:
+            self.path_info = scope["path"]
+        if self.script_name:
+            self.path = "%s/%s" % (
+                self.script_name.rstrip("/"),
+                self.path_info.replace("/", "", 1),
+            )
+        else:
+            self.path = scope["path"]
+
+        self.method = scope["method"].upper()
+        query_string = scope.get("query_string", "")
+        if isinstance(query_string, bytes):
+            query_string = query_string.decode()
+        self.META = {
+            "REQUEST_METHOD": self.method,
+            "QUERY_STRING": query_string,
+            "SCRIPT_NAME": self.script_name,
+            "PATH_INFO": self.path_info,
+        }
+        if scope.get("client"):
+            self.META["REMOTE_ADDR"] = scope["client"][0]
+            self.META["REMOTE_HOST"] = self.META["REMOTE_ADDR"]
+            self.META["REMOTE_PORT"] = scope["client"][1]
+        if scope.get("server"):
+            self.META["SERVER_NAME"] = scope["server"][0]
+            self.META["SERVER_PORT"] = str(scope["server"][1])
+        else:
+            self.META["SERVER_NAME"] = "unknown"
+            self.META["SERVER_PORT"] = "0"
+        for name, value in scope.get("headers", ()):
+            name = name.decode("latin1")
+            if name == "content-length":
+                corrected_name = "CONTENT_LENGTH"
+            elif name == "content-type":
+                corrected_name = "CONTENT_TYPE"
+            else:
+                corrected_name = "HTTP_%s" % name.upper().replace("-", "_")
+            value = value.decode("latin1")
+            # 重复的请求头用逗号连接
+            if corrected_name in self.META:
+                value = self.META[corrected_name] + "," + value
+            self.META[corrected_name] = value
+
+        self.content_type, self.content_params = parse_content_type(
+            self.META.get("CONTENT_TYPE", "")
+        )
+        if "charset" in self.content_params:
+            self.encoding = self.content_params["charset"]
+        self.resolver_match = None
+        self.FILES = {}
+
+    @cached_property
+    def GET(self):
+        return QueryDict(
+            self.META["QUERY_STRING"],
+            encoding=self.encoding or settings.DEFAULT_CHARSET,
+        )
+
+    @cached_property
+    def POST(self):
+        if self.content_type != "application/x-www-form-urlencoded":
+            return QueryDict()
+        encoding = self.encoding or settings.DEFAULT_CHARSET
+        return QueryDict(self.body.decode(encoding, "replace"), encoding=encoding)
+
+    @cached_property
+    def COOKIES(self):
+        raw_cookie = self.META.get("HTTP_COOKIE", "")
+        if not raw_cookie:
+            return {}
+        cookie = SimpleCookie()
+        try:
+            cookie.load(raw_cookie)
+        except Exception:
+            return {}
+        return {key: morsel.value for key, morsel in cookie.items()}
+
+    async def stream(self):
+        """
+        逐块接收请求体, 调用方处理完一块之后才会向服务器要下一块,
+        客户端发送的速度受调用方处理速度的限制
+        """
+        if self._body_loaded:
+            body = self.body
+            if body:
+                yield body
+            return
+        if self._body_started:
+            raise RuntimeError("The request body stream has already been consumed.")
+        self._body_started = True
+        while not self._body_finished:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                raise RequestAborted()
+            if message["type"] == "http.request":
+                self._body_finished = not message.get("more_body", False)
+                chunk = message.get("body", b"")
+                if chunk:
+                    yield chunk
+
+    async def _load_body(self):
+        """把整个请求体读到临时文件中, 超过FILE_UPLOAD_MAX_MEMORY_SIZE时写入磁盘"""
+        body_file = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode="w+b"
+        )
+        try:
+            async for chunk in self.stream():
+                body_file.write(chunk)
+        except BaseException:
+            body_file.close()
+            raise
+        body_file.seek(0)
+        self._stream = body_file
+        self._body_loaded = True
+
+    async def abody(self):
+        """异步读取整个请求体"""
+        if not self._body_loaded:
+            await self._load_body()
+        return self.body
+
+    async def apost(self):
+        """异步读取表单, 异步视图用它代替request.POST"""
+        if not self._body_loaded:
+            await self._load_body()
+        return self.POST
+
+    async def aread(self, *args, **kwargs):
+        """异步版本的read()"""
+        if not self._body_loaded:
+            await self._load_body()
+        return self.read(*args, **kwargs)
+
+    def _ensure_body_loaded(self):
+        if self._body_loaded:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # 同步视图和中间件运行在线程中, 回到事件循环读取请求体
+            async_to_sync(self._load_body)()
+        else:
+            raise SynchronousOnlyOperation(
+                "The request body has not been read yet and cannot be read "
+                "synchronously from an async context. Use await request.abody(), "
+                "await request.apost(), await request.aread() or "
+                "request.stream() instead."
+            )
+
+    @property
+    def body(self):
+        self._ensure_body_loaded()
+        return super().body
+
+    def read(self, *args, **kwargs):
+        self._ensure_body_loaded()
+        return super().read(*args, **kwargs)
+
+    def readline(self, *args, **kwargs):
+        self._ensure_body_loaded()
+        return super().readline(*args, **kwargs)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+
+
+class ASGIHandler(base.BaseHandler):
+    """
+    ASGI应用, 由django.core.asgi.get_asgi_application()创建
+
+    异步视图和异步中间件直接在事件循环中执行, 同步的部分才放到线程中.
+    流式响应每写出一块都会等待服务器的send()返回, 慢客户端不会让响应堆积在内存中
+    """
+
+    request_class = ASGIRequest
+    # 非流式响应每条消息最多发送的字节数
+    chunk_size = 2 ** 16
+
+    def __init__(self):
+        super().__init__()
+        self.load_middleware(is_async=True)
+        # 启动时就编译好路由表, 第一个请求不需要等待
+        get_resolver().populate()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError(
+                "Django can only handle ASGI/HTTP connections, not %s." % scope["type"]
+            )
+
+        # 脚本前缀只在这个请求的上下文中生效, 包括发送流式响应的时候
+        with override_script_prefix(self.get_script_prefix(scope)):
+            await self.handle_request(scope, receive, send)
+
+    async def handle_request(self, scope, receive, send):
+        request, error_response = self.create_request(scope, receive)
+        if request is None:
+            await self.send_response(error_response, send)
+            return
+
+        try:
+            response = await self.get_response_async(request)
+            response._handler_class = self.__class__
+            await self.send_response(response, send, request)
+        except RequestAborted:
+            # 客户端已经断开, 没有必要再发送响应
+            pass
+        finally:
+            request.close()
+
+    def create_request(self, scope, receive):
+        """创建请求, 失败时返回(None, 错误响应)"""
+        try:
+            return self.request_class(scope, receive), None
+        except UnicodeDecodeError:
+            return None, HttpResponseBadRequest("<h1>Bad Request (400)</h1>")
+
+    async def send_response(self, response, send, request=None):
+        """把响应发送给服务器"""
+        response_headers = [
+            (str(header).encode("ascii"), str(value).encode("latin1"))
+            for header, value in response.items()
+        ]
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": response.status_code,
+                    "headers": response_headers,
+                }
+            )
+            if not response.streaming:
+                for part, last in self.chunk_bytes(response.content):
+                    await send(
+                        {
+                            "type": "http.response.body",
+                            "body": part,
+                            "more_body": not last,
+                        }
+                    )
+            elif request is not None:
+                await self.send_streaming_until_disconnect(response, send, request)
+            else:
+                await self.send_streaming(response, send)
+        finally:
+            if response.streaming:
+                await response.aclose()
+            else:
+                response.close()
+
+    async def send_streaming(self, response, send):
+        """
+        逐块发送流式响应, 上一块的send()返回之后才读取下一块
+
+        同步迭代器的每一次next()都放到线程中执行, 等待客户端的时候不占用线程
+        """
+        content = response.streaming_content
+        if response.is_async:
+            async for chunk in content:
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        else:
+            end = object()
+            next_chunk = sync_to_async(next, thread_sensitive=True)
+            while True:
+                chunk = await next_chunk(content, end)
+                if chunk is end:
+                    break
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def send_streaming_until_disconnect(self, response, send, request):
+        """发送流式响应, 客户端断开连接时停止生成后面的内容"""
+        send_task = asyncio.ensure_future(self.send_streaming(response, send))
+        disconnect_task = asyncio.ensure_future(self.listen_for_disconnect(request))
+        try:
+            await asyncio.wait(
+                {send_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for task in (send_task, disconnect_task):
+                if not task.done():
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
+        if not send_task.cancelled():
+            # 发送过程中的异常继续抛出
+            send_task.result()
+
+    @staticmethod
+    async def listen_for_disconnect(request):
+        """
+        接管request的receive, 收到断开连接的消息时返回
+
+        流式响应可能还在读取请求体, 请求体的消息通过队列转交给request.stream(),
+        队列满时暂停接收, 不会提前把请求体读到内存里
+        """
+        receive = request._receive
+        queue = asyncio.Queue(maxsize=1)
+        request._receive = queue.get
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            await queue.put(message)
+
+    @classmethod
+    def chunk_bytes(cls, data):
+        """把data切成chunk_size大小的块, 返回(块, 是否最后一块)"""
+        if not data:
+            yield data, True
+            return
+        position = 0
+        while position < len(data):
+            yield (
+                data[position:position + cls.chunk_size],
+                position + cls.chunk_size >= len(data),
+            )
+            position += cls.chunk_size
+
+    @staticmethod
+    def get_script_prefix(scope):
+        """返回脚本前缀, 设置了FORCE_SCRIPT_NAME时以它为准"""
+        if settings.FORCE_SCRIPT_NAME:
+            return settings.FORCE_SCRIPT_NAME
+        return scope.get("root_path", "") or ""
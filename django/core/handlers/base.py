@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :base.py
+# @Author   :Lowell
+# @Time     :2022/4/15 13:30
+import asyncio
+import functools
+import logging
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.urls import get_resolver
+from django.utils.asyncio import (
+    async_to_sync,
+    iscoroutinefunction,
+    markcoroutinefunction,
+)
+from django.utils.log import log_response
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("django.request")
+
+
+@functools.lru_cache(maxsize=None)
+def _sync_view(callback):
+    """
+    同步模式下调用视图用的函数, 异步视图用async_to_sync转换
+
+    每个视图只判断和转换一次
+    """
+    if iscoroutinefunction(callback):
+        return async_to_sync(callback)
+    return callback
+
+
+def _chain_view_hook(hook, next_call):
+    """hook返回None时调用next_call"""
+
+    def process_view(request, callback, callback_args, callback_kwargs):
+        response = hook(request, callback, callback_args, callback_kwargs)
+        if response is not None:
+            return response
+        return next_call(request, callback, callback_args, callback_kwargs)
+
+    return process_view
+
+
+def _chain_view_hook_async(hook, next_call):
+    async def process_view(request, callback, callback_args, callback_kwargs):
+        response = await hook(request, callback, callback_args, callback_kwargs)
+        if response is not None:
+            return response
+        return await next_call(request, callback, callback_args, callback_kwargs)
+
+    return process_view
+
+
+def _chain_exception_hook(hook, next_call):
+    """hook返回None时调用next_call"""
+
+    def process_exception(request, exception):
+        response = hook(request, exception)
+        if response is not None:
+            return response
+        return next_call(request, exception)
+
+    return process_exception
+
+
+def _chain_exception_hook_async(hook, next_call):
+    async def process_exception(request, exception):
+        response = await hook(request, exception)
+        if response is not None:
+            return response
+        return await next_call(request, exception)
+
+    return process_exception
+
+
+def _no_exception_response(request, exception):
+    """没有任何中间件处理异常时的终点"""
+    return None
+
+
+async def _no_exception_response_async(request, exception):
+    return None
+
+
+def compile_view_middleware(hooks, call_view, is_async=False):
+    """
+    把process_view钩子按顺序串成嵌套的闭包, 第一个返回响应的钩子会跳过后面的钩子和视图
+
+    没有钩子时直接返回call_view, 请求路径上没有多余的调用
+    """
+    chain = _chain_view_hook_async if is_async else _chain_view_hook
+    handler = call_view
+    for hook in reversed(hooks):
+        handler = chain(hook, handler)
+    return handler
+
+
+def compile_exception_middleware(hooks, is_async=False):
+    """
+    把process_exception钩子按顺序串成嵌套的闭包, 都不处理时返回None
+
+    最后一个钩子的返回值就是结果, 不用再包一层
+    """
+    if not hooks:
+        return _no_exception_response_async if is_async else _no_exception_response
+    chain = _chain_exception_hook_async if is_async else _chain_exception_hook
+    handler = hooks[-1]
+    for hook in reversed(hooks[:-1]):
+        handler = chain(hook, handler)
+    return handler
+
+
+class BaseHandler:
+    """
+    加载MIDDLEWARE并编译成一条调用链
+
+    中间件在启动时通过import_string导入并实例化一次, process_view/process_exception钩子
+    也在这时找出来串成嵌套的函数. 处理请求时只调用编译好的函数, 不再遍历列表或者用getattr探测钩子
+    """
+
+    _view_middleware = None
+    _exception_middleware = None
+    _middleware_chain = None
+
+    def load_middleware(self, is_async=False):
+        """
+        按照MIDDLEWARE从内到外包装get_response, 只能在启动时调用一次
+
+        is_async为True时整条链是异步的(ASGI). 中间件通过sync_capable/async_capable
+        声明支持的模式, 只有相邻两层模式不同的地方才用asgiref转换,
+        全部是异步中间件时请求不会离开事件循环
+        """
+        view_hooks = []
+        exception_hooks = []
+
+        get_response = self._get_response_async if is_async else self._get_response
+        handler = convert_exception_to_response(get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(settings.MIDDLEWARE):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, "sync_capable", True)
+            middleware_can_async = getattr(middleware, "async_capable", False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError(
+                    "Middleware %s must have at least one of "
+                    "sync_capable/async_capable set to True." % middleware_path
+                )
+            elif not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+            try:
+                # 按照中间件的模式转换内层handler
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async,
+                    handler,
+                    handler_is_async,
+                    debug=settings.DEBUG,
+                    name="middleware %s" % middleware_path,
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed as exc:
+                if settings.DEBUG:
+                    if str(exc):
+                        logger.debug("MiddlewareNotUsed(%r): %s", middleware_path, exc)
+                    else:
+                        logger.debug("MiddlewareNotUsed: %r", middleware_path)
+                continue
+
+            if mw_instance is None:
+                raise ImproperlyConfigured(
+                    "Middleware factory %s returned None." % middleware_path
+                )
+            if (
+                middleware_is_async
+                and not iscoroutinefunction(mw_instance)
+                and iscoroutinefunction(type(mw_instance).__call__)
+            ):
+                # async def __call__的中间件实例, 标记后convert_exception_to_response才能识别
+                markcoroutinefunction(mw_instance)
+
+            if hasattr(mw_instance, "process_view"):
+                # process_view按照MIDDLEWARE的顺序调用
+                view_hooks.insert(
+                    0, self.adapt_method_mode(is_async, mw_instance.process_view)
+                )
+            if hasattr(mw_instance, "process_exception"):
+                # process_exception按照MIDDLEWARE的逆序调用
+                exception_hooks.append(
+                    self.adapt_method_mode(is_async, mw_instance.process_exception)
+                )
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        # 最外层按照handler的模式转换
+        handler = self.adapt_method_mode(is_async, handler, handler_is_async)
+        call_view = self.call_view_async if is_async else self.call_view
+        self._view_middleware = compile_view_middleware(view_hooks, call_view, is_async)
+        self._exception_middleware = compile_exception_middleware(
+            exception_hooks, is_async
+        )
+        # 设置完成后才赋值, 表示中间件已经加载好了
+        self._middleware_chain = handler
+
+    def adapt_method_mode(
+        self, is_async, method, method_is_async=None, debug=False, name=None
+    ):
+        """
+        把method转换成is_async对应的模式, 模式相同时原样返回
+        """
+        if method_is_async is None:
+            method_is_async = iscoroutinefunction(method)
+        if debug and not name:
+            name = "method %s()" % method.__qualname__
+        if is_async:
+            if not method_is_async:
+                if debug:
+                    logger.debug("Synchronous handler adapted for %s.", name)
+                return sync_to_async(method, thread_sensitive=True)
+        elif method_is_async:
+            if debug:
+                logger.debug("Asynchronous handler adapted for %s.", name)
+            return async_to_sync(method)
+        return method
+
+    def get_response(self, request):
+        """根据请求返回响应"""
+        response = self._middleware_chain(request)
+        if response.status_code >= 400:
+            log_response(
+                "%s: %s",
+                response.reason_phrase,
+                request.path,
+                response=response,
+                request=request,
+            )
+        return response
+
+    async def get_response_async(self, request):
+        """get_response的异步版本, 由ASGI handler调用"""
+        response = await self._middleware_chain(request)
+        if response.status_code >= 400:
+            await sync_to_async(log_response, thread_sensitive=False)(
+                "%s: %s",
+                response.reason_phrase,
+                request.path,
+                response=response,
+                request=request,
+            )
+        return response
+
+    def _get_response(self, request):
+        """
+        解析路由, 调用视图, 处理视图抛出的异常
+
+        这是中间件链的最内层
+        """
+        callback, callback_args, callback_kwargs = self.resolve_request(request)
+        try:
+            response = self._view_middleware(
+                request, callback, callback_args, callback_kwargs
+            )
+        except Exception as e:
+            response = self._exception_middleware(request, e)
+            if response is None:
+                raise
+
+        self.check_response(response, callback)
+        return response
+
+    async def _get_response_async(self, request):
+        """
+        _get_response的异步版本, 异步视图直接在事件循环中执行, 同步视图放到线程中执行
+        """
+        callback, callback_args, callback_kwargs = self.resolve_request(request)
+        try:
+            response = await self._view_middleware(
+                request, callback, callback_args, callback_kwargs
+            )
+        except Exception as e:
+            response = await self._exception_middleware(request, e)
+            if response is None:
+                raise
+
+        self.check_response(response, callback)
+        return response
+
+    @staticmethod
+    def call_view(request, callback, callback_args, callback_kwargs):
+        return _sync_view(callback)(request, *callback_args, **callback_kwargs)
+
+    @staticmethod
+    async def call_view_async(request, callback, callback_args, callback_kwargs):
+        if iscoroutinefunction(callback):
+            return await callback(request, *callback_args, **callback_kwargs)
+        return await sync_to_async(callback, thread_sensitive=True)(
+            request, *callback_args, **callback_kwargs
+        )
+
+    def resolve_request(self, request):
+        """解析请求路径, 把匹配结果保存到request.resolver_match"""
+        if hasattr(request, "urlconf"):
+            resolver = get_resolver(request.urlconf)
+        else:
+            resolver = get_resolver()
+        resolver_match = resolver.resolve(request.path_info)
+        request.resolver_match = resolver_match
+        return resolver_match
+
+    @staticmethod
+    def check_response(response, callback, name=None):
+        """视图和中间件必须返回HttpResponse, 返回None或者没有await的协程时报错"""
+        if response is not None and not asyncio.iscoroutine(response):
+            return
+        if name is None:
+            name = "The view %s.%s" % (
+                callback.__module__,
+                getattr(callback, "__qualname__", callback.__class__.__name__),
+            )
+        if response is None:
+            raise ValueError(
+                "%s didn't return an HttpResponse object. It returned None "
+                "instead." % name
+            )
+        raise ValueError(
+            "%s didn't return an HttpResponse object. It returned an "
+            "unawaited coroutine instead. You may need to add an 'await' "
+            "into your view." % name
+        )
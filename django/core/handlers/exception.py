@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :exception.py
+# @Author   :Lowell
+# @Time     :2022/4/15 13:12
+import logging
+import sys
+import traceback
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import (
+    BadRequest,
+    PermissionDenied,
+    RequestAborted,
+    SuspiciousOperation,
+)
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseNotFound,
+    HttpResponseServerError,
+)
+from django.utils.asyncio import iscoroutinefunction
+from django.utils.log import log_response
+
+
+def convert_exception_to_response(get_response):
+    """
+    把get_response抛出的异常转换为对应的4xx/5xx响应
+
+    每一层中间件都用它包装, 中间件不需要关心内层抛出的异常.
+    get_response是协程函数时返回协程函数, 这样异步的调用链不会被打断
+    """
+    if iscoroutinefunction(get_response):
+
+        @wraps(get_response)
+        async def inner(request):
+            try:
+                response = await get_response(request)
+            except RequestAborted:
+                # 客户端已经断开, 交给ASGI handler处理
+                raise
+            except Exception as exc:
+                # 记录日志和发送邮件可能阻塞, 放到线程中执行
+                response = await sync_to_async(
+                    response_for_exception, thread_sensitive=False
+                )(request, exc)
+            return response
+
+        return inner
+
+    @wraps(get_response)
+    def inner(request):
+        try:
+            response = get_response(request)
+        except Exception as exc:
+            response = response_for_exception(request, exc)
+        return response
+
+    return inner
+
+
+def response_for_exception(request, exc):
+    if isinstance(exc, Http404):
+        if settings.DEBUG:
+            response = technical_response(request, HttpResponseNotFound, exc)
+        else:
+            response = HttpResponseNotFound("<h1>Not Found</h1>")
+        log_response(
+            "Not Found: %s", request.path, response=response, request=request
+        )
+
+    elif isinstance(exc, PermissionDenied):
+        response = HttpResponseForbidden("<h1>403 Forbidden</h1>")
+        log_response(
+            "Forbidden (Permission denied): %s",
+            request.path,
+            response=response,
+            request=request,
+            exception=exc,
+        )
+
+    elif isinstance(exc, BadRequest):
+        if settings.DEBUG:
+            response = technical_response(request, HttpResponseBadRequest, exc)
+        else:
+            response = HttpResponseBadRequest("<h1>Bad Request (400)</h1>")
+        log_response(
+            "%s: %s",
+            str(exc),
+            request.path,
+            response=response,
+            request=request,
+            exception=exc,
+        )
+
+    elif isinstance(exc, SuspiciousOperation):
+        # 可疑操作单独记录到django.security.<异常类名>, 不当作请求错误
+        security_logger = logging.getLogger(
+            "django.security.%s" % exc.__class__.__name__
+        )
+        security_logger.error(
+            str(exc),
+            extra={"status_code": 400, "request": request},
+        )
+        if settings.DEBUG:
+            response = technical_response(request, HttpResponseBadRequest, exc)
+        else:
+            response = HttpResponseBadRequest("<h1>Bad Request (400)</h1>")
+
+    else:
+        response = handle_uncaught_exception(request, sys.exc_info())
+        log_response(
+            "%s: %s",
+            response.reason_phrase,
+            request.path,
+            response=response,
+            request=request,
+            exception=exc,
+        )
+
+    return response
+
+
+def handle_uncaught_exception(request, exc_info):
+    """
+    处理未捕获的异常, 设置DEBUG_PROPAGATE_EXCEPTIONS时直接抛出, 交给WSGI服务器处理
+    """
+    if settings.DEBUG_PROPAGATE_EXCEPTIONS:
+        raise
+
+    if settings.DEBUG:
+        return technical_response(request, HttpResponseServerError, exc_info[1])
+    return HttpResponseServerError("<h1>Server Error (500)</h1>")
+
+
+def technical_response(request, response_class, exc):
+    """DEBUG模式下返回纯文本的异常信息"""
+    lines = [
+        "%s at %s" % (exc.__class__.__name__, request.path),
+        "",
+        "".join(traceback.format_exception(type(exc), exc, exc.__traceback__)),
+    ]
+    return response_class(
+        "\n".join(lines),
+        content_type="text/plain; charset=%s" % settings.DEFAULT_CHARSET,
+    )
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :wsgi.py
+# @Author   :Lowell
+# @Time     :2022/4/15 14:05
+from functools import cached_property
+from http.cookies import SimpleCookie
+
+from django.conf import settings
+from django.core.handlers import base
+from django.http import HttpRequest, QueryDict
+from django.urls import get_resolver, set_script_prefix
+
+
+class LimitedStream:
+    """
+    限制最多只能读取limit字节的流
+
+    WSGI服务器提供的wsgi.input可能在请求体读完后阻塞, 所以按照CONTENT_LENGTH截断
+    """
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.remaining = limit
+        self.buffer = b""
+
+    def _read_limited(self, size=None):
+        if size is None or size > self.remaining:
+            size = self.remaining
+        if size == 0:
+            return b""
+        result = self.stream.read(size)
+        self.remaining -= len(result)
+        return result
+
+    def read(self, size=None):
+        if size is None or size < 0:
+            result = self.buffer + self._read_limited()
+            self.buffer = b""
+        elif size < len(self.buffer):
+            result = self.buffer[:size]
+            self.buffer = self.buffer[size:]
+        else:
+            result = self.buffer + self._read_limited(size - len(self.buffer))
+            self.buffer = b""
+        return result
+
+    def readline(self, size=None):
+        while b"\n" not in self.buffer and (size is None or len(self.buffer) < size):
+            if size:
+                # 最多读取size个字节
+                chunk = self._read_limited(size - len(self.buffer))
+            else:
+                chunk = self._read_limited()
+            if not chunk:
+                break
+            self.buffer += chunk
+        end = self.buffer.find(b"\n") + 1
+        if end == 0:
+            end = len(self.buffer)
+        if size is not None and size >= 0:
+            end = min(end, size)
+        line = self.buffer[:end]
+        self.buffer = self.buffer[end:]
+        return line
+
+
+class WSGIRequest(HttpRequest):
+    """根据WSGI的environ创建的请求"""
+
+    def __init__(self, environ):
+        script_name = get_script_name(environ)
+        # PATH_INFO为空时表示根路径
+        path_info = get_path_info(environ) or "/"
+        self.environ = environ
+        self.path_info = path_info
+        # 和SCRIPT_NAME拼接时不能出现两个斜杠
+        self.path = "%s/%s" % (script_name.rstrip("/"), path_info.replace("/", "", 1))
+        self.META = environ
+        self.META["PATH_INFO"] = path_info
+        self.META["SCRIPT_NAME"] = script_name
+        self.method = environ["REQUEST_METHOD"].upper()
+        self.content_type, self.content_params = parse_content_type(
+            environ.get("CONTENT_TYPE", "")
+        )
+        if "charset" in self.content_params:
+            self.encoding = self.content_params["charset"]
+        try:
+            content_length = int(environ.get("CONTENT_LENGTH"))
+        except (ValueError, TypeError):
+            content_length = 0
+        self._stream = LimitedStream(environ["wsgi.input"], content_length)
+        self.resolver_match = None
+        self.FILES = {}
+
+    @cached_property
+    def GET(self):
+        return QueryDict(
+            get_str_from_wsgi(self.environ, "QUERY_STRING", ""),
+            encoding=self.encoding or settings.DEFAULT_CHARSET,
+        )
+
+    @cached_property
+    def POST(self):
+        if self.content_type != "application/x-www-form-urlencoded":
+            return QueryDict()
+        encoding = self.encoding or settings.DEFAULT_CHARSET
+        return QueryDict(self.body.decode(encoding, "replace"), encoding=encoding)
+
+    @cached_property
+    def COOKIES(self):
+        raw_cookie = get_str_from_wsgi(self.environ, "HTTP_COOKIE", "")
+        if not raw_cookie:
+            return {}
+        cookie = SimpleCookie()
+        try:
+            cookie.load(raw_cookie)
+        except Exception:
+            return {}
+        return {key: morsel.value for key, morsel in cookie.items()}
+
+
+class WSGIHandler(base.BaseHandler):
+    """
+    WSGI应用, 由django.core.wsgi.get_wsgi_application()创建
+
+    中间件在创建时就加载好, 每个请求只需要调用编译好的中间件链
+    """
+
+    request_class = WSGIRequest
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_middleware()
+        # 启动时就编译好路由表, 第一个请求不需要等待
+        get_resolver().populate()
+
+    def __call__(self, environ, start_response):
+        request = self.request_class(environ)
+        # WSGIRequest已经计算过SCRIPT_NAME, 不需要再从environ解码一次
+        set_script_prefix(request.META["SCRIPT_NAME"])
+        response = self.get_response(request)
+
+        response._handler_class = self.__class__
+
+        status = "%d %s" % (response.status_code, response.reason_phrase)
+        start_response(status, list(response.items()))
+        return response
+
+
+def get_path_info(environ):
+    """返回PATH_INFO, WSGI服务器按照PEP 3333把它当作latin-1解码, 这里按照UTF-8重新解码"""
+    path_info = get_bytes_from_wsgi(environ, "PATH_INFO", "/")
+    return path_info.decode("utf-8", "replace")
+
+
+def get_script_name(environ):
+    """
+    返回SCRIPT_NAME, 设置了FORCE_SCRIPT_NAME时以它为准
+    """
+    if settings.FORCE_SCRIPT_NAME is not None:
+        return settings.FORCE_SCRIPT_NAME
+
+    script_name = get_bytes_from_wsgi(environ, "SCRIPT_NAME", "")
+    return script_name.decode("utf-8", "replace")
+
+
+def get_bytes_from_wsgi(environ, key, default):
+    """
+    返回environ中key对应的字节串
+
+    PEP 3333规定environ中的字符串都是用latin-1从字节串解码得到的, 这里还原成字节串
+    """
+    value = environ.get(key, default)
+    return value.encode("iso-8859-1")
+
+
+def get_str_from_wsgi(environ, key, default):
+    """返回environ中key对应的字符串, 按照UTF-8解码"""
+    value = get_bytes_from_wsgi(environ, key, default)
+    return value.decode("utf-8", "replace")
+
+
+def parse_content_type(value):
+    """
+    把Content-Type请求头解析成(类型, 参数字典)
+
+        >>> parse_content_type("text/html; charset=utf-8")
+        ('text/html', {'charset': 'utf-8'})
+    """
+    main_type, *params = value.split(";")
+    content_params = {}
+    for param in params:
+        key, sep, val = param.partition("=")
+        if sep:
+            content_params[key.strip().lower()] = val.strip().strip('"')
+    return main_type.strip().lower(), content_params
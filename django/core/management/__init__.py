@@ -4,11 +4,10 @@
 # @Author   :Lowell
 # @Time     :2022/3/29 19:18
 import functools
+import marshal
 import os
-import pkgutil
 import sys
 from collections import defaultdict
-from difflib import get_close_matches
 from importlib import import_module
 
 import django
@@ -21,13 +20,19 @@ from django.core.management.base import (
     CommandError, BaseCommand
 )
 from django.core.management.color import color_style
-from django.utils import autoreload
+
+# 指定命令索引文件路径的环境变量, 没有设置就每次扫描命令目录
+COMMAND_INDEX_ENVIRONMENT_VARIABLE = "DJANGO_COMMAND_INDEX"
+
+COMMAND_INDEX_PROTOCOL = 1
 
 
 def find_commands(management_dir):
     """
     获取命令目录的路径, 返回所有可用命令的名称列表
     """
+    import pkgutil
+
     command_dir = os.path.join(management_dir, "commands")
     return [
         name
@@ -46,22 +51,80 @@ def load_command_class(app_name, name):
     return module.Command()
 
 
+def _command_index_key(sources):
+    """
+    命令索引的键: 每个命令目录的路径和mtime
+
+    在目录中添加、删除或者重命名命令文件都会修改目录的mtime, 从而使索引失效
+    """
+    key = [COMMAND_INDEX_PROTOCOL]
+    for app_name, management_dir in sources:
+        try:
+            mtime = os.stat(os.path.join(management_dir, "commands")).st_mtime_ns
+        except OSError:
+            mtime = None
+        key.append((app_name, management_dir, mtime))
+    return tuple(key)
+
+
+def _collect_commands(sources):
+    commands = {}
+    for app_name, management_dir in sources:
+        commands.update({name: app_name for name in find_commands(management_dir)})
+    return commands
+
+
+def _load_command_index(index_path, sources):
+    """
+    从索引文件中读取命令, 索引不存在或者已经失效就重新扫描并写入索引
+    """
+    key = _command_index_key(sources)
+    try:
+        with open(index_path, "rb") as fp:
+            index_key, commands = marshal.load(fp)
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    else:
+        if index_key == key:
+            return commands
+
+    commands = _collect_commands(sources)
+    tmp_path = "%s.%d.tmp" % (index_path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as fp:
+            marshal.dump((key, commands), fp)
+        # 原子替换, 避免并发执行的命令读到写了一半的索引
+        os.replace(tmp_path, index_path)
+    except OSError:
+        # 写不了索引也不影响命令执行
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return commands
+
+
 @functools.lru_cache(maxsize=None)
 def get_commands():
     """
     返回所有命令, 包括django自带的默认命令,
     以及用户在INSTALLED_APPS注册的app目录中management文件夹中定义的命令
-    """
-    commands = {name: "django.core" for name in find_commands(__path__[0])}
 
-    if not settings.configured:
-        return commands
-
-    for app_config in reversed(apps.get_app_configs()):
-        path = os.path.join(app_config.path, "management")
-        commands.update({name: app_config for name in find_commands(path)})
+    设置环境变量DJANGO_COMMAND_INDEX时, 扫描结果会保存到这个文件中,
+    之后只要命令目录的mtime没有变化就直接读取, 不再扫描目录
+    """
+    # 排在后面的会覆盖前面的命令, 所以应用倒序排列, 让INSTALLED_APPS中靠前的应用优先
+    sources = [("django.core", __path__[0])]
+    if settings.configured:
+        sources.extend(
+            (app_config.name, os.path.join(app_config.path, "management"))
+            for app_config in reversed(apps.get_app_configs())
+        )
 
-    return commands
+    index_path = os.environ.get(COMMAND_INDEX_ENVIRONMENT_VARIABLE)
+    if index_path:
+        return _load_command_index(index_path, sources)
+    return _collect_commands(sources)
 
 
 class ManagementUtility:
@@ -149,6 +212,8 @@ class ManagementUtility:
         if settings.configured:
             # 如果代码修改过, 就自动重启开发服务器
             if subcommand == "runserver" and "--noreload" not in self.argv:
+                from django.utils import autoreload
+
                 try:
                     autoreload.check_errors(django.setup)()
                 except Exception:
@@ -200,6 +265,8 @@ class ManagementUtility:
                 settings.INSTALLED_APPS
             elif not settings.configured:
                 sys.stderr.write("No Django settings specified.\n")
+            from difflib import get_close_matches
+
             possible_matches = get_close_matches(subcommand, commands)
             sys.stderr.write("Unknown command: %r" % subcommand)
             if possible_matches:
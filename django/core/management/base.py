@@ -23,7 +23,7 @@ class CommandError(Exception):
     """
     def __init__(self, *args, returncode=1, **kwargs):
         self.returncode = returncode
-        super(CommandError, self).__init__(**args, **kwargs)
+        super(CommandError, self).__init__(*args, **kwargs)
 
 
 class CommandParser(ArgumentParser):
@@ -33,6 +33,20 @@ class CommandParser(ArgumentParser):
         self.called_from_command_line=called_from_command_line
         super(CommandParser, self).__init__(**kwargs)
 
+    def parse_args(self, args=None, namespace=None):
+        # 如果没有传入任何参数, 就给出自定义的提示
+        if self.missing_args_message and not (
+            args or any(not arg.startswith("-") for arg in args)
+        ):
+            self.error(self.missing_args_message)
+        return super().parse_args(args, namespace)
+
+    def error(self, message):
+        if self.called_from_command_line:
+            super().error(message)
+        else:
+            raise CommandError("Error: %s" % message)
+
 
 def handle_default_options(options):
     if options.settings:
@@ -94,6 +108,20 @@ class OutputWrapper(TextIOBase):
     def __getattr__(self, name):
         return getattr(self._out, name)
 
+    def flush(self):
+        if hasattr(self._out, "flush"):
+            self._out.flush()
+
+    def isatty(self):
+        return hasattr(self._out, "isatty") and self._out.isatty()
+
+    def write(self, msg="", style_func=None, ending=None):
+        ending = self.ending if ending is None else ending
+        if ending and not msg.endswith(ending):
+            msg += ending
+        style_func = style_func or self.style_func
+        self._out.write(style_func(msg))
+
 
 class BaseCommand:
     """
@@ -218,6 +246,72 @@ class BaseCommand:
         """
         pass
 
+    def print_help(self, prog_name, subcommand):
+        """
+        打印命令的帮助信息
+        """
+        parser = self.create_parser(prog_name, subcommand)
+        parser.print_help()
+
+    def run_from_argv(self, argv):
+        """
+        设置环境变量, 然后执行命令
+
+        如果命令抛出CommandError, 就拦截并输出到stderr,
+        如果传入了--traceback参数, 就直接抛出异常
+        """
+        self._called_from_command_line = True
+        parser = self.create_parser(argv[0], argv[1])
+
+        options = parser.parse_args(argv[2:])
+        cmd_options = vars(options)
+        # 将位置参数移出选项
+        args = cmd_options.pop("args", ())
+        handle_default_options(options)
+        from django.utils.log import log_context
+
+        try:
+            # 命令执行过程中的日志带上命令名
+            with log_context(command=argv[1]):
+                self.execute(*args, **cmd_options)
+        except CommandError as e:
+            if options.traceback:
+                raise
+
+            self.stderr.write("%s: %s" % (e.__class__.__name__, e))
+            sys.exit(e.returncode)
+
+    def execute(self, *args, **options):
+        """
+        执行命令, 并根据选项设置输出的颜色和输出流
+        """
+        if options["force_color"] and options["no_color"]:
+            raise CommandError(
+                "The --no-color and --force-color options can't be used together."
+            )
+        if options["force_color"]:
+            self.style = color_style(force_color=True)
+        elif options["no_color"]:
+            self.style = no_style()
+            self.stderr.style_func = None
+        if options.get("stdout"):
+            self.stdout = OutputWrapper(options["stdout"])
+        if options.get("stderr"):
+            self.stderr = OutputWrapper(options["stderr"])
+
+        output = self.handle(*args, **options)
+        if output:
+            self.stdout.write(output)
+        return output
+
+    def handle(self, *args, **options):
+        """
+        命令的实际逻辑, 子类必须实现这个方法
+        """
+        raise NotImplementedError(
+            "subclasses of BaseCommand must provide a handle() method"
+        )
+
     def add_base_argument(self, parser, *args, **kwargs):
         """
         Call the parser's add_argument() method, suppressing the help text
@@ -9,14 +9,18 @@ import sys
 
 from django.utils import termcolors
 
-try:
-    import colorama
-
-    colorama.init()
-except (ImportError, OSError):
-    HAS_COLORAMA = False
+if sys.platform == "win32":
+    try:
+        import colorama
+
+        colorama.init()
+    except (ImportError, OSError):
+        HAS_COLORAMA = False
+    else:
+        HAS_COLORAMA = True
 else:
-    HAS_COLORAMA = True
+    # 只有Windows终端需要colorama转换颜色代码
+    HAS_COLORAMA = False
 
 
 def supports_color():
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :batch.py
+# @Author   :Lowell
+# @Time     :2022/4/11 15:02
+import multiprocessing
+import shlex
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+# 单独一行的分隔符, 并行执行时不同分组之间按顺序执行
+BARRIER = "---"
+
+
+def parse_batch(lines):
+    """
+    解析批量命令, 返回命令分组的列表, 每个分组是参数列表的列表
+
+    空行和以#开头的行会被忽略, 单独一行的---把命令分成多个分组
+    """
+    groups = [[]]
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line == BARRIER:
+            if groups[-1]:
+                groups.append([])
+            continue
+        try:
+            argv = shlex.split(line)
+        except ValueError as err:
+            # 比如引号没有闭合
+            raise CommandError("line %d: %s" % (lineno, err))
+        groups[-1].append(argv)
+    return [group for group in groups if group]
+
+
+def run_command(prog_name, argv):
+    """
+    在当前进程中执行一条命令, 返回(退出码, 耗时)
+    """
+    from django.core.management import ManagementUtility
+
+    start = time.perf_counter()
+    try:
+        utility = ManagementUtility([prog_name] + argv)
+        if argv[0] in ("help", "version") or argv[0].startswith("-"):
+            # 这些不是真正的命令, 交给ManagementUtility处理
+            utility.execute()
+        else:
+            utility.fetch_command(argv[0]).run_from_argv([prog_name] + argv)
+    except SystemExit as exc:
+        if exc.code is None:
+            code = 0
+        elif isinstance(exc.code, int):
+            code = exc.code
+        else:
+            sys.stderr.write("%s\n" % exc.code)
+            code = 1
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    else:
+        code = 0
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return code, time.perf_counter() - start
+
+
+def _setup_worker():
+    """非fork方式启动的子进程需要重新初始化django"""
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs many management commands in one process. Reads one command line "
+        "per line from a file or stdin; a line with only '%s' separates groups "
+        "of commands that may run concurrently with --parallel." % BARRIER
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "file",
+            nargs="?",
+            default="-",
+            help="File with one command per line, '-' (the default) reads stdin.",
+        )
+        parser.add_argument(
+            "--parallel",
+            type=int,
+            default=1,
+            help=(
+                "Run the commands of each group concurrently in a pool of this "
+                "many processes."
+            ),
+        )
+        parser.add_argument(
+            "--keep-going",
+            action="store_true",
+            help="Continue with the remaining commands after a failure.",
+        )
+
+    def handle(self, *args, **options):
+        if options["file"] == "-":
+            groups = parse_batch(sys.stdin)
+        else:
+            try:
+                with open(options["file"]) as fp:
+                    groups = parse_batch(fp)
+            except OSError as exc:
+                raise CommandError(exc)
+
+        prog_name = sys.argv[0] if sys.argv and sys.argv[0] else "manage.py"
+        workers = options["parallel"]
+        keep_going = options["keep_going"]
+        results = []
+
+        if workers > 1:
+            if "fork" in multiprocessing.get_all_start_methods():
+                # fork出来的子进程直接继承已经初始化好的django
+                context = multiprocessing.get_context("fork")
+            else:
+                context = None
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=context, initializer=_setup_worker
+            ) as executor:
+                for group in groups:
+                    futures = [
+                        executor.submit(run_command, prog_name, argv)
+                        for argv in group
+                    ]
+                    for argv, future in zip(group, futures):
+                        results.append((argv,) + future.result())
+                    if not keep_going and any(code for _, code, _ in results):
+                        break
+        else:
+            for argv in (argv for group in groups for argv in group):
+                results.append((argv,) + run_command(prog_name, argv))
+                if results[-1][1] and not keep_going:
+                    break
+
+        self.report(results, sum(len(group) for group in groups))
+
+        failures = [code for _, code, _ in results if code]
+        if failures:
+            raise CommandError(
+                "%d of %d commands failed." % (len(failures), len(results)),
+                returncode=failures[0],
+            )
+
+    def report(self, results, total):
+        self.stdout.write("")
+        for argv, code, seconds in results:
+            if code:
+                status = self.style.ERROR("FAILED %3d" % code)
+            else:
+                status = self.style.SUCCESS("OK        ")
+            self.stdout.write(
+                "%s %8.3fs  %s" % (status, seconds, " ".join(map(shlex.quote, argv)))
+            )
+        skipped = total - len(results)
+        if skipped:
+            self.stdout.write(
+                self.style.WARNING("%d commands skipped after a failure." % skipped)
+            )
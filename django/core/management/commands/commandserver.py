@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :commandserver.py
+# @Author   :Lowell
+# @Time     :2022/4/10 10:31
+import os
+
+from django.core.forkserver import SERVER_ENVIRONMENT_VARIABLE, CommandServer
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Starts a resident process that runs management commands in forked "
+        "children. Point %s at the socket to use it from manage.py."
+        % SERVER_ENVIRONMENT_VARIABLE
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=os.environ.get(SERVER_ENVIRONMENT_VARIABLE),
+            help=(
+                "Path of the Unix socket to listen on, defaults to the %s "
+                "environment variable." % SERVER_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+    def handle(self, *args, **options):
+        path = options["socket"]
+        if not path:
+            raise CommandError(
+                "Pass --socket or set the %s environment variable."
+                % SERVER_ENVIRONMENT_VARIABLE
+            )
+        if not hasattr(os, "fork"):
+            raise CommandError("The command server requires os.fork().")
+
+        server = CommandServer(path, stderr=self.stderr)
+        try:
+            server.bind()
+        except OSError as exc:
+            raise CommandError(exc)
+        self.stdout.write("Command server listening on %s" % path)
+        self.stdout.flush()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :importtime.py
+# @Author   :Lowell
+# @Time     :2022/4/13 11:02
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.importtime import measure_imports, total_us
+
+DEFAULT_MODULES = ["django", "django.conf", "django.core.management"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the import cost of modules, measured with python -X importtime "
+        "in a fresh interpreter, and flags the slowest imports."
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules",
+            nargs="*",
+            help="Modules to import, defaults to %s." % ", ".join(DEFAULT_MODULES),
+        )
+        parser.add_argument(
+            "--setup",
+            action="store_true",
+            help="Also run django.setup() after importing the modules.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Number of runs; the median of each module is reported.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=20,
+            help="Number of modules to show, 0 shows all of them.",
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["self", "cumulative"],
+            default="self",
+            help="Sort by the module's own import time or including its imports.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=2.0,
+            help="Flag modules whose own import time exceeds this many ms.",
+        )
+        parser.add_argument(
+            "--budget",
+            type=float,
+            help="Fail if the total import time exceeds this many ms.",
+        )
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or DEFAULT_MODULES
+        code = "import %s" % ", ".join(modules)
+        if options["setup"]:
+            code += "\nimport django\ndjango.setup()"
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+
+        try:
+            records = measure_imports(code, repeat=options["repeat"])
+        except RuntimeError as exc:
+            raise CommandError(exc)
+
+        key = "self_us" if options["sort"] == "self" else "cumulative_us"
+        ranked = sorted(records, key=lambda record: getattr(record, key), reverse=True)
+        if options["limit"]:
+            ranked = ranked[: options["limit"]]
+
+        threshold = options["threshold"] * 1000
+        self.stdout.write("%10s %12s  %s" % ("self ms", "cumulative", "module"))
+        for record in ranked:
+            line = "%10.2f %12.2f  %s" % (
+                record.self_us / 1000,
+                record.cumulative_us / 1000,
+                record.module,
+            )
+            if record.self_us >= threshold:
+                self.stdout.write(self.style.WARNING(line + "  <-"))
+            else:
+                self.stdout.write(line)
+
+        total = total_us(records) / 1000
+        self.stdout.write(
+            "\n%d modules imported in %.2f ms (median of %d runs)."
+            % (len(records), total, options["repeat"])
+        )
+        if options["budget"] is not None and total > options["budget"]:
+            raise CommandError(
+                "Import time %.2f ms exceeds the budget of %.2f ms."
+                % (total, options["budget"])
+            )
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :wsgi.py
+# @Author   :Lowell
+# @Time     :2022/4/15 14:40
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+
+def get_wsgi_application():
+    """
+    WSGI的公共接口, 项目的wsgi.py通过它创建application
+
+        application = get_wsgi_application()
+
+    脚本前缀由每个请求的SCRIPT_NAME决定, 所以setup时不设置
+    """
+    django.setup(set_prefix=False)
+    return WSGIHandler()
+
+
+def get_internal_wsgi_application():
+    """
+    加载settings.WSGI_APPLICATION指向的WSGI应用, 没有设置时使用get_wsgi_application()
+    """
+    from django.conf import settings
+
+    app_path = getattr(settings, "WSGI_APPLICATION")
+    if app_path is None:
+        return get_wsgi_application()
+
+    try:
+        return import_string(app_path)
+    except ImportError as err:
+        raise ImproperlyConfigured(
+            "WSGI application '%s' could not be loaded; "
+            "Error importing module." % app_path
+        ) from err
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :__init__.py
+# @Author   :Lowell
+# @Time     :2022/4/15 09:36
+from django.http.request import HttpHeaders, HttpRequest, QueryDict
+from django.http.response import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseBase,
+    HttpResponseForbidden,
+    HttpResponseNotAllowed,
+    HttpResponseNotFound,
+    HttpResponseServerError,
+    ResponseHeaders,
+    StreamingHttpResponse,
+)
+
+__all__ = [
+    "HttpHeaders",
+    "HttpRequest",
+    "QueryDict",
+    "Http404",
+    "HttpResponse",
+    "HttpResponseBadRequest",
+    "HttpResponseBase",
+    "HttpResponseForbidden",
+    "HttpResponseNotAllowed",
+    "HttpResponseNotFound",
+    "HttpResponseServerError",
+    "ResponseHeaders",
+    "StreamingHttpResponse",
+]
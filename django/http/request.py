@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :request.py
+# @Author   :Lowell
+# @Time     :2022/4/15 09:40
+from functools import cached_property
+from urllib.parse import parse_qsl
+
+
+class QueryDict(dict):
+    """
+    查询字符串参数, 每个键对应一个值列表, 通过下标读取时返回最后一个值
+    """
+
+    def __init__(self, query_string=None, encoding="utf-8"):
+        super().__init__()
+        if query_string:
+            for key, value in parse_qsl(
+                query_string, keep_blank_values=True, encoding=encoding
+            ):
+                self.setdefault(key, []).append(value)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key)[-1]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except (KeyError, IndexError):
+            return default
+
+    def getlist(self, key, default=None):
+        try:
+            return list(super().__getitem__(key))
+        except KeyError:
+            return [] if default is None else default
+
+    def items(self):
+        for key, values in super().items():
+            yield key, values[-1]
+
+    def lists(self):
+        return super().items()
+
+
+class HttpHeaders(dict):
+    """
+    从META中提取的请求头, 键为首字母大写的形式, 比如Content-Type
+    """
+
+    HTTP_PREFIX = "HTTP_"
+    # 这两个请求头在WSGI环境中没有HTTP_前缀
+    UNPREFIXED_HEADERS = {"CONTENT_TYPE", "CONTENT_LENGTH"}
+
+    def __init__(self, environ):
+        super().__init__()
+        for header, value in environ.items():
+            name = self.parse_header_name(header)
+            if name:
+                super().__setitem__(name, value)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key.replace("_", "-").title())
+
+    def get(self, key, default=None):
+        return super().get(key.replace("_", "-").title(), default)
+
+    def __contains__(self, key):
+        return super().__contains__(key.replace("_", "-").title())
+
+    @classmethod
+    def parse_header_name(cls, header):
+        if header.startswith(cls.HTTP_PREFIX):
+            header = header[len(cls.HTTP_PREFIX):]
+        elif header not in cls.UNPREFIXED_HEADERS:
+            return None
+        return header.replace("_", "-").title()
+
+
+class HttpRequest:
+    """一个HTTP请求"""
+
+    # 请求体的编码, None表示使用settings.DEFAULT_CHARSET
+    encoding = None
+    _stream = None
+
+    def __init__(self):
+        self.GET = QueryDict()
+        self.POST = QueryDict()
+        self.COOKIES = {}
+        self.META = {}
+        self.FILES = {}
+
+        self.path = ""
+        self.path_info = ""
+        self.method = None
+        self.resolver_match = None
+        self.content_type = None
+        self.content_params = None
+
+    def __repr__(self):
+        if self.method is None or not self.get_full_path():
+            return "<%s>" % self.__class__.__name__
+        return "<%s: %s %r>" % (
+            self.__class__.__name__,
+            self.method,
+            self.get_full_path(),
+        )
+
+    @cached_property
+    def headers(self):
+        return HttpHeaders(self.META)
+
+    def get_full_path(self):
+        query_string = self.META.get("QUERY_STRING", "")
+        return "%s%s" % (self.path, ("?" + query_string) if query_string else "")
+
+    @property
+    def body(self):
+        """一次性读取整个请求体, 之后不能再通过read()流式读取"""
+        if not hasattr(self, "_body"):
+            if self._stream is None:
+                self._body = b""
+            else:
+                self._body = self._stream.read()
+                self._stream = None
+        return self._body
+
+    def read(self, *args, **kwargs):
+        """流式读取请求体"""
+        if self._stream is None:
+            return b""
+        return self._stream.read(*args, **kwargs)
+
+    def readline(self, *args, **kwargs):
+        if self._stream is None:
+            return b""
+        return self._stream.readline(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self.readline, b"")
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :response.py
+# @Author   :Lowell
+# @Time     :2022/4/15 10:22
+from http import HTTPStatus
+
+from django.conf import settings
+
+# 状态码 => 原因短语
+REASON_PHRASES = {status.value: status.phrase for status in HTTPStatus}
+
+
+class Http404(Exception):
+    pass
+
+
+class ResponseHeaders:
+    """
+    响应头, 键不区分大小写, 迭代时保留设置时的大小写
+    """
+
+    def __init__(self, data=None):
+        # 小写的键 => (原始的键, 值)
+        self._store = {}
+        if data:
+            for header, value in data.items():
+                self[header] = value
+
+    def __setitem__(self, key, value):
+        self._store[key.lower()] = (key, value)
+
+    def __getitem__(self, key):
+        return self._store[key.lower()][1]
+
+    def __delitem__(self, key):
+        self._store.pop(key.lower(), None)
+
+    def __contains__(self, key):
+        return key.lower() in self._store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __iter__(self):
+        return (key for key, _ in self._store.values())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def get(self, key, default=None):
+        item = self._store.get(key.lower())
+        return default if item is None else item[1]
+
+    def setdefault(self, key, value):
+        if key.lower() not in self._store:
+            self[key] = value
+
+    def items(self):
+        return self._store.values()
+
+
+class HttpResponseBase:
+    """
+    HTTP响应的基类, 只处理状态码和响应头, 响应体由子类处理
+    """
+
+    status_code = 200
+
+    def __init__(
+        self, content_type=None, status=None, reason=None, charset=None, headers=None
+    ):
+        self.headers = ResponseHeaders(headers)
+        self._charset = charset
+        if "Content-Type" not in self.headers:
+            if content_type is None:
+                content_type = "text/html; charset=%s" % self.charset
+            self.headers["Content-Type"] = content_type
+        elif content_type:
+            raise ValueError(
+                "'headers' must not contain 'Content-Type' when the "
+                "'content_type' parameter is provided."
+            )
+        # 响应结束时需要关闭的对象, 比如文件
+        self._resource_closers = []
+        if status is not None:
+            try:
+                self.status_code = int(status)
+            except (ValueError, TypeError):
+                raise TypeError("HTTP status code must be an integer.")
+
+            if not 100 <= self.status_code <= 599:
+                raise ValueError("HTTP status code must be an integer from 100 to 599.")
+        self._reason_phrase = reason
+
+    @property
+    def reason_phrase(self):
+        if self._reason_phrase is not None:
+            return self._reason_phrase
+        return REASON_PHRASES.get(self.status_code, "Unknown Status Code")
+
+    @reason_phrase.setter
+    def reason_phrase(self, value):
+        self._reason_phrase = value
+
+    @property
+    def charset(self):
+        if self._charset is not None:
+            return self._charset
+        return settings.DEFAULT_CHARSET
+
+    @charset.setter
+    def charset(self, value):
+        self._charset = value
+
+    def __setitem__(self, header, value):
+        self.headers[header] = value
+
+    def __delitem__(self, header):
+        del self.headers[header]
+
+    def __getitem__(self, header):
+        return self.headers[header]
+
+    def has_header(self, header):
+        return header in self.headers
+
+    __contains__ = has_header
+
+    def items(self):
+        return self.headers.items()
+
+    def get(self, header, alternate=None):
+        return self.headers.get(header, alternate)
+
+    def setdefault(self, key, value):
+        self.headers.setdefault(key, value)
+
+    def make_bytes(self, value):
+        """把响应体的每一块转换为字节串"""
+        if isinstance(value, (bytes, memoryview)):
+            return bytes(value)
+        if isinstance(value, str):
+            return value.encode(self.charset)
+        return str(value).encode(self.charset)
+
+    def close(self):
+        for closer in self._resource_closers:
+            try:
+                closer()
+            except Exception:
+                pass
+        self._resource_closers.clear()
+        self.closed = True
+
+    def write(self, content):
+        raise OSError("This %s instance is not writable" % self.__class__.__name__)
+
+    def flush(self):
+        pass
+
+    def tell(self):
+        raise OSError(
+            "This %s instance cannot tell its position" % self.__class__.__name__
+        )
+
+    def readable(self):
+        return False
+
+    def seekable(self):
+        return False
+
+    def writable(self):
+        return False
+
+
+class HttpResponse(HttpResponseBase):
+    """
+    响应体是一个字节串的响应
+    """
+
+    streaming = False
+
+    def __init__(self, content=b"", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.content = content
+
+    def __repr__(self):
+        return "<%(cls)s status_code=%(status_code)d%(content_type)s>" % {
+            "cls": self.__class__.__name__,
+            "status_code": self.status_code,
+            "content_type": ', "%s"' % self.headers.get("Content-Type", ""),
+        }
+
+    @property
+    def content(self):
+        return b"".join(self._container)
+
+    @content.setter
+    def content(self, value):
+        if hasattr(value, "__iter__") and not isinstance(
+            value, (bytes, memoryview, str)
+        ):
+            content = b"".join(self.make_bytes(chunk) for chunk in value)
+            if hasattr(value, "close"):
+                try:
+                    value.close()
+                except Exception:
+                    pass
+        else:
+            content = self.make_bytes(value)
+        self._container = [content]
+
+    def __iter__(self):
+        return iter(self._container)
+
+    def write(self, content):
+        self._container.append(self.make_bytes(content))
+
+    def tell(self):
+        return len(self.content)
+
+    def writable(self):
+        return True
+
+
+class StreamingHttpResponse(HttpResponseBase):
+    """
+    响应体是一个迭代器的响应, 每次迭代得到一块内容
+
+    迭代器可以是同步的, 也可以是异步的(有__aiter__), 服务器在写出每一块之后才读取下一块
+    """
+
+    streaming = True
+
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streaming_content = streaming_content
+
+    def __repr__(self):
+        return "<%(cls)s status_code=%(status_code)d%(content_type)s>" % {
+            "cls": self.__class__.__name__,
+            "status_code": self.status_code,
+            "content_type": ', "%s"' % self.headers.get("Content-Type", ""),
+        }
+
+    @property
+    def content(self):
+        raise AttributeError(
+            "This %s instance has no `content` attribute. Use "
+            "`streaming_content` instead." % self.__class__.__name__
+        )
+
+    @property
+    def streaming_content(self):
+        if self.is_async:
+            return self._aiter_bytes()
+        return map(self.make_bytes, self._iterator)
+
+    @streaming_content.setter
+    def streaming_content(self, value):
+        self.is_async = hasattr(value, "__aiter__")
+        if self.is_async:
+            self._iterator = value.__aiter__()
+        else:
+            self._iterator = iter(value)
+        if hasattr(value, "close"):
+            self._resource_closers.append(value.close)
+
+    async def _aiter_bytes(self):
+        async for chunk in self._iterator:
+            yield self.make_bytes(chunk)
+
+    def __iter__(self):
+        if self.is_async:
+            raise TypeError(
+                "StreamingHttpResponse with an asynchronous iterator can only be "
+                "served by the ASGI handler."
+            )
+        return self.streaming_content
+
+    def getvalue(self):
+        return b"".join(self.streaming_content)
+
+    async def aclose(self):
+        """关闭异步迭代器, 再执行close(), 由ASGI handler在响应结束时调用"""
+        if self.is_async and hasattr(self._iterator, "aclose"):
+            await self._iterator.aclose()
+        self.close()
+
+
+class HttpResponseBadRequest(HttpResponse):
+    status_code = 400
+
+
+class HttpResponseForbidden(HttpResponse):
+    status_code = 403
+
+
+class HttpResponseNotFound(HttpResponse):
+    status_code = 404
+
+
+class HttpResponseNotAllowed(HttpResponse):
+    status_code = 405
+
+    def __init__(self, permitted_methods, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self["Allow"] = ", ".join(permitted_methods)
+
+
+class HttpResponseServerError(HttpResponse):
+    status_code = 500
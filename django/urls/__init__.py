@@ -4,6 +4,14 @@
 # @Author   :Lowell
 # @Time     :2022/3/30 13:00
 from .base import (
+    clear_script_prefix,
     get_script_prefix,
+    override_script_prefix,
+    resolve,
+    reverse,
     set_script_prefix
-)
\ No newline at end of file
+)
+from .conf import include, path
+from .converters import register_converter
+from .exceptions import NoReverseMatch, Resolver404
+from .resolvers import ResolverMatch, URLPattern, URLResolver, get_resolver
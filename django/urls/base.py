@@ -3,23 +3,73 @@
 # @FileName :base.py
 # @Author   :Lowell
 # @Time     :2022/3/30 13:00
-from asgiref.local import Local
+from contextlib import contextmanager
+from contextvars import ContextVar
 
-_prefixes = Local()
+from django.urls.resolvers import _is_url_safe, _quote, get_resolver
+
+# 每个线程和每个asyncio任务都有自己的上下文, 并发的请求之间互不影响.
+# asgiref的sync_to_async/async_to_sync会把上下文带到另一边
+_script_prefix = ContextVar("script_prefix", default="/")
 
 
 def set_script_prefix(prefix):
     """
-
+    设置当前上下文的脚本前缀, reverse()生成的URL会带上这个前缀
     """
     if not prefix.endswith("/"):
         prefix += "/"
-    _prefixes.values = prefix
+    _script_prefix.set(prefix)
 
 
 def get_script_prefix():
     """
+    返回当前上下文的脚本前缀, 没有设置过时返回"/"
+    """
+    return _script_prefix.get()
+
+
+def clear_script_prefix():
+    """把当前上下文的脚本前缀恢复为默认值"""
+    _script_prefix.set("/")
 
+
+@contextmanager
+def override_script_prefix(prefix):
     """
-    return getattr(_prefixes, "value", "/")
+    在with代码块内使用prefix作为脚本前缀, 退出时恢复原来的值
+
+    ASGI handler用它为每个请求设置前缀:
 
+        with override_script_prefix(self.get_script_prefix(scope)):
+            await self.handle_request(scope, receive, send)
+    """
+    if not prefix.endswith("/"):
+        prefix += "/"
+    token = _script_prefix.set(prefix)
+    try:
+        yield prefix
+    finally:
+        _script_prefix.reset(token)
+
+
+def resolve(path, urlconf=None):
+    """根据请求路径找到视图, 找不到时抛出Resolver404"""
+    return get_resolver(urlconf).resolve(path)
+
+
+def reverse(viewname, urlconf=None, args=None, kwargs=None):
+    """
+    根据路由的名字(命名空间用":"分隔)或者视图函数生成URL, 带上当前请求的脚本前缀
+
+        reverse("blog:detail", kwargs={"pk": 1})  # "/blog/1/"
+    """
+    path = get_resolver(urlconf).reverse(viewname, args or (), kwargs)
+    prefix = get_script_prefix()
+    if not _is_url_safe(prefix):
+        prefix = _quote(prefix)
+    url = prefix + path
+    # 以"//"开头的路径会被当作协议相对的URL
+    if url.startswith("//"):
+        url = "/%%2F%s" % url[2:]
+    return url
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :conf.py
+# @Author   :Lowell
+# @Time     :2022/4/15 11:08
+from importlib import import_module
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls.resolvers import URLPattern, URLResolver
+
+
+def include(arg, namespace=None):
+    """
+    在path()中引用另一个urlconf
+
+        path("blog/", include("blog.urls")),
+        path("api/", include((api_patterns, "api"), namespace="v1")),
+    """
+    app_name = None
+    if isinstance(arg, tuple):
+        try:
+            urlconf_module, app_name = arg
+        except ValueError:
+            raise ImproperlyConfigured(
+                "Passing a %d-tuple to include() is not supported. Pass a "
+                "2-tuple containing the list of patterns and app_name, and "
+                "provide the namespace argument to include() instead." % len(arg)
+            )
+    else:
+        urlconf_module = arg
+
+    if isinstance(urlconf_module, str):
+        urlconf_module = import_module(urlconf_module)
+    app_name = getattr(urlconf_module, "app_name", app_name)
+    if namespace and not app_name:
+        raise ImproperlyConfigured(
+            "Specifying a namespace in include() without providing an app_name "
+            "is not supported. Set the app_name attribute in the included "
+            "module, or pass a 2-tuple containing the list of patterns and "
+            "app_name instead.",
+        )
+    namespace = namespace or app_name
+    return (urlconf_module, app_name, namespace)
+
+
+def path(route, view, kwargs=None, name=None):
+    """
+    在urlconf中定义一条路由
+
+        urlpatterns = [
+            path("articles/", views.article_list, name="article-list"),
+            path("articles/<int:pk>/", views.article_detail, name="article-detail"),
+        ]
+    """
+    if kwargs is not None and not isinstance(kwargs, dict):
+        raise TypeError(
+            "kwargs argument must be a dict, but got %s." % kwargs.__class__.__name__
+        )
+    if isinstance(view, (list, tuple)):
+        # include()
+        urlconf_module, app_name, namespace = view
+        return URLResolver(
+            route,
+            urlconf_module,
+            kwargs,
+            app_name=app_name,
+            namespace=namespace,
+        )
+    if not callable(view):
+        raise ImproperlyConfigured(
+            "view must be a callable, but got %s for route %r."
+            % (view.__class__.__name__, route)
+        )
+    return URLPattern(route, view, kwargs, name)
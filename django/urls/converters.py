@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :converters.py
+# @Author   :Lowell
+# @Time     :2022/4/16 13:10
+import functools
+import uuid
+
+
+class IntConverter:
+    regex = "[0-9]+"
+
+    def to_python(self, value):
+        return int(value)
+
+    def to_url(self, value):
+        return str(value)
+
+
+class StringConverter:
+    regex = "[^/]+"
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+class UUIDConverter:
+    regex = "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+    def to_python(self, value):
+        return uuid.UUID(value)
+
+    def to_url(self, value):
+        return str(value)
+
+
+class SlugConverter(StringConverter):
+    regex = "[-a-zA-Z0-9_]+"
+
+
+class PathConverter(StringConverter):
+    regex = ".+"
+
+
+DEFAULT_CONVERTERS = {
+    "int": IntConverter(),
+    "path": PathConverter(),
+    "slug": SlugConverter(),
+    "str": StringConverter(),
+    "uuid": UUIDConverter(),
+}
+
+
+REGISTERED_CONVERTERS = {}
+
+
+def register_converter(converter, type_name):
+    """
+    注册自定义转换器, 在路由中通过<type_name:参数名>使用
+
+    转换器需要有regex属性, to_python()和to_url()方法, to_python()抛出ValueError表示不匹配
+    """
+    REGISTERED_CONVERTERS[type_name] = converter()
+    get_converters.cache_clear()
+
+
+@functools.lru_cache(maxsize=None)
+def get_converters():
+    return {**DEFAULT_CONVERTERS, **REGISTERED_CONVERTERS}
+
+
+def get_converter(raw_converter):
+    return get_converters()[raw_converter]
@@ -0,0 +1,16 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :exceptions.py
+# @Author   :Lowell
+# @Time     :2022/4/15 11:05
+from django.http import Http404
+
+
+class Resolver404(Http404):
+    """路径没有匹配到任何路由"""
+    pass
+
+
+class NoReverseMatch(Exception):
+    """根据名字和参数反查不到URL"""
+    pass
@@ -0,0 +1,591 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :resolvers.py
+# @Author   :Lowell
+# @Time     :2022/4/15 11:02
+import functools
+import re
+from importlib import import_module
+from urllib.parse import quote
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from django.core.exceptions import ImproperlyConfigured
+from django.urls.converters import get_converter
+from django.urls.exceptions import NoReverseMatch, Resolver404
+
+_PATH_PARAMETER_COMPONENT_RE = re.compile(
+    r"<(?:(?P<converter>[^>:]+):)?(?P<parameter>[^>]+)>"
+)
+
+# 反查生成URL时不需要编码的字符, 见RFC 3986
+RFC3986_SUBDELIMS = "!$&'()*+,;="
+_quote = functools.partial(quote, safe=RFC3986_SUBDELIMS + "/~:@")
+# 只包含这些字符的参数不需要编码, 大多数参数(数字, slug)可以跳过quote()
+_is_url_safe = re.compile(r"[A-Za-z0-9_.\-~!$&'()*+,;=/:@]*").fullmatch
+
+
+def _route_to_regex(route):
+    """
+    把路由转换成正则表达式, 返回(正则, {参数名: 转换器})
+
+        >>> _route_to_regex("page-<int:number>")
+        ('page\\-(?P<number>[0-9]+)', {'number': <IntConverter>})
+    """
+    original_route = route
+    parts = []
+    converters = {}
+    while True:
+        match = _PATH_PARAMETER_COMPONENT_RE.search(route)
+        if not match:
+            parts.append(re.escape(route))
+            break
+        parts.append(re.escape(route[: match.start()]))
+        route = route[match.end():]
+        parameter = match["parameter"]
+        if not parameter.isidentifier():
+            raise ImproperlyConfigured(
+                "URL route '%s' uses parameter name %r which isn't a valid "
+                "Python identifier." % (original_route, parameter)
+            )
+        raw_converter = match["converter"] or "str"
+        try:
+            converter = get_converter(raw_converter)
+        except KeyError as e:
+            raise ImproperlyConfigured(
+                "URL route '%s' uses invalid converter %r."
+                % (original_route, raw_converter)
+            ) from e
+        converters[parameter] = converter
+        parts.append("(?P<%s>%s)" % (parameter, converter.regex))
+    return "".join(parts), converters
+
+
+def _route_to_template(route):
+    """
+    把路由编译成反查用的模板, 返回(模板, 参数名列表)
+
+    模板中固定的部分已经做过URL编码, 参数的位置是%s
+
+        >>> _route_to_template("articles/<int:year>/")
+        ('articles/%s/', ['year'])
+    """
+    parts = []
+    params = []
+    position = 0
+    for match in _PATH_PARAMETER_COMPONENT_RE.finditer(route):
+        parts.append(_quote(route[position:match.start()]).replace("%", "%%"))
+        parts.append("%s")
+        params.append(match["parameter"])
+        position = match.end()
+    parts.append(_quote(route[position:]).replace("%", "%%"))
+    return "".join(parts), params
+
+
+_SLASH = ord("/")
+# 这些类别都包含"/"
+_SLASH_CATEGORIES = {
+    sre_parse.CATEGORY_NOT_DIGIT,
+    sre_parse.CATEGORY_NOT_WORD,
+    sre_parse.CATEGORY_NOT_SPACE,
+    sre_parse.CATEGORY_UNI_NOT_DIGIT,
+    sre_parse.CATEGORY_UNI_NOT_WORD,
+    sre_parse.CATEGORY_UNI_NOT_SPACE,
+}
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT}
+if hasattr(sre_parse, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_parse.POSSESSIVE_REPEAT)
+
+
+def _set_has_slash(items):
+    """字符集[...]是否包含斜杠"""
+    negate = False
+    found = False
+    for op, av in items:
+        if op is sre_parse.NEGATE:
+            negate = True
+        elif op is sre_parse.LITERAL:
+            found = found or av == _SLASH
+        elif op in (sre_parse.RANGE, getattr(sre_parse, "RANGE_UNI_IGNORE", None)):
+            found = found or av[0] <= _SLASH <= av[1]
+        elif op is sre_parse.CATEGORY:
+            found = found or av in _SLASH_CATEGORIES
+        else:
+            # 不认识的写法按能匹配处理
+            return True
+    return found is not negate
+
+
+def _pattern_has_slash(pattern):
+    """解析后的正则里是否有能消耗"/"的部分"""
+    for op, av in pattern:
+        if op is sre_parse.LITERAL:
+            if av == _SLASH:
+                return True
+        elif op is sre_parse.NOT_LITERAL:
+            if av != _SLASH:
+                return True
+        elif op is sre_parse.ANY:
+            return True
+        elif op is sre_parse.IN:
+            if _set_has_slash(av):
+                return True
+        elif op is sre_parse.SUBPATTERN:
+            if _pattern_has_slash(av[-1]):
+                return True
+        elif op in _REPEATS:
+            if _pattern_has_slash(av[2]):
+                return True
+        elif op is sre_parse.BRANCH:
+            if any(_pattern_has_slash(branch) for branch in av[1]):
+                return True
+        elif op is sre_parse.GROUPREF_EXISTS:
+            if any(branch and _pattern_has_slash(branch) for branch in av[1:]):
+                return True
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            if _pattern_has_slash(av):
+                return True
+        elif op in (
+            sre_parse.AT,
+            sre_parse.ASSERT,
+            sre_parse.ASSERT_NOT,
+            sre_parse.GROUPREF,
+        ):
+            # 断言不消耗字符, 反向引用的内容由分组本身决定
+            continue
+        else:
+            return True
+    return False
+
+
+def _matches_slash(converter):
+    """
+    转换器的正则能否匹配"/", 能匹配的参数可能跨越多个路径片段, 比如<path:...>
+
+    直接分析正则的语法树: 只要有"/", ".", 取反的字符集或者\\D, \\W, \\S就算能匹配
+    """
+    return _pattern_has_slash(sre_parse.parse(converter.regex))
+
+
+class ResolverMatch:
+    """路由匹配的结果, 保存视图函数和从路径中解析出的参数"""
+
+    def __init__(
+        self, func, args, kwargs, url_name=None, route=None, namespaces=None
+    ):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.url_name = url_name
+        self.route = route
+        self.namespaces = [x for x in namespaces or () if x]
+        self.namespace = ":".join(self.namespaces)
+        self.view_name = ":".join([*self.namespaces, url_name or ""])
+
+    def __getitem__(self, index):
+        return (self.func, self.args, self.kwargs)[index]
+
+    def __repr__(self):
+        return (
+            "ResolverMatch(func=%r, args=%r, kwargs=%r, url_name=%r, namespaces=%r, "
+            "route=%r)"
+            % (
+                self.func,
+                self.args,
+                self.kwargs,
+                self.url_name,
+                self.namespaces,
+                self.route,
+            )
+        )
+
+
+class URLPattern:
+    """urlconf中的一条路由, 由path()创建"""
+
+    def __init__(self, route, callback, default_args=None, name=None):
+        self.route = route
+        self.callback = callback
+        self.default_args = default_args or {}
+        self.name = name
+        # 提前检查路由中的参数和转换器
+        _route_to_regex(route)
+
+    def __repr__(self):
+        return "<%s %r%s>" % (
+            self.__class__.__name__,
+            self.route,
+            " [name=%r]" % self.name if self.name else "",
+        )
+
+
+class _Route:
+    """
+    展开include()之后的一条完整路由
+    """
+
+    __slots__ = ("order", "route", "pattern", "converters", "default_args", "namespaces")
+
+    def __init__(self, order, route, pattern, default_args, namespaces):
+        self.order = order
+        self.route = route
+        self.pattern = pattern
+        self.converters = _route_to_regex(route)[1]
+        self.default_args = default_args
+        self.namespaces = namespaces
+
+    def convert(self, captured):
+        """把匹配到的字符串转换成参数, 转换器抛出ValueError时返回None, 表示不匹配"""
+        converters = self.converters
+        kwargs = {}
+        try:
+            for key, value in captured.items():
+                kwargs[key] = converters[key].to_python(value)
+        except ValueError:
+            return None
+        kwargs.update(self.default_args)
+        return kwargs
+
+
+class _ReverseTemplate:
+    """
+    一条路由的反查模板, 在编译路由表时生成
+    """
+
+    __slots__ = ("route", "template", "params", "converters", "defaults")
+
+    def __init__(self, route, converters, defaults):
+        self.route = route
+        self.template, self.params = _route_to_template(route)
+        # 参数名 => (to_url, 检查转换结果的正则)
+        self.converters = {
+            name: (converter.to_url, re.compile(converter.regex).fullmatch)
+            for name, converter in converters.items()
+        }
+        self.defaults = defaults
+
+    def expand(self, values):
+        """把参数填进模板, 转换失败或者结果不符合转换器的正则时返回None"""
+        texts = []
+        converters = self.converters
+        for name in self.params:
+            to_url, fullmatch = converters[name]
+            try:
+                text = str(to_url(values[name]))
+            except ValueError:
+                return None
+            if fullmatch(text) is None:
+                return None
+            texts.append(text if _is_url_safe(text) else _quote(text))
+        return self.template % tuple(texts)
+
+
+class _TrieNode:
+    """
+    前缀树的节点, 每一层对应路径中的一个片段
+
+    static: 固定片段 => 子节点
+    dynamic: 带参数的片段, [(正则, 子节点)], 按照加入的顺序排列
+    tails: 从这一层开始的剩余路径中含有可以匹配"/"的参数, [(路由序号, 正则, 路由)]
+    endpoint: 在这一层结束的第一条路由
+    min_order: 子树中最靠前的路由序号, 用来剪枝
+    """
+
+    __slots__ = ("static", "dynamic", "_dynamic_index", "tails", "endpoint", "min_order")
+
+    def __init__(self):
+        self.static = {}
+        self.dynamic = []
+        self._dynamic_index = {}
+        self.tails = []
+        self.endpoint = None
+        self.min_order = float("inf")
+
+    def dynamic_child(self, segment):
+        child = self._dynamic_index.get(segment)
+        if child is None:
+            child = self._dynamic_index[segment] = _TrieNode()
+            regex = re.compile(_route_to_regex(segment)[0])
+            self.dynamic.append((regex.fullmatch, child))
+        return child
+
+
+class URLResolver:
+    """
+    根据urlconf模块的urlpatterns解析请求路径
+
+    第一次使用时(handler在启动时调用populate())展开所有的include(),
+    把完整的路由表编译成一棵按路径片段划分的前缀树: 固定片段用字典查找, 带参数的片段用转换器的正则匹配.
+    解析的耗时和路径的深度有关, 和路由的数量无关. 多条路由都能匹配时和按顺序匹配一样, 以urlconf中靠前的为准
+
+    反查时每个有名字的路由已经编译成模板, (名字, 参数的形式)对应的候选模板缓存在一个有上限的LRU中
+    """
+
+    # 反查缓存的条目数上限
+    reverse_cache_size = 1024
+
+    def __init__(
+        self, route, urlconf_name, default_kwargs=None, app_name=None, namespace=None
+    ):
+        self.route = route
+        self.urlconf_name = urlconf_name
+        self.default_kwargs = default_kwargs or {}
+        self.app_name = app_name
+        self.namespace = namespace
+        self._trie = None
+        self._routes = None
+        self._reverse_dict = None
+        self._reverse_candidates = functools.lru_cache(
+            maxsize=self.reverse_cache_size
+        )(self._find_reverse_candidates)
+
+    def __repr__(self):
+        return "<%s %r (%s:%s) %r>" % (
+            self.__class__.__name__,
+            self.urlconf_name,
+            self.app_name,
+            self.namespace,
+            self.route,
+        )
+
+    @functools.cached_property
+    def urlconf_module(self):
+        if isinstance(self.urlconf_name, str):
+            return import_module(self.urlconf_name)
+        return self.urlconf_name
+
+    @functools.cached_property
+    def url_patterns(self):
+        patterns = getattr(self.urlconf_module, "urlpatterns", self.urlconf_module)
+        try:
+            iter(patterns)
+        except TypeError as e:
+            raise ImproperlyConfigured(
+                "The included URLconf '%s' does not appear to have any patterns "
+                "in it." % self.urlconf_name
+            ) from e
+        return patterns
+
+    def _iter_routes(self, prefix, namespaces, default_kwargs):
+        """展开include(), 按顺序返回(完整路由, URLPattern, 命名空间, 默认参数)"""
+        for pattern in self.url_patterns:
+            if isinstance(pattern, URLResolver):
+                yield from pattern._iter_routes(
+                    prefix + pattern.route,
+                    (namespaces + (pattern.namespace,))
+                    if pattern.namespace
+                    else namespaces,
+                    {**default_kwargs, **pattern.default_kwargs},
+                )
+            else:
+                yield (
+                    prefix + pattern.route,
+                    pattern,
+                    namespaces,
+                    {**default_kwargs, **pattern.default_args},
+                )
+
+    def populate(self):
+        """编译路由表, 重复调用不会重新编译"""
+        if self._trie is not None:
+            return
+        trie = _TrieNode()
+        routes = []
+        for order, (route, pattern, namespaces, default_args) in enumerate(
+            self._iter_routes("", (), self.default_kwargs)
+        ):
+            entry = _Route(order, route, pattern, default_args, namespaces)
+            routes.append(entry)
+            self._insert(trie, entry)
+        reverse_dict = {}
+        # 同名的路由以urlconf中靠后的为准, 所以倒序加入
+        for entry in reversed(routes):
+            template = _ReverseTemplate(
+                entry.route, entry.converters, entry.default_args
+            )
+            pattern = entry.pattern
+            if pattern.name:
+                view_name = ":".join(entry.namespaces + (pattern.name,))
+                reverse_dict.setdefault(view_name, []).append(template)
+            if not entry.namespaces:
+                reverse_dict.setdefault(pattern.callback, []).append(template)
+        self._routes = routes
+        self._reverse_dict = reverse_dict
+        self._reverse_candidates.cache_clear()
+        # 最后赋值, 其他线程看到的前缀树总是完整的
+        self._trie = trie
+
+    @staticmethod
+    def _insert(trie, entry):
+        node = trie
+        node.min_order = min(node.min_order, entry.order)
+        segments = entry.route.split("/")
+        for index, segment in enumerate(segments):
+            if "<" in segment:
+                converters = _route_to_regex(segment)[1]
+                if any(_matches_slash(c) for c in converters.values()):
+                    # 剩余的路径整体匹配
+                    regex = re.compile(_route_to_regex("/".join(segments[index:]))[0])
+                    node.tails.append((entry.order, regex.fullmatch, entry))
+                    return
+                node = node.dynamic_child(segment)
+            else:
+                node = node.static.setdefault(segment, _TrieNode())
+            node.min_order = min(node.min_order, entry.order)
+        if node.endpoint is None:
+            node.endpoint = entry
+
+    def _search(self, node, segments, index, captured, limit):
+        """
+        在node的子树中查找序号小于limit且最靠前的路由, 返回(路由, 参数)或者None
+        """
+        best = None
+        if index == len(segments):
+            entry = node.endpoint
+            if entry is not None and entry.order < limit:
+                kwargs = entry.convert(captured)
+                if kwargs is not None:
+                    best = (entry, kwargs)
+                    limit = entry.order
+        else:
+            segment = segments[index]
+            child = node.static.get(segment)
+            if child is not None and child.min_order < limit:
+                found = self._search(child, segments, index + 1, captured, limit)
+                if found is not None:
+                    best = found
+                    limit = found[0].order
+            for fullmatch, child in node.dynamic:
+                if child.min_order >= limit:
+                    continue
+                match = fullmatch(segment)
+                if match is not None:
+                    found = self._search(
+                        child,
+                        segments,
+                        index + 1,
+                        {**captured, **match.groupdict()},
+                        limit,
+                    )
+                    if found is not None:
+                        best = found
+                        limit = found[0].order
+        if node.tails:
+            remainder = "/".join(segments[index:])
+            for order, fullmatch, entry in node.tails:
+                if order >= limit:
+                    # 按序号排列, 后面的都不可能更靠前
+                    break
+                match = fullmatch(remainder)
+                if match is not None:
+                    kwargs = entry.convert({**captured, **match.groupdict()})
+                    if kwargs is not None:
+                        best = (entry, kwargs)
+                        break
+        return best
+
+    def resolve(self, path):
+        if self._trie is None:
+            self.populate()
+        route = path[1:] if path.startswith("/") else path
+        found = self._search(self._trie, route.split("/"), 0, {}, float("inf"))
+        if found is None:
+            raise Resolver404({"path": route})
+        entry, kwargs = found
+        pattern = entry.pattern
+        return ResolverMatch(
+            pattern.callback,
+            (),
+            kwargs,
+            pattern.name,
+            entry.route,
+            entry.namespaces,
+        )
+
+    def _find_reverse_candidates(self, lookup_view, positional, shape):
+        """
+        找出参数形式能够匹配的模板
+
+        positional为True时shape是位置参数的个数, 否则是关键字参数的名字
+        """
+        templates = self._reverse_dict.get(lookup_view, ())
+        if positional:
+            return tuple(t for t in templates if len(t.params) == shape)
+        keys = set(shape)
+        return tuple(
+            t
+            for t in templates
+            if not keys.symmetric_difference(t.params).difference(t.defaults)
+        )
+
+    def reverse(self, lookup_view, args=(), kwargs=None):
+        """
+        根据路由的名字(或者视图函数)和参数生成路径, 不包含脚本前缀和开头的"/"
+        """
+        if self._trie is None:
+            self.populate()
+        if args and kwargs:
+            raise ValueError("Don't mix *args and **kwargs in call to reverse()!")
+        if args:
+            candidates = self._reverse_candidates(lookup_view, True, len(args))
+        else:
+            kwargs = kwargs or {}
+            candidates = self._reverse_candidates(lookup_view, False, tuple(kwargs))
+
+        for template in candidates:
+            if args:
+                values = dict(zip(template.params, args))
+            else:
+                defaults = template.defaults
+                if defaults:
+                    if any(kwargs.get(k, v) != v for k, v in defaults.items()):
+                        continue
+                    values = {**defaults, **kwargs}
+                else:
+                    values = kwargs
+            url = template.expand(values)
+            if url is not None:
+                return url
+        raise self._no_reverse_match(lookup_view, args, kwargs)
+
+    def _no_reverse_match(self, lookup_view, args, kwargs):
+        if callable(lookup_view):
+            lookup_view_s = "%s.%s" % (
+                lookup_view.__module__,
+                getattr(lookup_view, "__qualname__", lookup_view.__class__.__name__),
+            )
+        else:
+            lookup_view_s = lookup_view
+
+        patterns = [t.route for t in self._reverse_dict.get(lookup_view, ())]
+        if not patterns:
+            return NoReverseMatch(
+                "Reverse for '%s' not found. '%s' is not a valid view function "
+                "or pattern name." % (lookup_view_s, lookup_view_s)
+            )
+        if args:
+            arg_msg = "arguments '%s'" % (args,)
+        elif kwargs:
+            arg_msg = "keyword arguments '%s'" % kwargs
+        else:
+            arg_msg = "no arguments"
+        return NoReverseMatch(
+            "Reverse for '%s' with %s not found. %d pattern(s) tried: %s"
+            % (lookup_view_s, arg_msg, len(patterns), patterns)
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_cached_resolver(urlconf):
+    return URLResolver("", urlconf)
+
+
+def get_resolver(urlconf=None):
+    if urlconf is None:
+        from django.conf import settings
+
+        urlconf = settings.ROOT_URLCONF
+    return _get_cached_resolver(urlconf)
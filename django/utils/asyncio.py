@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :asyncio.py
+# @Author   :Lowell
+# @Time     :2022/4/16 17:30
+"""
+兼容Pipfile.lock锁定的asgiref 3.5.0
+
+asgiref 3.6才有iscoroutinefunction/markcoroutinefunction, 旧版本中改用asyncio的判断方式:
+sync_to_async()返回的对象通过_is_coroutine属性标记自己.
+旧版本的async_to_sync()在创建时就确定使用哪个事件循环, 启动时创建的转换器找不到
+请求所在的事件循环, 每次调用都会新开一个线程和事件循环, 所以改为每次调用时再创建
+"""
+import asyncio
+import inspect
+from functools import wraps
+
+try:
+    from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction
+except ImportError:
+    from asgiref.sync import async_to_sync as _async_to_sync
+
+    # asyncio.iscoroutinefunction同时认识inspect的标记和旧版asgiref设置的_is_coroutine
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        """把func标记为协程函数, 用于async def __call__的可调用对象"""
+        if hasattr(inspect, "markcoroutinefunction"):
+            return inspect.markcoroutinefunction(func)
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+    def async_to_sync(awaitable):
+        """在调用的线程中创建转换器, 这样才能回到请求所在的事件循环"""
+
+        @wraps(awaitable)
+        def inner(*args, **kwargs):
+            return _async_to_sync(awaitable)(*args, **kwargs)
+
+        return inner
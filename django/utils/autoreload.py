@@ -4,13 +4,51 @@
 # @Author   :Lowell
 # @Time     :2022/3/30 14:12
 import functools
+import itertools
+import logging
+import os
+import select
+import signal
+import struct
+import subprocess
 import sys
+import threading
+import time
 import traceback
+import weakref
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from types import ModuleType
+from zipimport import zipimporter
 
+import django
+from django.apps import apps
 
+logger = logging.getLogger("django.utils.autoreload")
+
+# 如果初始化应用时出错, 会把出错的文件加到这里, 这些文件修改后同样需要重启
 _error_files = []
 _exception = None
 
+try:
+    import termios
+except ImportError:
+    termios = None
+
+# 子进程中设置这个环境变量, 表示在子进程中运行django, 父进程只负责重启子进程
+DJANGO_AUTORELOAD_ENV = "RUN_MAIN"
+
+
+def is_django_module(module):
+    """判断模块是否是django自身的模块"""
+    return module.__name__.startswith("django.")
+
+
+def is_django_path(path):
+    """判断文件是否是django自身的文件"""
+    return Path(django.__file__).parent in Path(path).parents
+
 
 def check_errors(fn):
     @functools.wraps(fn)
@@ -35,3 +73,641 @@ def check_errors(fn):
 
     return wrapper
 
+
+def raise_last_exception():
+    global _exception
+    if _exception is not None:
+        raise _exception[1]
+
+
+def ensure_echo_on():
+    """
+    确保终端的回显是打开的, 在pdb中重启时回显可能被关闭了
+    """
+    if not termios or not sys.stdin.isatty():
+        return
+    attr_list = termios.tcgetattr(sys.stdin)
+    if not attr_list[3] & termios.ECHO:
+        attr_list[3] |= termios.ECHO
+        if hasattr(signal, "SIGTTOU"):
+            old_handler = signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+        else:
+            old_handler = None
+        termios.tcsetattr(sys.stdin, termios.TCSANOW, attr_list)
+        if old_handler is not None:
+            signal.signal(signal.SIGTTOU, old_handler)
+
+
+def iter_all_python_module_files():
+    """
+    返回sys.modules中所有模块的文件以及_error_files
+    """
+    # 排序后的模块元组作为iter_modules_and_files的缓存键,
+    # 没有导入新模块时就直接使用缓存
+    keys = sorted(sys.modules)
+    modules = tuple(
+        m
+        for m in map(sys.modules.__getitem__, keys)
+        if not isinstance(m, weakref.ProxyTypes)
+    )
+    return iter_modules_and_files(modules, frozenset(_error_files))
+
+
+@functools.lru_cache(maxsize=1)
+def iter_modules_and_files(modules, extra_files):
+    """
+    返回模块对应的所有文件的绝对路径
+    """
+    sys_file_paths = []
+    for module in modules:
+        # 有些模块不是ModuleType, 比如six.moves, 跳过它们
+        if not isinstance(module, ModuleType):
+            continue
+        if module.__name__ in ("__main__", "__mp_main__"):
+            # __main__模块(比如manage.py)的__spec__可能是None
+            if getattr(module, "__file__", None):
+                sys_file_paths.append(module.__file__)
+            continue
+        if getattr(module, "__spec__", None) is None:
+            continue
+        spec = module.__spec__
+        # 内置模块没有文件
+        if spec.has_location:
+            origin = (
+                spec.loader.archive
+                if isinstance(spec.loader, zipimporter)
+                else spec.origin
+            )
+            sys_file_paths.append(origin)
+
+    results = set()
+    for filename in itertools.chain(sys_file_paths, extra_files):
+        if not filename:
+            continue
+        path = Path(filename)
+        try:
+            if not path.exists():
+                # 比如frozen模块, 文件并不存在
+                continue
+        except ValueError as e:
+            # 路径中包含空字符
+            logger.debug('"%s" raised when resolving path: "%s"', e, path)
+            continue
+        results.add(path.resolve().absolute())
+    return frozenset(results)
+
+
+def get_child_arguments():
+    """
+    返回重新执行当前程序的命令行参数
+    """
+    import __main__
+
+    py_script = Path(sys.argv[0])
+
+    args = [sys.executable] + ["-W%s" % o for o in sys.warnoptions]
+    if sys.implementation.name == "cpython":
+        args.extend(
+            "-X%s" % key if value is True else "-X%s=%s" % (key, value)
+            for key, value in sys._xoptions.items()
+        )
+    # 使用python -m启动时, __main__.__spec__不是None
+    if getattr(__main__, "__spec__", None) is not None:
+        spec = __main__.__spec__
+        if (spec.name == "__main__" or spec.name.endswith(".__main__")) and spec.parent:
+            name = spec.parent
+        else:
+            name = spec.name
+        args += ["-m", name]
+        args += sys.argv[1:]
+    elif not py_script.exists():
+        raise RuntimeError("Script %s does not exist." % py_script)
+    else:
+        args += sys.argv
+    return args
+
+
+def trigger_reload(filename):
+    logger.info("%s changed, reloading.", filename)
+    sys.exit(3)
+
+
+def restart_with_reloader():
+    """
+    在子进程中运行当前程序, 子进程以退出码3退出时就重新启动
+    """
+    new_environ = {**os.environ, DJANGO_AUTORELOAD_ENV: "true"}
+    args = get_child_arguments()
+    while True:
+        p = subprocess.run(args, env=new_environ, close_fds=False)
+        if p.returncode != 3:
+            return p.returncode
+
+
+class BaseReloader:
+    # 文件变化之后, 等待这么久(秒)没有新的变化才重启,
+    # 把一次保存产生的一连串变化合并成一次重启
+    DEBOUNCE = 0.1
+
+    def __init__(self):
+        self.extra_files = set()
+        self.directory_globs = defaultdict(set)
+        self._stop_condition = threading.Event()
+        self._changed_files = []
+        self._last_change = None
+
+    def watch_dir(self, path, glob):
+        """监听目录中匹配glob的文件"""
+        path = Path(path)
+        try:
+            path = path.absolute()
+        except FileNotFoundError:
+            logger.debug(
+                "Unable to watch directory %s as it cannot be resolved.",
+                path,
+                exc_info=True,
+            )
+            return
+        logger.debug("Watching dir %s with glob %s.", path, glob)
+        self.directory_globs[path].add(glob)
+
+    def watched_files(self, include_globs=True):
+        """
+        返回所有需要监听的文件, 包括sys.modules中的模块文件
+        """
+        yield from iter_all_python_module_files()
+        yield from self.extra_files
+        if include_globs:
+            for directory, patterns in self.directory_globs.items():
+                for pattern in patterns:
+                    yield from directory.glob(pattern)
+
+    def wait_for_apps_ready(self, app_reg, django_main_thread):
+        """
+        等待应用注册完成, 如果django主线程提前退出了就返回False
+
+        应用注册完成后再开始监听, 避免在导入过程中模块列表不断变化
+        """
+        while django_main_thread.is_alive():
+            if app_reg.ready_event.wait(timeout=0.1):
+                return True
+        else:
+            return False
+
+    def run(self, django_main_thread):
+        logger.debug("Waiting for apps ready_event.")
+        self.wait_for_apps_ready(apps, django_main_thread)
+        logger.debug("Apps ready_event triggered. Starting to watch files.")
+        self.run_loop()
+
+    def run_loop(self):
+        ticker = self.tick()
+        while not self.should_stop:
+            try:
+                next(ticker)
+            except StopIteration:
+                break
+            if (
+                self._changed_files
+                and time.monotonic() - self._last_change >= self.DEBOUNCE
+            ):
+                self.reload()
+        self.stop()
+
+    def tick(self):
+        """
+        监听文件变化的生成器, 每次迭代检查一次文件变化, 发现变化时调用notify_file_changed()
+
+        有未处理的变化时, 每次迭代的间隔不应该超过DEBOUNCE
+        """
+        raise NotImplementedError("subclasses must implement tick().")
+
+    @classmethod
+    def check_availability(cls):
+        raise NotImplementedError("subclasses must implement check_availability().")
+
+    def notify_file_changed(self, path):
+        logger.debug("%s notified as changed.", path)
+        if path not in self._changed_files:
+            self._changed_files.append(path)
+        self._last_change = time.monotonic()
+
+    def reload(self):
+        """所有的变化都已经合并, 重启进程"""
+        changed = self._changed_files
+        self._changed_files = []
+        if len(changed) == 1:
+            trigger_reload(changed[0])
+        trigger_reload("%s and %d other files" % (changed[0], len(changed) - 1))
+
+    @property
+    def should_stop(self):
+        return self._stop_condition.is_set()
+
+    def stop(self):
+        self._stop_condition.set()
+
+
+class MtimeIndex:
+    """
+    被监听文件的mtime索引
+
+    文件路径保存在列表中, mtime(纳秒)保存在array中, 同时按照所在目录分组并记录目录的mtime.
+    check_files()每次只检查从游标开始的一批文件, 多次调用轮流检查完所有文件;
+    check_directories()检查所有目录, 目录的mtime变化时(新建、删除或者重命名了文件,
+    比如编辑器用重命名的方式保存)立即检查目录中的所有文件, 不用等游标轮到它们.
+
+    目录包括每个文件所在的目录. mtime没有变化的目录中的文件仍然会被游标轮流检查:
+    原地写入文件(很多编辑器的默认保存方式)不会改变目录的mtime, 跳过这些文件会漏掉修改.
+    所以目录的mtime只用来更快地发现变化, 不能用来跳过文件, 每次检查的开销由check_files()的deadline限制.
+    """
+
+    # 还没有检查过的文件或者目录
+    UNKNOWN = -1
+
+    def __init__(self, paths, directories=(), previous=None):
+        self.paths = list(paths)
+        self.mtimes = array("q", [self.UNKNOWN]) * len(self.paths)
+        groups = {directory: [] for directory in directories}
+        for i, path in enumerate(self.paths):
+            groups.setdefault(os.path.dirname(path), []).append(i)
+        self.directories = list(groups)
+        self.members = [array("L", members) for members in groups.values()]
+        self.dir_mtimes = array("q", [self.UNKNOWN]) * len(self.directories)
+        self.cursor = 0
+
+        if previous is not None:
+            # 监听列表变化时保留已经检查过的mtime, 不会漏掉两次检查之间的变化
+            self._carry_over(self.paths, self.mtimes, previous.paths, previous.mtimes)
+            self._carry_over(
+                self.directories,
+                self.dir_mtimes,
+                previous.directories,
+                previous.dir_mtimes,
+            )
+            if self.paths:
+                self.cursor = previous.cursor % len(self.paths)
+
+    @staticmethod
+    def _carry_over(names, mtimes, old_names, old_mtimes):
+        positions = {name: i for i, name in enumerate(old_names)}
+        for i, name in enumerate(names):
+            j = positions.get(name)
+            if j is not None:
+                mtimes[i] = old_mtimes[j]
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _check(self, i, notify):
+        try:
+            mtime = os.stat(self.paths[i]).st_mtime_ns
+        except OSError:
+            # 文件暂时不存在, 保留原来的mtime, 重新出现时再比较
+            return
+        old = self.mtimes[i]
+        if old == mtime:
+            return
+        self.mtimes[i] = mtime
+        if old == self.UNKNOWN:
+            logger.debug("File %s first seen with mtime %s", self.paths[i], mtime)
+        else:
+            logger.debug(
+                "File %s previous mtime: %s, current mtime: %s",
+                self.paths[i],
+                old,
+                mtime,
+            )
+            notify(self.paths[i])
+
+    def check_files(self, notify, deadline=None, batch=64):
+        """
+        从游标开始检查文件, 直到perf_counter()超过deadline, 至少检查batch个文件,
+        最多检查一遍所有文件. deadline为None时检查所有文件
+        """
+        total = len(self.paths)
+        cursor = self.cursor
+        clock = time.perf_counter
+        for count in range(1, total + 1):
+            self._check(cursor, notify)
+            cursor += 1
+            if cursor == total:
+                cursor = 0
+            if deadline is not None and count % batch == 0 and clock() >= deadline:
+                break
+        self.cursor = cursor
+
+    def check_directories(self, notify):
+        """
+        检查所有目录的mtime, 立即检查mtime变化了的目录中的文件, 返回是否有目录变化
+        """
+        changed = False
+        for i, directory in enumerate(self.directories):
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            old = self.dir_mtimes[i]
+            if old == mtime:
+                continue
+            self.dir_mtimes[i] = mtime
+            if old != self.UNKNOWN:
+                changed = True
+                for j in self.members[i]:
+                    self._check(j, notify)
+        return changed
+
+
+class StatReloader(BaseReloader):
+    """
+    轮询被监听文件的mtime, 用于无法使用inotify的环境, 比如网络文件系统
+
+    每次只检查一部分文件, 所有目录的mtime每次都检查, 所以新建、删除和重命名文件
+    在一次检查后就能发现, 原地修改的文件要等轮流检查到它时才能发现.
+    """
+
+    SLEEP_TIME = 1  # 检查的间隔(秒)
+    # 检查文件最多占用的CPU时间比例, 0.05表示每秒最多花50毫秒检查文件,
+    # 原地修改的文件最晚在 文件数 * 每次stat的耗时 / CPU_BUDGET 秒后被发现
+    CPU_BUDGET = 0.05
+
+    def __init__(self):
+        super().__init__()
+        self._module_files = None
+        self._extra_files = None
+        self._globbed_files = None
+
+    def tick(self):
+        index = self.update_index(None, rescan_globs=True)
+        # 第一次检查所有文件, 记录初始的mtime
+        index.check_files(self.notify_file_changed)
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.DEBOUNCE if self._changed_files else self.SLEEP_TIME)
+            now = time.perf_counter()
+            # 按照距离上一次检查的时间计算这一次可以使用的时间
+            deadline = now + self.CPU_BUDGET * (now - last)
+            last = now
+            changed = index.check_directories(self.notify_file_changed)
+            index = self.update_index(index, rescan_globs=changed)
+            index.check_files(self.notify_file_changed, deadline)
+            yield
+
+    def update_index(self, index, rescan_globs=False):
+        """
+        监听的文件变化时(导入了新的模块, 或者目录中新建了匹配glob的文件)重建索引,
+        否则原样返回index
+        """
+        module_files = iter_all_python_module_files()
+        extra_files = frozenset(self.extra_files)
+        if (
+            index is not None
+            and not rescan_globs
+            and module_files is self._module_files
+            and extra_files == self._extra_files
+        ):
+            return index
+        if rescan_globs or self._globbed_files is None:
+            self._globbed_files = frozenset(
+                path
+                for directory, patterns in self.directory_globs.items()
+                for pattern in patterns
+                for path in directory.glob(pattern)
+            )
+        self._module_files = module_files
+        self._extra_files = extra_files
+        paths = {
+            str(path)
+            for path in itertools.chain(module_files, extra_files, self._globbed_files)
+        }
+        return MtimeIndex(
+            sorted(paths),
+            # 监听glob所在的目录, 目录中新建了文件时重新匹配
+            directories=[str(directory) for directory in self.directory_globs],
+            previous=index,
+        )
+
+    @classmethod
+    def check_availability(cls):
+        return True
+
+
+class InotifyUnavailable(RuntimeError):
+    pass
+
+
+# <sys/inotify.h>中的常量
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+@functools.lru_cache(maxsize=None)
+def _inotify_libc():
+    """通过ctypes加载libc中的inotify函数, 不支持时抛出InotifyUnavailable"""
+    if not sys.platform.startswith("linux"):
+        raise InotifyUnavailable("inotify is only available on Linux.")
+    try:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (ImportError, OSError, AttributeError) as e:
+        raise InotifyUnavailable("Cannot load inotify from libc: %s" % e)
+    return libc
+
+
+class InotifyReloader(BaseReloader):
+    """
+    使用Linux内核的inotify通知文件变化
+
+    监听所有被监听文件所在的目录, 而不是每个文件, 这样编辑器用重命名的方式
+    保存文件时也能收到通知, 同时需要的watch数量也少得多
+    """
+
+    # 没有变化时, 每隔多久(秒)检查一次有没有导入新的模块
+    REFRESH_TIME = 1
+    MASK = (
+        IN_MODIFY
+        | IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MOVE_SELF
+        | IN_ONLYDIR
+    )
+
+    def __init__(self):
+        super().__init__()
+        self._fd = None
+        self._libc = None
+        # wd => 目录, 目录 => wd
+        self._watches = {}
+        self._directories = {}
+        self._files = frozenset()
+
+    @classmethod
+    def check_availability(cls):
+        libc = _inotify_libc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            # 比如已经达到了fs.inotify.max_user_instances的限制
+            raise InotifyUnavailable(
+                "inotify_init1() failed: %s" % os.strerror(_get_errno())
+            )
+        os.close(fd)
+        return True
+
+    def update_watches(self):
+        """为新导入的模块所在的目录添加watch"""
+        self._files = frozenset(self.watched_files(include_globs=False))
+        directories = {path.parent for path in self._files}
+        directories.update(self.directory_globs)
+        for directory in directories:
+            if directory in self._directories:
+                continue
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(directory), self.MASK
+            )
+            if wd < 0:
+                logger.debug(
+                    "Unable to watch directory %s: %s",
+                    directory,
+                    os.strerror(_get_errno()),
+                )
+                continue
+            self._watches[wd] = directory
+            self._directories[directory] = wd
+
+    def tick(self):
+        self._libc = _inotify_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise InotifyUnavailable(
+                "inotify_init1() failed: %s" % os.strerror(_get_errno())
+            )
+        try:
+            refreshed = None
+            while True:
+                now = time.monotonic()
+                if refreshed is None or now - refreshed >= self.REFRESH_TIME:
+                    self.update_watches()
+                    refreshed = now
+                timeout = self.DEBOUNCE if self._changed_files else self.REFRESH_TIME
+                ready, _, _ = select.select([self._fd], [], [], timeout)
+                if ready:
+                    self.read_events()
+                yield
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._watches.clear()
+            self._directories.clear()
+
+    def read_events(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出, 无法知道哪些文件变化了, 只能直接重启
+                self.notify_file_changed("inotify event queue overflow")
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # 目录被删除或者移走了, 下次刷新时会重新添加
+                del self._watches[wd]
+                del self._directories[directory]
+                continue
+            if not name:
+                continue
+            path = directory / os.fsdecode(name)
+            if path in self._files or any(
+                path.match(pattern) for pattern in self.directory_globs.get(directory, ())
+            ):
+                self.notify_file_changed(path)
+
+
+def _get_errno():
+    import ctypes
+
+    return ctypes.get_errno()
+
+
+def get_reloader():
+    """返回最合适的reloader, 能使用inotify就使用inotify, 否则轮询文件"""
+    try:
+        InotifyReloader.check_availability()
+    except InotifyUnavailable:
+        return StatReloader()
+    return InotifyReloader()
+
+
+def start_django(reloader, main_func, *args, **kwargs):
+    ensure_echo_on()
+
+    main_func = check_errors(main_func)
+    django_main_thread = threading.Thread(
+        target=main_func, args=args, kwargs=kwargs, name="django-main-thread"
+    )
+    django_main_thread.daemon = True
+    django_main_thread.start()
+
+    while not reloader.should_stop:
+        try:
+            reloader.run(django_main_thread)
+        except InotifyUnavailable as ex:
+            # 比如inotify_add_watch达到了上限, 退回到轮询
+            reloader = StatReloader()
+            logger.error("Error connecting to inotify: %s", ex)
+            logger.info(
+                "Watching for file changes with %s", reloader.__class__.__name__
+            )
+
+
+def run_with_reloader(main_func, *args, **kwargs):
+    """
+    在自动重启的子进程中运行main_func, 任何被监听的文件变化时重启子进程
+    """
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        if os.environ.get(DJANGO_AUTORELOAD_ENV) == "true":
+            reloader = get_reloader()
+            logger.info(
+                "Watching for file changes with %s", reloader.__class__.__name__
+            )
+            start_django(reloader, main_func, *args, **kwargs)
+        else:
+            exit_code = restart_with_reloader()
+            sys.exit(exit_code)
+    except KeyboardInterrupt:
+        pass
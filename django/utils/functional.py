@@ -4,10 +4,16 @@
 # @Author   :Lowell
 # @Time     :2022/3/30 09:00
 import copy
+import functools
 import operator
 
 empty = object()
 
+# object原本的__class__描述符, LazyObject把__class__改成了代理属性,
+# 需要修改实例的类时使用它绕过代理
+_set_class = object.__dict__["__class__"].__set__
+_object_getattribute = object.__getattribute__
+
 
 def new_method_proxy(func):
     def inner(self, *args):
@@ -116,6 +122,154 @@ class LazyObject:
     __contains__ = new_method_proxy(operator.contains)
 
 
+class SimpleLazyObject(LazyObject):
+    """
+    延迟对象实例化
+
+    使用函数初始化wrapped对象, 适用于不需要修改实例化过程的场景
+    """
+
+    def __init__(self, func):
+        """
+        传入一个可调用对象, 在需要使用wrapped对象时调用它
+
+        如果可调用对象的结果有可能改变, 就不要使用SimpleLazyObject
+        """
+        self.__dict__["_setupfunc"] = func
+        super().__init__()
+
+    def _setup(self):
+        self._wrapped = self._setupfunc()
+
+    # 直接返回被包装对象的__repr__, 在调试时便于查看
+    def __repr__(self):
+        if self._wrapped is empty:
+            repr_attr = self._setupfunc
+        else:
+            repr_attr = self._wrapped
+        return "<%s: %r>" % (type(self).__name__, repr_attr)
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            # 如果没有进行初始化, 就复制wrapper包装者. 使用type(self),
+            # 而不是self.__class__, 因为这是被代理的, 隔绝依赖
+            return type(self)(self._setupfunc)
+        else:
+            # 如果初始化了, 就返回被包装对象的复制版本
+            return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            # 必须使用type(self),
+            # 而不是self.__class__, 因为这是被代理的, 隔绝依赖
+            result = type(self)(self._setupfunc)
+            memo[id(self)] = result
+            return result
+        return copy.deepcopy(self._wrapped, memo)
+
+
+# 编译后的代理类直接转发的特殊方法, 和LazyObject中使用new_method_proxy的方法对应
+_COMPILED_PROXY_METHODS = {
+    "__bytes__": bytes,
+    "__str__": str,
+    "__bool__": bool,
+    "__dir__": dir,
+    "__eq__": operator.eq,
+    "__lt__": operator.lt,
+    "__gt__": operator.gt,
+    "__ne__": operator.ne,
+    "__hash__": hash,
+    "__getitem__": operator.getitem,
+    "__setitem__": operator.setitem,
+    "__delitem__": operator.delitem,
+    "__iter__": iter,
+    "__len__": len,
+    "__contains__": operator.contains,
+}
+
+
+def _direct_method_proxy(func):
+    """
+    和new_method_proxy一样, 但是不检查wrapped对象是否已经初始化
+    """
+
+    def inner(self, *args):
+        return func(_object_getattribute(self, "_wrapped"), *args)
+
+    return inner
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_proxy_class(lazy_class, wrapped_class, instance_attrs):
+    """
+    为(lazy_class, wrapped_class)创建编译后的代理类
+
+    代理类自身的属性和实例__dict__中的属性直接返回, 其余属性都转发给wrapped对象,
+    不再逐个检查_mask_wrapped; 特殊方法直接调用wrapped对象, 不再检查是否已经初始化
+    """
+    own_attrs = set(instance_attrs)
+    own_attrs.add("__dict__")
+    masked_attrs = set()
+    for klass in lazy_class.__mro__:
+        for name, value in vars(klass).items():
+            if name in own_attrs or name in masked_attrs:
+                continue
+            if getattr(value, "_mask_wrapped", True):
+                own_attrs.add(name)
+            else:
+                masked_attrs.add(name)
+    own_attrs = frozenset(own_attrs)
+
+    def __getattribute__(self, name):
+        if name in own_attrs:
+            return _object_getattribute(self, name)
+        return getattr(_object_getattribute(self, "_wrapped"), name)
+
+    namespace = {
+        "__getattribute__": __getattribute__,
+        "__class__": property(_direct_method_proxy(operator.attrgetter("__class__"))),
+        "__module__": lazy_class.__module__,
+        "_lazy_class": lazy_class,
+    }
+    for name, func in _COMPILED_PROXY_METHODS.items():
+        # wrapped对象不支持的特殊方法保留LazyObject中的实现, 调用时抛出同样的异常
+        if getattr(wrapped_class, name, None) is not None:
+            namespace[name] = _direct_method_proxy(func)
+    # 定义了__eq__却没有定义__hash__的类会被设置为不可哈希
+    namespace.setdefault("__hash__", lazy_class.__hash__)
+    # 保持和原来的类同名, 不影响__repr__
+    return type(lazy_class.__name__, (lazy_class,), namespace)
+
+
+class CompiledLazyObject(LazyObject):
+    """
+    初始化wrapped对象之后, 把实例的类切换为针对wrapped对象类型编译的代理类
+
+    切换之后访问属性只需要一次集合查找再转发给wrapped对象,
+    特殊方法直接调用wrapped对象, 开销接近直接访问. 重置为empty时切换回原来的类
+    """
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "_wrapped":
+            lazy_class = getattr(type(self), "_lazy_class", type(self))
+            if value is empty:
+                _set_class(self, lazy_class)
+            else:
+                _set_class(
+                    self,
+                    _compiled_proxy_class(
+                        lazy_class, type(value), frozenset(self.__dict__)
+                    ),
+                )
+
+
+class CompiledSimpleLazyObject(CompiledLazyObject, SimpleLazyObject):
+    """
+    SimpleLazyObject的编译代理版本
+    """
+
+
 def unpickle_lazyobject(wrapped):
     """
     用于反序列化懒加载对象, 只需要返回被包装的对象
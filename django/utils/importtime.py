@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :importtime.py
+# @Author   :Lowell
+# @Time     :2022/4/13 10:18
+"""
+导入耗时分析
+
+在新的解释器中以-X importtime执行代码, 解析标准错误中每个模块的导入耗时.
+解释器启动时(site等)导入的模块会被排除, 只统计被测代码新导入的模块.
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import namedtuple
+
+# import time:       853 |       1706 |     collections
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$")
+
+# 时间单位是微秒, depth是模块在导入树中的深度, 0表示被测代码直接导入
+ImportRecord = namedtuple("ImportRecord", "module self_us cumulative_us depth")
+
+
+def parse_importtime(lines):
+    """
+    解析-X importtime的输出, 返回ImportRecord列表, 顺序和输出相同(先子模块后父模块)
+    """
+    records = []
+    for line in lines:
+        match = _LINE_RE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        records.append(
+            ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2)
+        )
+    return records
+
+
+def _run(code, env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(
+            "Measuring imports failed:\n%s"
+            % "\n".join(
+                line
+                for line in result.stderr.splitlines()
+                if not line.startswith("import time:")
+            )
+        )
+    return parse_importtime(result.stderr.splitlines())
+
+
+def measure_imports(code, repeat=1, env=None):
+    """
+    在新的解释器中执行code repeat次, 返回每个模块耗时的中位数
+
+    返回的ImportRecord按照第一次运行时的顺序排列, depth相对于被测代码
+    """
+    if env is None:
+        env = dict(os.environ)
+        # 子进程使用和当前进程相同的导入路径
+        env["PYTHONPATH"] = os.pathsep.join(path for path in sys.path if path)
+    baseline = {record.module for record in _run("pass", env)}
+
+    runs = [_run(code, env) for _ in range(repeat)]
+    self_times = {}
+    cumulative_times = {}
+    for records in runs:
+        for record in records:
+            self_times.setdefault(record.module, []).append(record.self_us)
+            cumulative_times.setdefault(record.module, []).append(record.cumulative_us)
+
+    records = [record for record in runs[0] if record.module not in baseline]
+    # 被测代码直接导入的模块的深度作为0
+    top = min((record.depth for record in records), default=0)
+    return [
+        ImportRecord(
+            record.module,
+            int(statistics.median(self_times[record.module])),
+            int(statistics.median(cumulative_times[record.module])),
+            record.depth - top,
+        )
+        for record in records
+    ]
+
+
+def total_us(records):
+    """所有模块的导入耗时之和(微秒)"""
+    return sum(record.self_us for record in records)
@@ -3,9 +3,19 @@
 # @FileName :log.py
 # @Author   :Lowell
 # @Time     :2022/3/30 20:02
+import atexit
+import contextvars
 import logging
-import logging.config
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from functools import cached_property
 
+from django.core.exceptions import ImproperlyConfigured
 from django.utils.module_loading import import_string
 
 
@@ -58,13 +68,598 @@ DEFAULT_LOGGING = {
 }
 
 
-def configure_logging(logging_config, logging_settings):
+def configure_logging(
+    logging_config, logging_settings, queue_size=0, queue_overflow="drop"
+):
+    """
+    配置日志, queue_size大于0时所有处理器都在后台线程中写入, 见django.utils.logqueue
+    """
+    if "django.utils.logqueue" in sys.modules:
+        # 重新配置之前写完队列中的记录
+        from django.utils.logqueue import disable_queue_logging
+
+        disable_queue_logging()
+
     if logging_config:
         # 首先找到日志配置函数
         logging_config_func = import_string(logging_config)
 
+        # logging.config会导入logging.handlers、socket、pickle等模块, 只在需要时导入
+        import logging.config
+
         logging.config.dictConfig(DEFAULT_LOGGING)
 
         # 使用日志设置调用
         if logging_settings:
-            logging_config_func(logging_settings)
\ No newline at end of file
+            logging_config_func(logging_settings)
+
+        if queue_size:
+            from django.utils.logqueue import OVERFLOW_POLICIES, enable_queue_logging
+
+            if queue_overflow not in OVERFLOW_POLICIES:
+                raise ImproperlyConfigured(
+                    "LOGGING_QUEUE_OVERFLOW must be one of %s, not %r."
+                    % (", ".join(OVERFLOW_POLICIES), queue_overflow)
+                )
+            enable_queue_logging(queue_size, queue_overflow)
+
+
+def _settings_cache():
+    """
+    返回LazySettings缓存配置的__dict__
+
+    读取过的配置会缓存在这里, 修改配置(包括override())时会从中删除,
+    所以直接查这个字典和读取settings的结果相同, 但是不用经过LazyObject的属性查找
+    """
+    from django.conf import settings
+
+    return object.__getattribute__(settings, "__dict__")
+
+
+class RequireDebugFalse(logging.Filter):
+    def __init__(self, name=""):
+        super().__init__(name)
+        self._settings = _settings_cache()
+
+    def filter(self, record):
+        try:
+            return not self._settings["DEBUG"]
+        except KeyError:
+            from django.conf import settings
+
+            return not settings.DEBUG
+
+
+class RequireDebugTrue(logging.Filter):
+    def __init__(self, name=""):
+        super().__init__(name)
+        self._settings = _settings_cache()
+
+    def filter(self, record):
+        try:
+            return self._settings["DEBUG"]
+        except KeyError:
+            from django.conf import settings
+
+            return settings.DEBUG
+
+
+class ServerFormatter(logging.Formatter):
+    """
+    开发服务器的日志格式, 按照响应状态码给消息上色
+
+    颜色样式和是否使用{server_time}在创建时确定, 时间字符串按秒缓存,
+    同一秒内的记录不会重复调用strftime
+    """
+
+    default_time_format = "%d/%b/%Y %H:%M:%S"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._uses_server_time = self._fmt.find("{server_time}") >= 0
+        self._uses_time = self.usesTime()
+        if isinstance(self._style, logging.StrFormatStyle) and not getattr(
+            self._style, "_defaults", None
+        ):
+            # 直接用record.__dict__格式化, 不用像StrFormatStyle那样复制成关键字参数
+            fmt = self._fmt.format_map
+            self._format_message = lambda record: fmt(record.__dict__)
+        else:
+            self._format_message = self.formatMessage
+        # 状态码 => 上色函数
+        self._status_styles = {}
+        # (秒, datefmt, 时间字符串)
+        self._time_cache = (None, None, None)
+
+    @cached_property
+    def style(self):
+        # dictConfig在django.setup()时就会创建格式化器, 而django.core.management
+        # 会导入argparse等模块, 所以等到第一次给消息上色时才导入
+        from django.core.management.color import color_style
+
+        return color_style()
+
+    def _status_style(self, status_code):
+        try:
+            return self._status_styles[status_code]
+        except KeyError:
+            pass
+        if 200 <= status_code < 300:
+            style = self.style.HTTP_SUCCESS
+        elif 100 <= status_code < 200:
+            style = self.style.HTTP_INFO
+        elif status_code == 304:
+            style = self.style.HTTP_NOT_MODIFIED
+        elif 300 <= status_code < 400:
+            style = self.style.HTTP_REDIRECT
+        elif status_code == 404:
+            style = self.style.HTTP_NOT_FOUND
+        elif 400 <= status_code < 500:
+            style = self.style.HTTP_BAD_REQUEST
+        else:
+            # 其他状态码都当作服务器错误
+            style = self.style.HTTP_SERVER_ERROR
+        self._status_styles[status_code] = style
+        return style
+
+    def format(self, record):
+        msg = record.msg
+        status_code = getattr(record, "status_code", None)
+
+        if status_code:
+            msg = self._status_style(status_code)(msg)
+
+        if self._uses_server_time and not hasattr(record, "server_time"):
+            record.server_time = self.formatTime(record, self.datefmt)
+
+        record.msg = msg
+        # 以下和logging.Formatter.format相同, 只是预先计算了usesTime和格式化函数
+        record.message = record.getMessage()
+        if self._uses_time:
+            record.asctime = self.formatTime(record, self.datefmt)
+        s = self._format_message(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + record.exc_text
+        if record.stack_info:
+            if s[-1:] != "\n":
+                s = s + "\n"
+            s = s + self.formatStack(record.stack_info)
+        return s
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        cached_second, cached_datefmt, text = self._time_cache
+        if cached_second != second or cached_datefmt != datefmt:
+            ct = self.converter(second)
+            text = time.strftime(datefmt or self.default_time_format, ct)
+            self._time_cache = (second, datefmt, text)
+        if datefmt is None and self.default_msec_format:
+            return self.default_msec_format % (text, record.msecs)
+        return text
+
+    def uses_server_time(self):
+        return self._uses_server_time
+
+
+class AdminEmailHandler(logging.Handler):
+    """
+    把日志记录通过邮件发送给settings.ADMINS
+
+    直接使用smtplib和EMAIL_*配置发送邮件, 发送是同步的,
+    建议和LOGGING_QUEUE_SIZE一起使用, 避免阻塞请求线程
+    """
+
+    def emit(self, record):
+        try:
+            subject = "%s: %s" % (record.levelname, record.getMessage())
+            subject = self.format_subject(subject)
+            message = self.format(record)
+            self.send_mail(subject, message)
+        except Exception:
+            self.handleError(record)
+
+    def format_subject(self, subject):
+        """
+        去掉换行并截断主题, RFC 2822规定一行不能超过998个字符
+        """
+        from django.conf import settings
+
+        subject = "%s%s" % (settings.EMAIL_SUBJECT_PREFIX, subject)
+        formatted_subject = subject.replace("\n", "\\n").replace("\r", "\\r")
+        return formatted_subject[:989]
+
+    def send_mail(self, subject, message):
+        from django.conf import settings
+
+        if not settings.ADMINS:
+            return
+        import smtplib
+        from email.message import EmailMessage
+
+        mail = EmailMessage()
+        mail["Subject"] = subject
+        mail["From"] = settings.SERVER_EMAIL
+        mail["To"] = ", ".join(address for _, address in settings.ADMINS)
+        mail.set_content(message)
+
+        kwargs = {}
+        if settings.EMAIL_TIMEOUT is not None:
+            kwargs["timeout"] = settings.EMAIL_TIMEOUT
+        if settings.EMAIL_USE_SSL:
+            import ssl
+
+            context = ssl.create_default_context()
+            if settings.EMAIL_SSL_CERTFILE:
+                context.load_cert_chain(
+                    settings.EMAIL_SSL_CERTFILE, settings.EMAIL_SSL_KEYFILE
+                )
+            connection = smtplib.SMTP_SSL(
+                settings.EMAIL_HOST, settings.EMAIL_PORT, context=context, **kwargs
+            )
+        else:
+            connection = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, **kwargs)
+        with connection:
+            if settings.EMAIL_USE_TLS:
+                connection.starttls()
+            if settings.EMAIL_HOST_USER:
+                connection.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
+            connection.send_message(mail)
+
+
+# 当前请求或者管理命令的上下文, 由log_context()设置, JsonFormatter会把它们加到每条记录中
+_log_context = contextvars.ContextVar("django_log_context", default=None)
+
+
+@contextmanager
+def log_context(**fields):
+    """
+    在with代码块内记录的日志都带上这些字段, 可以嵌套, 内层的字段覆盖外层的
+
+        with log_context(command="migrate"):
+            ...
+    """
+    current = _log_context.get()
+    token = _log_context.set({**current, **fields} if current else fields)
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def get_log_context():
+    """返回当前的日志上下文字段, 没有时返回None"""
+    return _log_context.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    把每条记录格式化为一行JSON
+
+    在LOGGING中使用:
+
+        "formatters": {
+            "json": {
+                "()": "django.utils.log.JsonFormatter",
+                "fields": {"time": "time", "level": "levelname", "message": "message"},
+            },
+        }
+
+    fields是输出的键到记录属性的映射(或者属性名的列表, 键和属性名相同), 除了LogRecord
+    的属性外还可以使用:
+        - time: UTC时间, ISO 8601格式, 精确到毫秒
+        - message: 合并参数后的消息
+        - exc_info: 格式化后的异常, 没有异常时为null
+        - stack_info: 格式化后的调用栈, 没有时为null
+    extra_fields中的属性只在记录中存在时输出, 比如通过extra传入的status_code.
+    记录中有request属性时输出请求的method和path, log_context()设置的字段也会输出
+    (记录中有log_context属性时使用它, 而不是当前上下文的字段), 但不会覆盖同名的字段.
+
+    字段列表在创建时解析好, 格式化时只读取需要的属性, 不会复制整个record.__dict__
+    """
+
+    default_fields = {
+        "time": "time",
+        "level": "levelname",
+        "logger": "name",
+        "message": "message",
+        "exc_info": "exc_info",
+    }
+    default_extra_fields = ("status_code", "server_time")
+
+    def __init__(self, fields=None, extra_fields=None, datefmt=None, ensure_ascii=True):
+        super().__init__(datefmt=datefmt)
+        import json
+
+        if fields is None:
+            fields = self.default_fields
+        elif not isinstance(fields, dict):
+            fields = {name: name for name in fields}
+        if extra_fields is None:
+            extra_fields = self.default_extra_fields
+        computed = {
+            "time": self._format_time,
+            "message": self._format_message,
+            "exc_info": self._format_exc_info,
+            "stack_info": self._format_stack_info,
+        }
+        # (输出的键, 记录属性, 计算函数), 计算函数为None时直接读取属性
+        self._fields = [
+            (key, attr, computed.get(attr)) for key, attr in fields.items()
+        ]
+        self._extra_fields = [
+            attr for attr in extra_fields if attr not in fields.values()
+        ]
+        self._encode = json.JSONEncoder(
+            default=str, ensure_ascii=ensure_ascii, separators=(",", ":")
+        ).encode
+        # (秒, 时间字符串)
+        self._time_cache = (None, None)
+
+    def _format_time(self, record):
+        if self.datefmt:
+            return self.formatTime(record, self.datefmt)
+        second = int(record.created)
+        cached_second, text = self._time_cache
+        if cached_second != second:
+            text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._time_cache = (second, text)
+        return "%s.%03dZ" % (text, record.msecs)
+
+    @staticmethod
+    def _format_message(record):
+        return record.getMessage()
+
+    def _format_exc_info(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        return record.exc_text or None
+
+    def _format_stack_info(self, record):
+        if record.stack_info:
+            return self.formatStack(record.stack_info)
+        return None
+
+    def format(self, record):
+        values = record.__dict__
+        data = {}
+        for key, attr, func in self._fields:
+            data[key] = func(record) if func is not None else values.get(attr)
+        for attr in self._extra_fields:
+            if attr in values:
+                data[attr] = values[attr]
+
+        request = values.get("request")
+        if request is not None:
+            data["request"] = {
+                "method": getattr(request, "method", None),
+                "path": getattr(request, "path", None),
+            }
+        # 经过日志队列的记录在后台线程中格式化, 上下文已经由QueueHandler保存在记录上
+        if "log_context" in values:
+            context = values["log_context"]
+        else:
+            context = _log_context.get()
+        if context:
+            # 和记录本身的字段同名时(比如message, level)以记录的字段为准
+            for key, value in context.items():
+                data.setdefault(key, value)
+        return self._encode(data)
+
+
+class SuppressingFilter(logging.Filter):
+    """
+    按照(logger名, 级别, 消息模板)决定是否丢弃记录, 并定期汇总丢弃的数量
+
+    子类实现allow(key, now). 第一次丢弃记录时启动一个summary_interval秒的定时器(守护线程),
+    到时后每个有记录被丢弃的键输出一条"N messages like ... were suppressed"的记录;
+    进程退出时也会输出还没有汇总的数量, 之后不再有记录时不会重复输出.
+
+    汇总记录通过logging.getLogger(原记录的logger名).handle()输出, 所以会交给这个logger
+    和向上传播经过的所有处理器, 不只是使用这个过滤器的处理器. 汇总记录带有
+    suppression_summary=True和suppressed=N属性, 这些过滤器不会丢弃它们
+    """
+
+    summary_message = '%d messages like "%s" were suppressed in the last %.0f seconds.'
+
+    def __init__(self, summary_interval=60, name=""):
+        super().__init__(name)
+        self.summary_interval = summary_interval
+        self._lock = threading.Lock()
+        # 键 => 丢弃的数量
+        self._suppressed = {}
+        # 这一轮第一次丢弃记录的时间
+        self._window_start = None
+        self._timer = None
+        _suppressing_filters.add(self)
+
+    def allow(self, key, now):
+        raise NotImplementedError("subclasses must implement allow().")
+
+    def filter(self, record):
+        if getattr(record, "suppression_summary", False):
+            return True
+        if not super().filter(record):
+            return False
+        msg = record.msg if isinstance(record.msg, str) else str(record.msg)
+        key = (record.name, record.levelno, msg)
+        now = time.monotonic()
+        with self._lock:
+            allowed = self.allow(key, now)
+            if not allowed:
+                if not self._suppressed:
+                    self._window_start = now
+                    self._schedule()
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+        return allowed
+
+    def _schedule(self):
+        """启动汇总的定时器, 调用时必须持有self._lock"""
+        if self._timer is None:
+            self._timer = threading.Timer(self.summary_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """立即输出还没有汇总的丢弃数量"""
+        with self._lock:
+            summaries, self._suppressed = self._suppressed, {}
+            timer, self._timer = self._timer, None
+            window_start = self._window_start
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if summaries:
+            # 在锁外输出, 汇总记录会再经过这个过滤器
+            self.emit_summaries(summaries, time.monotonic() - window_start)
+
+    def _after_fork_in_child(self):
+        # 子进程中没有父进程的定时器线程, 锁也可能正被父进程的其他线程持有
+        self._lock = threading.Lock()
+        self._timer = None
+        if self._suppressed:
+            self._schedule()
+
+    def emit_summaries(self, summaries, elapsed):
+        for (name, level, msg), count in summaries.items():
+            record = logging.LogRecord(
+                name,
+                level,
+                __file__,
+                0,
+                self.summary_message,
+                (count, msg, elapsed),
+                None,
+            )
+            record.suppression_summary = True
+            record.suppressed = count
+            logging.getLogger(name).handle(record)
+
+
+# 所有的SuppressingFilter, 退出时输出它们还没有汇总的数量
+_suppressing_filters = weakref.WeakSet()
+
+
+def _flush_suppressing_filters():
+    for suppressing_filter in list(_suppressing_filters):
+        suppressing_filter.flush()
+
+
+def _suppressing_filters_after_fork():
+    for suppressing_filter in list(_suppressing_filters):
+        suppressing_filter._after_fork_in_child()
+
+
+# logging在导入时注册了atexit, 这里后注册的先执行, 在关闭处理器之前输出汇总
+atexit.register(_flush_suppressing_filters)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_suppressing_filters_after_fork)
+
+
+class RateLimitFilter(SuppressingFilter):
+    """
+    令牌桶限流, 每个键每秒最多通过rate条记录, 允许burst条的突发
+
+        "filters": {
+            "rate_limit": {
+                "()": "django.utils.log.RateLimitFilter",
+                "rate": 10,
+                "burst": 50,
+            },
+        }
+
+    最多记录max_keys个键的令牌桶, 超过时丢弃已经回满的桶
+    """
+
+    def __init__(self, rate=10, burst=None, summary_interval=60, max_keys=10000, name=""):
+        super().__init__(summary_interval, name)
+        self.rate = float(rate)
+        self.burst = float(rate if burst is None else burst)
+        self.max_keys = max_keys
+        # 键 => [令牌数, 上次更新的时间]
+        self._buckets = {}
+
+    def allow(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [self.burst - 1, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True
+        bucket[0] = tokens
+        return False
+
+    def _prune(self, now):
+        """删除已经回满的桶, 它们和新建的桶没有区别"""
+        self._buckets = {
+            key: bucket
+            for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * self.rate < self.burst
+        }
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+class SamplingFilter(SuppressingFilter):
+    """
+    按照概率rate随机保留记录, 每个键被丢弃的数量会定期汇总
+
+        "filters": {
+            "sample": {
+                "()": "django.utils.log.SamplingFilter",
+                "rate": 0.1,
+            },
+        }
+    """
+
+    def __init__(self, rate=0.1, summary_interval=60, name=""):
+        super().__init__(summary_interval, name)
+        self.rate = rate
+        self._random = random.random
+
+    def allow(self, key, now):
+        return self._random() < self.rate
+
+
+request_logger = logging.getLogger("django.request")
+
+
+def log_response(
+    message,
+    *args,
+    response=None,
+    request=None,
+    logger=request_logger,
+    level=None,
+    exception=None,
+):
+    """
+    记录4xx/5xx响应, 同一个响应只记录一次
+
+    level默认根据状态码决定: 5xx为error, 4xx为warning
+    """
+    if getattr(response, "_has_been_logged", False):
+        return
+
+    if level is None:
+        if response.status_code >= 500:
+            level = "error"
+        elif response.status_code >= 400:
+            level = "warning"
+        else:
+            level = "info"
+
+    getattr(logger, level)(
+        message,
+        *args,
+        extra={"status_code": response.status_code, "request": request},
+        exc_info=exception,
+    )
+    response._has_been_logged = True
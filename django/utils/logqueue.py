@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :logqueue.py
+# @Author   :Lowell
+# @Time     :2022/4/13 16:25
+"""
+在后台线程中写日志
+
+settings.LOGGING_QUEUE_SIZE大于0时, configure_logging()在配置完日志之后调用
+enable_queue_logging(), 把所有logger上的处理器替换为QueueHandler.
+记录日志的线程只执行处理器的过滤器, 然后把记录放进有界队列, 格式化和写入
+(stderr, 文件, 邮件...)都在QueueListener的线程中完成.
+
+队列满时的处理方式由settings.LOGGING_QUEUE_OVERFLOW决定:
+    - "drop": 丢弃这条记录, 计入QueueListener.dropped, 退出时输出丢弃的数量
+    - "block": 等待队列有空位
+
+进程退出时会处理完队列中剩余的记录; fork出来的子进程会使用新的队列和线程.
+enable_queue_logging()之后才添加的处理器不会经过队列.
+"""
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+from django.utils.log import get_log_context
+
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+class QueueListener(logging.handlers.QueueListener):
+    """
+    后台线程, 队列中的每一项是(处理器, 记录), 记录只交给对应的处理器
+    """
+
+    def __init__(self, maxsize, overflow="drop"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "overflow must be one of %s, not %r."
+                % (", ".join(OVERFLOW_POLICIES), overflow)
+            )
+        super().__init__(queue.Queue(maxsize))
+        self.overflow = overflow
+        # 因为队列已满而丢弃的记录数量, 多个线程同时丢弃记录, 用锁保护计数
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.targets = []
+
+    def enqueue(self, handler, record):
+        item = (handler, record)
+        if self.overflow == "block":
+            self.queue.put(item)
+            return
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def handle(self, item):
+        handler, record = item
+        # 过滤器已经在记录日志的线程中执行过了, 这里只需要写入
+        try:
+            handler.acquire()
+            try:
+                handler.emit(record)
+            finally:
+                handler.release()
+        except Exception:
+            handler.handleError(record)
+
+    def enqueue_sentinel(self):
+        # 队列满时也要等待放入结束标记, 保证退出前处理完所有记录
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        """处理完队列中的记录后停止线程"""
+        if self._thread is None:
+            return
+        super().stop()
+        for handler in self.targets:
+            try:
+                handler.flush()
+            except Exception:
+                pass
+        if self.dropped:
+            sys.stderr.write(
+                "%d log records were dropped because the logging queue was full.\n"
+                % self.dropped
+            )
+
+    def restart_after_fork(self):
+        """
+        fork出来的子进程中没有父进程的线程, 使用新的队列重新启动
+
+        队列中还没有处理的记录由父进程负责写入
+        """
+        if self._thread is None:
+            return
+        self.queue = queue.Queue(self.queue.maxsize)
+        # fork时锁可能正被其他线程持有, 子进程中重新创建
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+        self.start()
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    代替原来的处理器挂在logger上, 把记录交给QueueListener
+    """
+
+    def __init__(self, handler, listener):
+        super().__init__(listener.queue)
+        self.handler = handler
+        self.listener = listener
+        self.level = handler.level
+
+    def handle(self, record):
+        # 原处理器的过滤器在当前线程中执行, 被过滤掉的记录不进入队列
+        rv = self.filter(record) and self.handler.filter(record)
+        if rv:
+            if isinstance(rv, logging.LogRecord):
+                record = rv
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            self.listener.enqueue(self.handler, self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record):
+        """
+        复制记录并合并消息参数, 参数可能在写入之前被修改
+
+        exc_info保留给后台线程中的格式化器使用. log_context()的字段保存在上下文变量中,
+        后台线程读不到, 所以在这里保存到记录的log_context属性上
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if not hasattr(record, "log_context"):
+            record.log_context = get_log_context()
+        return record
+
+    def flush(self):
+        self.handler.flush()
+
+    def close(self):
+        self.handler.close()
+        super().close()
+
+
+_listener = None
+
+
+def get_queue_listener():
+    """返回当前的QueueListener, 没有开启时返回None"""
+    return _listener
+
+
+def enable_queue_logging(maxsize, overflow="drop"):
+    """
+    把所有logger上的处理器替换为QueueHandler, 并启动后台线程
+    """
+    global _listener
+    disable_queue_logging()
+
+    listener = QueueListener(maxsize, overflow)
+    wrapped = {}
+    loggers = [logging.getLogger()] + [
+        logger
+        for logger in list(logging.Logger.manager.loggerDict.values())
+        if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        handlers = []
+        for handler in logger.handlers:
+            if handler not in wrapped:
+                wrapped[handler] = QueueHandler(handler, listener)
+            handlers.append(wrapped[handler])
+        logger.handlers = handlers
+    listener.targets = list(wrapped)
+    listener.start()
+    _listener = listener
+    return listener
+
+
+def disable_queue_logging():
+    """
+    停止后台线程并处理完剩余的记录, logger上的处理器恢复为原来的处理器
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    loggers = [logging.getLogger()] + [
+        logger
+        for logger in list(logging.Logger.manager.loggerDict.values())
+        if isinstance(logger, logging.Logger)
+    ]
+    for logger in loggers:
+        logger.handlers = [
+            handler.handler
+            if isinstance(handler, QueueHandler) and handler.listener is listener
+            else handler
+            for handler in logger.handlers
+        ]
+
+
+def _after_fork_in_child():
+    if _listener is not None:
+        _listener.restart_after_fork()
+
+
+# logging在导入时注册了atexit, 这里后注册的先执行, 在关闭处理器之前写完队列中的记录
+atexit.register(disable_queue_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
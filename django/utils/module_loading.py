@@ -3,8 +3,10 @@
 # @FileName :module_loading.py
 # @Author   :Lowell
 # @Time     :2022/3/30 17:56
+import os
 import sys
 from importlib import import_module
+from importlib.machinery import all_suffixes
 from importlib.util import find_spec as importlib_find
 
 
@@ -18,10 +20,14 @@ def cached_import(module_path, class_name):
     return getattr(module, class_name)
 
 
-def import_string(dotted_path):
-    """
-    通过字符串导入模块
-    """
+# dotted_path => (模块路径, 模块, 属性名, 导入失败时的异常)
+# 模块为None表示导入时模块不在sys.modules中
+_import_cache = {}
+
+_missing = object()
+
+
+def _import_string(dotted_path):
     try:
         module_path, class_name = dotted_path.rsplit(".", 1)
     except ValueError as err:
@@ -36,7 +42,95 @@ def import_string(dotted_path):
         ) from err
 
 
+def import_string(dotted_path):
+    """
+    通过字符串导入模块
+
+    导入的结果按照dotted_path缓存, 导入失败(ImportError)也会被缓存, 配置错误时
+    不会每次都重新走一遍导入流程. 只缓存模块, 属性每次都从模块上取,
+    mock.patch()之类替换属性的操作能立即生效. 模块在sys.modules中的对象变化时
+    (重新加载, 从sys.modules中删除, 或者之前不存在的模块被导入了)缓存自动失效,
+    其他情况可以调用clear_import_cache()
+    """
+    entry = _import_cache.get(dotted_path)
+    if entry is not None and sys.modules.get(entry[0]) is entry[1]:
+        if entry[3] is not None:
+            import copy
+
+            # 每次抛出新的异常对象, 避免traceback在多次抛出之间累积
+            raise copy.copy(entry[3]) from entry[3].__cause__
+        value = getattr(entry[1], entry[2], _missing)
+        if value is not _missing:
+            return value
+        # 属性被删除了, 重新导入, 由_import_string()抛出异常
+
+    module_path, _, class_name = dotted_path.rpartition(".")
+    try:
+        value = _import_string(dotted_path)
+    except ImportError as err:
+        value, error = None, err
+    else:
+        error = None
+    module = sys.modules.get(module_path)
+    spec = getattr(module, "__spec__", None)
+    # 模块还在初始化时(循环导入)不缓存, 这时候属性可能还没有定义
+    if getattr(spec, "_initializing", False) is False:
+        _import_cache[dotted_path] = (module_path, module, class_name, error)
+    if error is not None:
+        raise error
+    return value
+
+
+def clear_import_cache(dotted_path=None):
+    """
+    清除import_string()的缓存, dotted_path为None时清除全部缓存
+    """
+    if dotted_path is None:
+        _import_cache.clear()
+    else:
+        _import_cache.pop(dotted_path, None)
+
+
+# 包的__path__ => 包中所有子模块(包括子包)的名字, 找不到目录时为None
+_submodule_cache = {}
+
+
+def _list_submodules(package_path):
+    """
+    扫描包的所有目录, 返回子模块名的集合
+
+    和FileFinder一样, 带有模块后缀的文件是模块, 所有子目录都是包(包括命名空间包).
+    有不是目录的路径时(比如zip文件)返回None, 交给find_spec处理
+    """
+    suffixes = tuple(all_suffixes())
+    names = set()
+    for directory in package_path:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        names.add(name)
+                        continue
+                    for suffix in suffixes:
+                        if name.endswith(suffix):
+                            names.add(name[: -len(suffix)])
+        except OSError:
+            return None
+    return frozenset(names)
+
+
 def module_has_submodule(package, module_name):
+    """
+    判断包中是否有这个子模块
+
+    每个包的目录只扫描一次, 之后从内存中的列表判断, 修改了包的目录之后
+    需要调用clear_submodule_cache()
+    """
     try:
         package_name = package.__name__
         package_path = package.__path__
@@ -44,7 +138,23 @@ def module_has_submodule(package, module_name):
         return False
 
     full_module_name = package_name + "." + module_name
+    if full_module_name in sys.modules:
+        return True
+
+    key = tuple(package_path)
+    try:
+        names = _submodule_cache[key]
+    except KeyError:
+        names = _submodule_cache[key] = _list_submodules(key)
+    if names is not None:
+        return module_name in names
+
     try:
         return importlib_find(full_module_name, package_path) is not None
     except ModuleNotFoundError:
         return False
+
+
+def clear_submodule_cache():
+    """清除module_has_submodule()缓存的目录列表"""
+    _submodule_cache.clear()
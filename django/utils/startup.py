@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @FileName :startup.py
+# @Author   :Lowell
+# @Time     :2022/4/6 14:32
+"""
+django.setup()启动耗时分析
+
+设置环境变量DJANGO_STARTUP_PROFILE后, django.setup()会记录每个阶段以及
+每个应用在各个阶段中花费的时间和新导入的模块数量, 结束时以一行JSON追加到
+环境变量指定的文件中, 值为"-"时输出到标准错误.
+
+    DJANGO_STARTUP_PROFILE=/var/log/django-startup.jsonl gunicorn mysite.wsgi
+"""
+import contextlib
+import os
+import sys
+import time
+
+PROFILE_ENVIRONMENT_VARIABLE = "DJANGO_STARTUP_PROFILE"
+
+
+class NullProfiler:
+    """
+    没有开启分析时使用, 所有记录都不做任何处理
+    """
+
+    enabled = False
+
+    def phase(self, name):
+        return contextlib.nullcontext()
+
+    def app(self, phase, app):
+        return contextlib.nullcontext()
+
+    def add_app(self, phase, app, seconds, imports=None):
+        pass
+
+
+class StartupProfiler:
+    """
+    记录启动过程中每个阶段和每个应用的耗时
+    """
+
+    enabled = True
+
+    def __init__(self, path):
+        # 报告写入的文件路径
+        self.path = path
+        self.started = time.perf_counter()
+        self.start_modules = len(sys.modules)
+        self.phases = []
+        self.apps = []
+
+    @contextlib.contextmanager
+    def _measure(self, records, **info):
+        start = time.perf_counter()
+        modules = len(sys.modules)
+        try:
+            yield
+        finally:
+            info["seconds"] = time.perf_counter() - start
+            info["imports"] = len(sys.modules) - modules
+            records.append(info)
+
+    def phase(self, name):
+        """记录一个启动阶段"""
+        return self._measure(self.phases, phase=name)
+
+    def app(self, phase, app):
+        """记录一个应用在某个阶段中的耗时"""
+        return self._measure(self.apps, phase=phase, app=app)
+
+    def add_app(self, phase, app, seconds, imports=None):
+        """添加在其他地方测量的应用耗时, 比如在线程池中导入应用"""
+        self.apps.append(
+            {"phase": phase, "app": app, "seconds": seconds, "imports": imports}
+        )
+
+    def report(self):
+        """返回可以序列化为JSON的分析报告"""
+        import django
+
+        return {
+            "timestamp": time.time(),
+            "pid": os.getpid(),
+            "python": sys.version.split()[0],
+            "django": django.__version__,
+            "settings": os.environ.get("DJANGO_SETTINGS_MODULE"),
+            "seconds": time.perf_counter() - self.started,
+            "imports": len(sys.modules) - self.start_modules,
+            "phases": self.phases,
+            "apps": self.apps,
+        }
+
+    def write(self):
+        """把报告以一行JSON写入文件, path为"-"时写入标准错误"""
+        import json
+
+        line = json.dumps(self.report(), sort_keys=True) + "\n"
+        if self.path == "-":
+            sys.stderr.write(line)
+        else:
+            # 多个进程同时启动时, 追加模式写入的每一行都是完整的
+            try:
+                with open(self.path, "a") as fp:
+                    fp.write(line)
+            except OSError as e:
+                # 只是诊断信息, 写入失败不能影响启动, 也不能掩盖启动时的异常
+                import warnings
+
+                warnings.warn(
+                    "Could not write the startup profile to %r: %s" % (self.path, e),
+                    RuntimeWarning,
+                )
+
+
+_null_profiler = NullProfiler()
+_profiler = _null_profiler
+
+
+def get_profiler():
+    """返回当前的启动分析器, 没有开启分析时返回NullProfiler"""
+    return _profiler
+
+
+def start_profiling():
+    """如果设置了DJANGO_STARTUP_PROFILE, 就开始记录启动耗时"""
+    global _profiler
+    path = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE)
+    if path:
+        _profiler = StartupProfiler(path)
+    return _profiler
+
+
+def finish_profiling():
+    """结束记录并写入报告"""
+    global _profiler
+    profiler, _profiler = _profiler, _null_profiler
+    if profiler.enabled:
+        profiler.write()
+    return profiler
@@ -3,10 +3,18 @@
 # @FileName :version.py
 # @Author   :Lowell
 # @Time     :2022/3/30 14:13
-import datetime
+"""
+开发版本(alpha 0)的版本号中包含最后一次提交的时间, 例如4.1.dev20220412103600
+
+提交时间优先从构建时生成的django/_version.py中读取, 生成方式:
+
+    python -m django.utils.version
+
+没有这个文件时才在第一次需要版本号时执行git log, 导入django不会创建子进程.
+"""
 import functools
-import os.path
-import subprocess
+import os
+import sys
 
 
 def get_version(version=None):
@@ -56,19 +64,38 @@ def get_complete_version(version=None):
 
 @functools.lru_cache
 def get_git_changeset():
+    """
+    返回开发版本信息, 优先使用构建时生成的_version模块, 没有时再执行git log
+    """
+    try:
+        from django._version import GIT_CHANGESET
+    except ImportError:
+        pass
+    else:
+        return GIT_CHANGESET
+    return _get_git_changeset()
+
+
+def _get_git_changeset():
     """
     通过git的提交时间戳生成开发版本信息
     """
     if "__file__" not in globals():
         return None
+    import datetime
+    import subprocess
+
     repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    git_log = subprocess.run(
-        "git log --pretty=format:%ct --quiet -1 HEAD",
-        capture_output=True,
-        shell=True,
-        cwd=repo_dir,
-        text=True,
-    )
+    try:
+        git_log = subprocess.run(
+            ["git", "log", "--pretty=format:%ct", "--quiet", "-1", "HEAD"],
+            capture_output=True,
+            cwd=repo_dir,
+            text=True,
+        )
+    except OSError:
+        # 没有安装git
+        return None
     timestamp = git_log.stdout
     tz = datetime.timezone.utc
     try:
@@ -76,3 +103,29 @@ def get_git_changeset():
     except ValueError:
         return None
     return timestamp.strftime("%Y%m%d%H%M%S")
+
+
+VERSION_STAMP_TEMPLATE = """# 由python -m django.utils.version生成, 不要手动修改
+GIT_CHANGESET = %r
+"""
+
+
+def write_version_stamp(path=None):
+    """
+    把当前的git提交时间写入django/_version.py, 在构建或者部署时执行
+    """
+    if path is None:
+        path = os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "_version.py"
+        )
+    changeset = _get_git_changeset()
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, "w") as fp:
+        fp.write(VERSION_STAMP_TEMPLATE % changeset)
+    os.replace(tmp_path, path)
+    return changeset
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    sys.stdout.write("GIT_CHANGESET = %r\n" % write_version_stamp(path))
@@ -9,6 +9,15 @@ import sys
 
 def main():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+    try:
+        from django.core.forkserver import run_in_server
+    except ImportError:
+        pass
+    else:
+        # 如果常驻的命令服务可用, 就交给它执行, 省去启动django的时间
+        code = run_in_server(sys.argv)
+        if code is not None:
+            sys.exit(code)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -121,5 +121,3 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/{{ docs_version }}/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-
-LOGGING_CONFIG = ''